@@ -102,6 +102,14 @@ CHANNEL_LAYERS = {
         "BACKEND": "channels.layers.InMemoryChannelLayer",
     },
 }
+# With more than one ASGI worker, set CHANNEL_LAYER_BACKEND=postgres so group
+# messages cross processes via LISTEN/NOTIFY on the default database.
+if os.getenv('CHANNEL_LAYER_BACKEND', 'memory').strip().lower() == 'postgres':
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "tracker.channel_layers.PostgresChannelLayer",
+        },
+    }
 # ..........................
 TIME_FORMAT = 'h:i A'
 USE_L10N = True
@@ -173,6 +181,29 @@ else:
         "Ensure ENVIRONMENT=production or POSTGRES_LOCALLY=True and DATABASE_URL is set in .env"
     )
 
+# Per-process memory cache by default; with several workers set REDIS_URL so
+# cached responses are shared and invalidated across all of them.
+redis_url = os.getenv('REDIS_URL', '').strip()
+
+if redis_url:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': redis_url,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# Only a shared cache sees invalidations made by other processes (management
+# commands, the report worker, other ASGI workers). Caches that must not go
+# stale that way (unread counters, report datasets, conversation lists) are
+# skipped without one.
+SHARED_CACHE = bool(redis_url)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -299,4 +330,50 @@ ESEWA_FAILURE_URL = _env_url_or_default('ESEWA_FAILURE_URL')
 PLATFORM_COMMISSION_PERCENTAGE = 25
 DOCTOR_EARNING_PERCENTAGE = 75
 PAYMENT_WINDOW_HOURS = int(os.getenv('PAYMENT_WINDOW_HOURS', '2'))
-DOCTOR_PAYOUT_SCHEDULE = os.getenv('DOCTOR_PAYOUT_SCHEDULE', 'Weekly (manual by admin)')
\ No newline at end of file
+DOCTOR_PAYOUT_SCHEDULE = os.getenv('DOCTOR_PAYOUT_SCHEDULE', 'Weekly (manual by admin)')
+# Load the XGBoost cycle model in TrackerConfig.ready() instead of on the first
+# prediction. Enable it for web workers only; management commands stay light.
+CYCLE_MODEL_WARMUP = os.getenv('CYCLE_MODEL_WARMUP', 'False').strip().lower() in ('1', 'true', 'yes')
+# Queue outgoing email in the EmailOutbox table instead of sending it inside the
+# request; the send_outbox worker delivers it with retry/backoff.
+EMAIL_OUTBOX_ENABLED = os.getenv('EMAIL_OUTBOX_ENABLED', 'False').strip().lower() in ('1', 'true', 'yes')
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '5'))
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = int(os.getenv('EMAIL_OUTBOX_RETRY_BASE_SECONDS', '60'))
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = int(os.getenv('EMAIL_OUTBOX_RETRY_MAX_SECONDS', '3600'))
+# Chat history API page sizes (keyset pagination via before_id/after_id).
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv('CHAT_HISTORY_PAGE_SIZE', '50'))
+CHAT_HISTORY_MAX_PAGE_SIZE = int(os.getenv('CHAT_HISTORY_MAX_PAGE_SIZE', '200'))
+# since_id polls also re-send messages this recent, so one committed below the
+# poller's cursor (write-behind flush, slow transaction) is still delivered.
+CHAT_HISTORY_SYNC_OVERLAP_SECONDS = int(os.getenv('CHAT_HISTORY_SYNC_OVERLAP_SECONDS', '30'))
+# Chat consumer write-behind: broadcast first, then bulk_create queued messages
+# every CHAT_WRITE_BEHIND_FLUSH_MS or once CHAT_WRITE_BEHIND_BATCH_SIZE are waiting.
+CHAT_WRITE_BEHIND_ENABLED = os.getenv('CHAT_WRITE_BEHIND_ENABLED', 'False').strip().lower() in ('1', 'true', 'yes')
+CHAT_WRITE_BEHIND_FLUSH_MS = int(os.getenv('CHAT_WRITE_BEHIND_FLUSH_MS', '200'))
+CHAT_WRITE_BEHIND_BATCH_SIZE = int(os.getenv('CHAT_WRITE_BEHIND_BATCH_SIZE', '50'))
+# Threads for the chat consumers' DB work. Each keeps one persistent connection,
+# so by default consumers get half of DB_CONNECTION_BUDGET (connections this worker
+# may hold) and HTTP requests the rest; 0 falls back to the single shared thread.
+DB_CONNECTION_BUDGET = int(os.getenv('DB_CONNECTION_BUDGET', '20'))
+CONSUMER_DB_POOL_SIZE = int(os.getenv('CONSUMER_DB_POOL_SIZE', str(max(DB_CONNECTION_BUDGET // 2, 1))))
+# Per-user /api/conversations/ response (with SHARED_CACHE only), dropped whenever one of
+# their conversations changes.
+CONVERSATION_LIST_CACHE_SECONDS = int(os.getenv('CONVERSATION_LIST_CACHE_SECONDS', '300'))
+# Lifetime of the cached unread counters behind /api/unread-summary/ (rebuilt from the DB on a miss).
+UNREAD_COUNTER_CACHE_SECONDS = int(os.getenv('UNREAD_COUNTER_CACHE_SECONDS', '3600'))
+# prune_notifications deletes read notifications older than this many days (0 keeps them all).
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '90'))
+# Cached ReportDataset lifetime; datasets are also dropped whenever the user's report data changes.
+REPORT_DATASET_CACHE_SECONDS = int(os.getenv('REPORT_DATASET_CACHE_SECONDS', '3600'))
+# Queue PDF report exports for the run_report_exports worker instead of rendering them
+# in the request; the user is notified with a download link once the file is ready.
+REPORT_EXPORT_BACKGROUND = os.getenv('REPORT_EXPORT_BACKGROUND', 'False').strip().lower() in ('1', 'true', 'yes')
+REPORT_EXPORT_RETENTION_DAYS = int(os.getenv('REPORT_EXPORT_RETENTION_DAYS', '7'))
+# Renders (including ones whose worker died) a report export gets before it is marked failed.
+REPORT_EXPORT_MAX_ATTEMPTS = int(os.getenv('REPORT_EXPORT_MAX_ATTEMPTS', '3'))
+# Rendered PDFs stay in memory up to this size, then spill to a temporary file, so
+# a finished report is not held in memory while it is sent. ReportLab still builds
+# each PDF in memory while rendering it.
+REPORT_PDF_SPOOL_MAX_BYTES = int(os.getenv('REPORT_PDF_SPOOL_MAX_BYTES', str(1024 * 1024)))
+# Profile photos kept decoded and pre-scaled for PDF reports, per process (least recently used evicted).
+REPORT_AVATAR_CACHE_SIZE = int(os.getenv('REPORT_AVATAR_CACHE_SIZE', '32'))
@@ -304,6 +304,15 @@ function initializeSearchNavigation() {
   });
 }
 
+// The list is fetched once, on the first bell click; new notifications arrive over the socket.
+let notificationItems = [];
+let notificationsLoaded = false;
+let notificationSocket = null;
+// Reconnect delay doubles after each failed attempt, up to the cap, and resets once connected.
+const NOTIFICATION_RECONNECT_BASE_MS = 1000;
+const NOTIFICATION_RECONNECT_MAX_MS = 60000;
+let notificationReconnectDelay = NOTIFICATION_RECONNECT_BASE_MS;
+
 function renderNotifications(items) {
   const list = document.getElementById('notificationDropdownList');
   if (!list) {
@@ -356,6 +365,11 @@ function renderNotifications(items) {
         if (response.ok) {
           const data = await response.json();
           button.classList.remove('unread');
+          notificationItems.forEach((item) => {
+            if (String(item.id) === id) {
+              item.is_read = true;
+            }
+          });
           updateNotificationBadge(data.unread_count || 0);
         }
       } catch (err) {
@@ -385,13 +399,80 @@ async function loadNotifications() {
     }
 
     const data = await response.json();
+    notificationItems = data.notifications || [];
+    notificationsLoaded = true;
     updateNotificationBadge(data.unread_count || 0);
-    renderNotifications(data.notifications || []);
+    renderNotifications(notificationItems);
   } catch (err) {
     console.error('Failed to load notifications', err);
   }
 }
 
+function connectNotificationSocket() {
+  if (notificationSocket && notificationSocket.readyState <= WebSocket.OPEN) {
+    return;
+  }
+
+  const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+  notificationSocket = new WebSocket(`${protocol}//${window.location.host}/ws/notifications/`);
+
+  notificationSocket.onopen = function () {
+    notificationReconnectDelay = NOTIFICATION_RECONNECT_BASE_MS;
+  };
+
+  notificationSocket.onmessage = function (event) {
+    const data = JSON.parse(event.data);
+    if (data.type !== 'notification' || !data.notification) {
+      return;
+    }
+
+    updateNotificationBadge(data.unread_count || 0);
+    if (notificationsLoaded) {
+      notificationItems = [data.notification]
+        .concat(notificationItems.filter((item) => item.id !== data.notification.id))
+        .slice(0, 20);
+      renderNotifications(notificationItems);
+    }
+  };
+
+  notificationSocket.onclose = function (event) {
+    // 4xxx is the server turning the socket away (e.g. logged out); retrying cannot help.
+    if (event.code >= 4000 && event.code < 5000) {
+      return;
+    }
+
+    // Jitter spreads the reconnects of every open tab after a server restart.
+    const delay = notificationReconnectDelay * (0.5 + Math.random() / 2);
+    notificationReconnectDelay = Math.min(notificationReconnectDelay * 2, NOTIFICATION_RECONNECT_MAX_MS);
+
+    // Anything sent while disconnected is missed, so resync after reconnecting.
+    window.setTimeout(function () {
+      notificationsLoaded = false;
+      loadUnreadSummary();
+      connectNotificationSocket();
+    }, delay);
+  };
+}
+
+async function loadUnreadSummary() {
+  try {
+    const response = await fetch('/api/unread-summary/', {
+      headers: {
+        'X-Requested-With': 'XMLHttpRequest',
+      },
+    });
+
+    if (!response.ok) {
+      return;
+    }
+
+    const data = await response.json();
+    updateNotificationBadge(data.notifications || 0);
+  } catch (err) {
+    console.error('Failed to load unread summary', err);
+  }
+}
+
 function applyHashNavigation() {
   const hash = window.location.hash;
   if (!hash || hash.length <= 1) {
@@ -454,7 +535,11 @@ document.addEventListener('DOMContentLoaded', function () {
   if (bell) {
     bell.addEventListener('click', function () {
       triggerClickGlow(bell);
-      loadNotifications();
+      if (notificationsLoaded) {
+        renderNotifications(notificationItems);
+      } else {
+        loadNotifications();
+      }
     });
   }
 
@@ -473,8 +558,11 @@ document.addEventListener('DOMContentLoaded', function () {
           return;
         }
 
+        notificationItems.forEach((item) => {
+          item.is_read = true;
+        });
         updateNotificationBadge(0);
-        loadNotifications();
+        renderNotifications(notificationItems);
       } catch (err) {
         console.error('Failed to mark all notifications as read', err);
       }
@@ -483,7 +571,9 @@ document.addEventListener('DOMContentLoaded', function () {
 
   initializeSearchNavigation();
   applyHashNavigation();
-  loadNotifications();
+  // Only the badge count on page load; the bell click fetches the list itself.
+  loadUnreadSummary();
+  connectNotificationSocket();
 });
 
 window.addEventListener('resize', function () {
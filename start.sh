@@ -1,5 +1,21 @@
 #!/bin/bash
 python manage.py migrate
 python manage.py collectstatic --noinput
+export EMAIL_OUTBOX_ENABLED=True
+export REPORT_EXPORT_BACKGROUND=True
+
+# Run a background worker, restarting it (and logging why) whenever it exits,
+# so a crash does not silently stop the work it drains.
+supervise() {
+    while true; do
+        "$@"
+        status=$?
+        echo "$(date -u '+%Y-%m-%dT%H:%M:%SZ') '$*' exited with status $status; restarting in 5s" >&2
+        sleep 5
+    done
+}
+
+supervise python manage.py send_outbox --loop &
+supervise python manage.py run_report_exports --loop &
 # daphne -b 0.0.0.0 -p 8080 FemiCare.asgi:application
-daphne -b 0.0.0.0 -p $PORT FemiCare.asgi:application
+CYCLE_MODEL_WARMUP=True daphne -b 0.0.0.0 -p $PORT FemiCare.asgi:application
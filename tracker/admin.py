@@ -12,14 +12,17 @@ from .models import (
     DoctorPaymentDetails,
     DoctorProfile,
     DoctorReview,
+    EmailOutbox,
     EmergencyRequest,
     HealthLog,
     MoodEntry,
     Notification,
+    NotificationMonthlyRollup,
     Payment,
     PayoutBatch,
     PeriodCheckIn,
     PredictionFeedback,
+    ReportExportJob,
     ResourceCategory,
     ResourceItem,
     SymptomLog,
@@ -275,6 +278,39 @@ class NotificationAdmin(admin.ModelAdmin):
     list_select_related = ('user',)
 
 
+@admin.register(NotificationMonthlyRollup)
+class NotificationMonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ('month', 'type', 'total_count', 'pruned_count', 'updated_at')
+    list_filter = ('type',)
+    date_hierarchy = 'month'
+    ordering = ('-month', 'type')
+
+    # Maintained by prune_notifications
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recipient_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('recipient_email', 'subject', 'last_error')
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+
+
+@admin.register(ReportExportJob)
+class ReportExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'created_at', 'started_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__username', 'user__email', 'last_error')
+    ordering = ('-created_at',)
+    list_select_related = ('user',)
+
+
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
     list_display = (
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TrackerConfig(AppConfig):
@@ -6,4 +7,9 @@ class TrackerConfig(AppConfig):
     name = 'tracker'
 
     def ready(self):
-        import tracker.signals
\ No newline at end of file
+        import tracker.signals
+
+        if getattr(settings, 'CYCLE_MODEL_WARMUP', False):
+            from tracker.ml.predict import warm_up
+
+            warm_up()
@@ -0,0 +1,388 @@
+"""
+Channel layer on PostgreSQL LISTEN/NOTIFY, so several ASGI worker processes
+can share groups without running Redis.
+
+Group membership is kept per process: a process LISTENs on a group's
+notification channel while it has at least one local member, and
+``group_send`` issues one NOTIFY that every such process fans out to its own
+members. Specific channels from ``new_channel()`` embed the owning process's
+id, so ``send`` notifies that process only. Members in the sending process
+are served directly, without waiting for the round trip. Callers on any
+other loop, such as management commands and workers going through
+``async_to_sync`` (a fresh loop per call), share one long-lived synchronous
+publishing connection.
+
+NOTIFY payloads must stay under 8000 bytes; larger messages are stored in
+``ChannelLayerPayload`` and the notification carries the row id. Messages
+are JSON-encoded, so their values must be JSON-serializable.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import string
+import threading
+import time
+import uuid
+from copy import deepcopy
+
+from asgiref.sync import sync_to_async
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more (default build).
+NOTIFY_PAYLOAD_LIMIT = 7999
+PAYLOAD_TABLE = 'tracker_channellayerpayload'
+
+
+def _pg_channel_name(kind, name):
+    # LISTEN channels are identifiers (max 63 bytes), so hash arbitrary names.
+    return f'cl_{kind}_{hashlib.sha1(name.encode()).hexdigest()}'
+
+
+class PostgresChannelLayer(BaseChannelLayer):
+    extensions = ['groups', 'flush']
+
+    def __init__(self, expiry=60, capacity=100, channel_capacity=None, conninfo=None, database='default', **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.conninfo = conninfo
+        self.database = database
+        self.client_prefix = uuid.uuid4().hex[:12]
+        self._sync_publisher = None
+        self._sync_publish_lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, loop):
+        """
+        Bind the layer's connections, queues and tasks to `loop`. Anything left
+        over from a previous, closed loop (e.g. an async_to_sync call from a
+        management command) is dropped without awaiting it.
+        """
+        for connection in (getattr(self, '_publisher', None), getattr(self, '_listener', None)):
+            if connection is not None and not connection.closed:
+                connection.pgconn.finish()
+
+        self._loop = loop
+        self._publisher = None
+        self._listener = None
+        self._publish_lock = asyncio.Lock()
+        self._listen_lock = asyncio.Lock()
+        self._listening = set()
+        self._reader_task = None
+        self._dispatch_task = None
+        self._inbox = asyncio.Queue()
+        self._last_prune = 0.0
+        self._last_sweep = 0.0
+        self._receiving = set()
+        self.channels = {}
+        self.groups = {}
+
+    def _on_own_loop(self):
+        """True when running on the loop this layer's connections belong to."""
+        if self._loop is not None and self._loop.is_closed():
+            self._reset(None)
+        return self._loop is asyncio.get_running_loop()
+
+    def _claim_loop(self):
+        """
+        Bind the layer to the running loop the first time it has to listen.
+        Only a loop with local members needs the layer's own connections.
+        """
+        if self._loop is None or self._loop.is_closed():
+            self._reset(asyncio.get_running_loop())
+
+    # Connections
+
+    def _conninfo(self):
+        if self.conninfo:
+            return self.conninfo
+
+        from psycopg.conninfo import make_conninfo
+
+        settings_dict = connections[self.database].settings_dict
+        params = {
+            'dbname': settings_dict['NAME'],
+            'user': settings_dict['USER'],
+            'password': settings_dict['PASSWORD'],
+            'host': settings_dict['HOST'],
+            'port': settings_dict['PORT'],
+            'sslmode': settings_dict['OPTIONS'].get('sslmode'),
+        }
+        return make_conninfo(**{key: value for key, value in params.items() if value})
+
+    async def _connect(self):
+        import psycopg
+
+        return await psycopg.AsyncConnection.connect(self._conninfo(), autocommit=True)
+
+    async def _get_publisher(self):
+        if self._publisher is None or self._publisher.closed:
+            self._publisher = await self._connect()
+        return self._publisher
+
+    # Publishing
+
+    async def _notify(self, pg_channel, envelope):
+        payload = json.dumps(envelope, separators=(',', ':'))
+        if self._on_own_loop():
+            async with self._publish_lock:
+                await self._publish(await self._get_publisher(), pg_channel, payload)
+        else:
+            # async_to_sync runs each call on a fresh loop, so a connection bound
+            # to the loop would be opened and dropped for every message.
+            await sync_to_async(self._publish_sync, thread_sensitive=False)(pg_channel, payload)
+
+    async def _publish(self, connection, pg_channel, payload):
+        if len(payload.encode()) > NOTIFY_PAYLOAD_LIMIT:
+            cursor = await connection.execute(
+                f'INSERT INTO {PAYLOAD_TABLE} (payload, created_at) VALUES (%s, now()) RETURNING id',
+                [payload],
+            )
+            payload_id = (await cursor.fetchone())[0]
+            payload = json.dumps({'ref': payload_id})
+            await self._prune_payloads(connection)
+        await connection.execute('SELECT pg_notify(%s, %s)', [pg_channel, payload])
+
+    def _publish_sync(self, pg_channel, payload):
+        import psycopg
+
+        with self._sync_publish_lock:
+            if self._sync_publisher is None or self._sync_publisher.closed:
+                self._sync_publisher = psycopg.connect(self._conninfo(), autocommit=True)
+            connection = self._sync_publisher
+            if len(payload.encode()) > NOTIFY_PAYLOAD_LIMIT:
+                payload_id = connection.execute(
+                    f'INSERT INTO {PAYLOAD_TABLE} (payload, created_at) VALUES (%s, now()) RETURNING id',
+                    [payload],
+                ).fetchone()[0]
+                payload = json.dumps({'ref': payload_id})
+            connection.execute('SELECT pg_notify(%s, %s)', [pg_channel, payload])
+
+    async def _prune_payloads(self, connection):
+        if time.monotonic() - self._last_prune < self.expiry:
+            return
+        self._last_prune = time.monotonic()
+        await connection.execute(
+            f'DELETE FROM {PAYLOAD_TABLE} WHERE created_at < now() - make_interval(secs => %s)',
+            [self.expiry],
+        )
+
+    # Listening
+
+    async def _ensure_listening(self, pg_channel):
+        self._claim_loop()
+        if pg_channel in self._listening:
+            return
+        await self._set_listening(pg_channel, True)
+
+    async def _set_listening(self, pg_channel, listen):
+        from psycopg import sql
+
+        async with self._listen_lock:
+            if (pg_channel in self._listening) == listen:
+                return
+
+            # notifies() holds the connection lock while it waits, so the reader
+            # is stopped around (UN)LISTEN; notifications that arrive meanwhile
+            # are buffered by psycopg and yielded when it restarts.
+            await self._stop_reader()
+            if self._listener is None or self._listener.closed:
+                self._listener = await self._connect()
+                for name in self._listening:
+                    await self._listener.execute(sql.SQL('LISTEN {}').format(sql.Identifier(name)))
+            statement = 'LISTEN {}' if listen else 'UNLISTEN {}'
+            await self._listener.execute(sql.SQL(statement).format(sql.Identifier(pg_channel)))
+            if listen:
+                self._listening.add(pg_channel)
+            else:
+                self._listening.discard(pg_channel)
+
+            if self._listening:
+                self._reader_task = asyncio.create_task(self._read_notifications())
+            if self._dispatch_task is None:
+                self._dispatch_task = asyncio.create_task(self._dispatch_notifications())
+
+    async def _stop_reader(self):
+        if self._reader_task is None:
+            return
+        self._reader_task.cancel()
+        try:
+            await self._reader_task
+        except asyncio.CancelledError:
+            pass
+        self._reader_task = None
+
+    async def _read_notifications(self):
+        try:
+            async for notify in self._listener.notifies():
+                self._inbox.put_nowait(notify)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception('Channel layer listener failed; it reconnects on the next group change.')
+
+    async def _dispatch_notifications(self):
+        while True:
+            notify = await self._inbox.get()
+            if self._publisher is not None and notify.pid == self._publisher.info.backend_pid:
+                # Sent from this process, which already delivered it locally.
+                continue
+            try:
+                await self._dispatch(notify.payload)
+            except Exception:
+                logger.exception('Could not dispatch channel layer notification on %s', notify.channel)
+
+    async def _dispatch(self, payload):
+        envelope = json.loads(payload)
+        if 'ref' in envelope:
+            async with self._publish_lock:
+                publisher = await self._get_publisher()
+                cursor = await publisher.execute(f'SELECT payload FROM {PAYLOAD_TABLE} WHERE id = %s', [envelope['ref']])
+                row = await cursor.fetchone()
+            if row is None:
+                logger.warning('Channel layer payload %s expired before delivery', envelope['ref'])
+                return
+            envelope = json.loads(row[0])
+
+        if 'group' in envelope:
+            self._deliver_to_group(envelope['group'], envelope['message'])
+            return
+
+        try:
+            self._deliver(envelope['channel'], envelope['message'])
+        except ChannelFull:
+            logger.warning('Dropped channel layer message for full channel %s', envelope['channel'])
+
+    # Local delivery
+
+    def _deliver(self, channel, message):
+        self._clean_expired()
+        queue = self.channels.setdefault(channel, asyncio.Queue(maxsize=self.get_capacity(channel)))
+        try:
+            queue.put_nowait((time.time() + self.expiry, message))
+        except asyncio.QueueFull:
+            raise ChannelFull(channel)
+
+    def _clean_expired(self):
+        """
+        Drop expired messages, and with them the queues of channels nobody is
+        receiving on (a consumer that has gone, a group send that raced its
+        group_discard), at most once a second.
+        """
+        now = time.time()
+        if now - self._last_sweep < 1:
+            return
+        self._last_sweep = now
+        for channel, queue in list(self.channels.items()):
+            # Every message gets the same expiry, so the expired ones are at the front
+            while not queue.empty() and queue._queue[0][0] < now:
+                queue.get_nowait()
+            if queue.empty() and channel not in self._receiving:
+                del self.channels[channel]
+
+    def _deliver_to_group(self, group, message):
+        for channel in list(self.groups.get(group, ())):
+            try:
+                self._deliver(channel, deepcopy(message))
+            except ChannelFull:
+                pass
+
+    def _owner_channel(self, channel):
+        if '!' in channel:
+            owner = self.non_local_name(channel)[:-1].rsplit('.', 1)[-1]
+            return f'cl_p_{owner}'
+        return _pg_channel_name('c', channel)
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_channel_name(channel)
+        assert '__asgi_channel__' not in message
+
+        pg_channel = self._owner_channel(channel)
+        if pg_channel == f'cl_p_{self.client_prefix}' and self._on_own_loop():
+            self._deliver(channel, deepcopy(message))
+            return
+        await self._notify(pg_channel, {'channel': channel, 'message': message})
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        await self._ensure_listening(self._owner_channel(channel))
+
+        queue = self.channels.setdefault(channel, asyncio.Queue(maxsize=self.get_capacity(channel)))
+        self._receiving.add(channel)
+        try:
+            while True:
+                expires_at, message = await queue.get()
+                if expires_at >= time.time():
+                    return message
+        finally:
+            self._receiving.discard(channel)
+            if queue.empty():
+                self.channels.pop(channel, None)
+
+    async def new_channel(self, prefix='specific.'):
+        await self._ensure_listening(f'cl_p_{self.client_prefix}')
+        return '%s%s!%s' % (
+            prefix,
+            self.client_prefix,
+            ''.join(random.choice(string.ascii_letters) for _ in range(12)),
+        )
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._ensure_listening(_pg_channel_name('g', group))
+        self.groups.setdefault(group, set()).add(channel)
+
+    async def group_discard(self, group, channel):
+        self.require_valid_channel_name(channel)
+        self.require_valid_group_name(group)
+        members = self.groups.get(group)
+        if not members:
+            return
+        members.discard(channel)
+        if not members:
+            self.groups.pop(group, None)
+            await self._set_listening(_pg_channel_name('g', group), False)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'Message is not a dict'
+        self.require_valid_group_name(group)
+        if self._on_own_loop():
+            self._deliver_to_group(group, message)
+        await self._notify(_pg_channel_name('g', group), {'group': group, 'message': message})
+
+    # Flush extension
+
+    async def flush(self):
+        await self.close()
+        self.channels = {}
+        self.groups = {}
+
+    async def close(self):
+        with self._sync_publish_lock:
+            if self._sync_publisher is not None:
+                self._sync_publisher.close()
+                self._sync_publisher = None
+
+        if self._loop is not asyncio.get_running_loop():
+            self._reset(None)
+            return
+
+        await self._stop_reader()
+        if self._dispatch_task is not None:
+            self._dispatch_task.cancel()
+            self._dispatch_task = None
+        for connection in (self._publisher, self._listener):
+            if connection is not None:
+                await connection.close()
+        self._publisher = None
+        self._listener = None
+        self._listening = set()
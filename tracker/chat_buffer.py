@@ -0,0 +1,194 @@
+"""
+Write-behind buffer for chat messages received over the WebSocket.
+
+With ``CHAT_WRITE_BEHIND_ENABLED`` the chat consumer broadcasts a message as
+soon as it arrives and queues the row here. The queue is written with one
+``bulk_create`` (plus one conversation UPDATE per room) every
+``CHAT_WRITE_BEHIND_FLUSH_MS`` or as soon as ``CHAT_WRITE_BEHIND_BATCH_SIZE``
+messages are waiting, whichever comes first. Conversation-list updates are
+pushed after each flush, once the counters they carry are stored.
+
+Rows get their ``timestamp`` when they are flushed, so it can trail the
+broadcast by up to the flush interval.
+"""
+import asyncio
+import atexit
+import logging
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from .db_executor import consumer_database_sync_to_async
+from .models import ChatMessage, Conversation
+from .realtime import conversation_update_events, get_room_conversation
+
+logger = logging.getLogger(__name__)
+
+
+def write_behind_enabled():
+    return getattr(settings, 'CHAT_WRITE_BEHIND_ENABLED', False)
+
+
+def _conversation_preview(message):
+    return message.message[:100] if message.message else 'File attachment'
+
+
+def _record_conversations(messages):
+    """
+    One conversation UPDATE per room, folding the batch's unread counts
+    together. Returns {room_name: (unread_doctor, unread_patient)}.
+    """
+    rooms = OrderedDict()
+    for message in messages:
+        if message.is_note:
+            continue
+        room = rooms.setdefault(message.room_name, {'unread_doctor': 0, 'unread_patient': 0})
+        if message.sender.role == 'doctor':
+            room['unread_patient'] += 1
+        else:
+            room['unread_doctor'] += 1
+        room['last_message'] = _conversation_preview(message)
+        room['sent_at'] = message.timestamp
+
+    for room_name, update in rooms.items():
+        Conversation.record_messages(room_name, **update)
+    return {room_name: (update['unread_doctor'], update['unread_patient']) for room_name, update in rooms.items()}
+
+
+def write_messages(messages):
+    """
+    Store a batch and return the conversation-list events to push. If the batch
+    fails as a whole, rows are retried one by one and only the failing ones dropped.
+    """
+    try:
+        with transaction.atomic():
+            ChatMessage.objects.bulk_create(messages)
+            rooms = _record_conversations(messages)
+        failed = 0
+    except Exception:
+        logger.exception('Bulk write of %s buffered chat messages failed; retrying one by one', len(messages))
+        rooms, failed = {}, 0
+        for message in messages:
+            message.pk = None
+            try:
+                with transaction.atomic():
+                    message.save()
+                    for room_name, (unread_doctor, unread_patient) in _record_conversations([message]).items():
+                        doctor_total, patient_total = rooms.get(room_name, (0, 0))
+                        rooms[room_name] = (doctor_total + unread_doctor, patient_total + unread_patient)
+            except Exception:
+                failed += 1
+                logger.exception('Dropped buffered chat message for room %s', message.room_name)
+
+    events = []
+    for room_name, (unread_doctor, unread_patient) in rooms.items():
+        conversation = get_room_conversation(room_name)
+        if conversation is not None:
+            conversation.messages_recorded(unread_doctor, unread_patient)
+            events.extend(conversation_update_events(conversation, 'message'))
+    return events, failed
+
+
+class ChatMessageBuffer:
+    def __init__(self, flush_interval, batch_size):
+        self.flush_interval = flush_interval
+        self.batch_size = max(batch_size, 1)
+        self.pending = []
+        self.stats = {
+            'flushes': 0,
+            'messages': 0,
+            'failed_messages': 0,
+            'last_batch_size': 0,
+            'max_batch_size': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+            'max_wait_ms': 0.0,
+        }
+        self._loop = None
+        self._lock = None
+        self._timer = None
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Timers and locks belong to one loop; queued rows carry over.
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._timer = None
+        return loop
+
+    def add(self, message):
+        loop = self._bind_loop()
+        self.pending.append((time.perf_counter(), message))
+        if len(self.pending) >= self.batch_size:
+            loop.create_task(self.flush())
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, lambda: loop.create_task(self.flush()))
+
+    async def flush(self):
+        self._bind_loop()
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch, self.pending = self.pending, []
+            if not batch:
+                return
+
+            started = time.perf_counter()
+            events, failed = await consumer_database_sync_to_async(write_messages)([message for _, message in batch])
+            self._record_flush(batch, started, failed)
+
+        from channels.layers import get_channel_layer
+
+        channel_layer = get_channel_layer()
+        for group_name, event in events:
+            await channel_layer.group_send(group_name, event)
+
+    def drain(self):
+        """Synchronous flush for interpreter shutdown, when no event loop is running."""
+        batch, self.pending = self.pending, []
+        if batch:
+            started = time.perf_counter()
+            _, failed = write_messages([message for _, message in batch])
+            self._record_flush(batch, started, failed)
+
+    def _record_flush(self, batch, started, failed):
+        finished = time.perf_counter()
+        flush_ms = (finished - started) * 1000
+        stats = self.stats
+        stats['flushes'] += 1
+        stats['messages'] += len(batch) - failed
+        stats['failed_messages'] += failed
+        stats['last_batch_size'] = len(batch)
+        stats['max_batch_size'] = max(stats['max_batch_size'], len(batch))
+        stats['last_flush_ms'] = flush_ms
+        stats['max_flush_ms'] = max(stats['max_flush_ms'], flush_ms)
+        stats['total_flush_ms'] += flush_ms
+        stats['max_wait_ms'] = max(stats['max_wait_ms'], (finished - batch[0][0]) * 1000)
+        logger.debug('Flushed %s buffered chat messages in %.1f ms', len(batch), flush_ms)
+
+    def snapshot(self):
+        stats = dict(self.stats)
+        flushes = stats['flushes'] or 1
+        stats['pending'] = len(self.pending)
+        stats['avg_batch_size'] = (stats['messages'] + stats['failed_messages']) / flushes
+        stats['avg_flush_ms'] = stats['total_flush_ms'] / flushes
+        return stats
+
+
+_buffer = None
+
+
+def get_message_buffer():
+    global _buffer
+    if _buffer is None:
+        _buffer = ChatMessageBuffer(
+            flush_interval=getattr(settings, 'CHAT_WRITE_BEHIND_FLUSH_MS', 200) / 1000,
+            batch_size=getattr(settings, 'CHAT_WRITE_BEHIND_BATCH_SIZE', 50),
+        )
+        atexit.register(_buffer.drain)
+    return _buffer
@@ -1,8 +1,10 @@
 # tracker/consumers.py
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from .models import ChatMessage, User
+from .chat_buffer import get_message_buffer, write_behind_enabled
+from .db_executor import consumer_database_sync_to_async
+from .models import ChatMessage, Conversation, User
+from .realtime import conversation_update_events, get_room_conversation, notification_group_name, user_group_name
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -15,12 +17,6 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
         
-        # Join broadcast group to receive real-time conversation updates
-        await self.channel_layer.group_add(
-            'broadcast',
-            self.channel_name
-        )
-        
         await self.accept()
 
     async def disconnect(self, close_code):
@@ -29,12 +25,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.room_group_name,
             self.channel_name
         )
-        
-        # Leave broadcast group
-        await self.channel_layer.group_discard(
-            'broadcast',
-            self.channel_name
-        )
+
+        # Don't leave this socket's messages waiting in the write-behind buffer
+        if write_behind_enabled():
+            await get_message_buffer().flush()
 
     # Receive message from WebSocket
     async def receive(self, text_data):
@@ -47,7 +41,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             username = self.scope["user"].username
 
             log_message = 'Video call started.' if is_video else 'Audio call started.'
-            await self.save_message(username, self.room_name, log_message, False)
+            await self.store_message(log_message, False)
 
             await self.channel_layer.group_send(
                 self.room_group_name,
@@ -69,17 +63,6 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     'sender': username
                 }
             )
-
-            await self.channel_layer.group_send(
-                'broadcast',
-                {
-                    'type': 'broadcast_message',
-                    'message_type': 'message',
-                    'room_name': self.room_name,
-                    'username': username,
-                    'is_note': False
-                }
-            )
         elif message_type == 'call_answer':
             await self.channel_layer.group_send(
                 self.room_group_name,
@@ -105,7 +88,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             username = self.scope["user"].username
 
             log_message = 'Video call ended.' if is_video else 'Audio call ended.'
-            await self.save_message(username, self.room_name, log_message, False)
+            await self.store_message(log_message, False)
 
             await self.channel_layer.group_send(
                 self.room_group_name,
@@ -126,17 +109,6 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     'sender': username
                 }
             )
-
-            await self.channel_layer.group_send(
-                'broadcast',
-                {
-                    'type': 'broadcast_message',
-                    'message_type': 'message',
-                    'room_name': self.room_name,
-                    'username': username,
-                    'is_note': False
-                }
-            )
         elif message_type == 'call_rejected':
             await self.channel_layer.group_send(
                 self.room_group_name,
@@ -166,20 +138,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
             is_note = data.get('is_note', False)
             username = self.scope["user"].username
 
-            # Save message to database
-            await self.save_message(username, self.room_name, message, is_note)
-            
-            # Broadcast to global channel so chat panels receive real-time updates
-            await self.channel_layer.group_send(
-                'broadcast',
-                {
-                    'type': 'broadcast_message',
-                    'message_type': 'message',
-                    'room_name': self.room_name,
-                    'username': username,
-                    'is_note': is_note
-                }
-            )
+            # Save (or queue) the message and update both conversation lists
+            await self.store_message(message, is_note)
 
             # Send message to room group
             await self.channel_layer.group_send(
@@ -202,15 +162,20 @@ class ChatConsumer(AsyncWebsocketConsumer):
             'is_note': event['is_note']
         }))
     
-    # Handle broadcast messages for real-time conversation updates
-    async def broadcast_message(self, event):
-        # Send broadcast notification to WebSocket
-        # This allows chat panels to refresh conversation lists in real-time
-        await self.send(text_data=json.dumps({
-            'type': 'broadcast',
-            'message_type': event['message_type'],
-            'room_name': event['room_name']
-        }))
+    async def store_message(self, message, is_note):
+        if write_behind_enabled():
+            # The buffer pushes conversation updates once the batch is stored
+            get_message_buffer().add(ChatMessage(
+                room_name=self.room_name,
+                sender=self.scope['user'],
+                message=message,
+                is_note=is_note,
+            ))
+            return
+
+        # Notify both participants' conversation lists (notes stay private)
+        for group_name, event in await self.save_message(self.scope['user'].username, self.room_name, message, is_note):
+            await self.channel_layer.group_send(group_name, event)
 
     # Handle WebRTC signaling messages
     async def webrtc_signal(self, event):
@@ -245,9 +210,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'sender': event['username']
             }))
 
-    @database_sync_to_async
+    @consumer_database_sync_to_async
     def save_message(self, username, room_name, message, is_note):
-        from django.utils import timezone
+        """Store the message; unless it is a note, return the conversation-list events to push."""
         user = User.objects.get(username=username)
         chat_message = ChatMessage.objects.create(
             room_name=room_name,
@@ -255,43 +220,33 @@ class ChatConsumer(AsyncWebsocketConsumer):
             message=message,
             is_note=is_note
         )
-        
-        # Update conversation if not a note
-        if not is_note:
-            from .models import Conversation
-            try:
-                # Extract doctor and patient IDs from room_name format: chat_patientID_doctorID
-                parts = room_name.split('_')
-                if len(parts) >= 3:
-                    patient_id = int(parts[1])
-                    doctor_id = int(parts[2])
-                    
-                    conversation = Conversation.objects.filter(
-                        doctor_id=doctor_id,
-                        patient_id=patient_id
-                    ).first()
-                    
-                    if conversation:
-                        conversation.last_message = message[:100] if message else 'File attachment'
-                        conversation.last_message_time = timezone.now()
-                        
-                        # Increment unread count for the receiver
-                        if user.role == 'doctor':
-                            conversation.unread_count_patient += 1
-                        else:
-                            conversation.unread_count_doctor += 1
-                        
-                        conversation.save()
-            except Exception as e:
-                print(f"Error updating conversation: {e}")
-        
-        return chat_message
+        if is_note:
+            return []
+
+        # Update the conversation, then load it once for both the cache refresh and the events
+        increments = Conversation.unread_increments(user)
+        try:
+            Conversation.record_messages(
+                room_name,
+                message[:100] if message else 'File attachment',
+                chat_message.timestamp,
+                **increments,
+            )
+            conversation = get_room_conversation(room_name)
+        except Exception as e:
+            print(f"Error updating conversation: {e}")
+            return []
+        if conversation is None:
+            return []
+        conversation.messages_recorded(**increments)
+        return conversation_update_events(conversation, 'message')
 
 
 class BroadcastConsumer(AsyncWebsocketConsumer):
     """
-    WebSocket consumer for broadcasting real-time conversation updates.
-    Used by chat panels to refresh conversation lists when new messages arrive.
+    WebSocket consumer for real-time conversation list updates.
+    Each socket joins its own user's group, so it only hears about
+    conversations that user takes part in.
     """
     
     async def connect(self):
@@ -301,23 +256,64 @@ class BroadcastConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
         
-        # Join the broadcast group
+        # Join this user's group
+        self.user_group_name = user_group_name(user.id)
         await self.channel_layer.group_add(
-            'broadcast',
+            self.user_group_name,
             self.channel_name
         )
         await self.accept()
     
     async def disconnect(self, close_code):
-        # Leave the broadcast group
-        await self.channel_layer.group_discard(
-            'broadcast',
-            self.channel_name
-        )
+        # Leave this user's group (never joined if the socket was rejected)
+        if hasattr(self, 'user_group_name'):
+            await self.channel_layer.group_discard(
+                self.user_group_name,
+                self.channel_name
+            )
     
-    async def broadcast_message(self, event):
-        # Send the broadcast message to the WebSocket
+    async def conversation_update(self, event):
+        # Send the changed conversation's summary to the WebSocket
         await self.send(text_data=json.dumps({
-            'type': 'message',
-            'room_name': event['room_name']
-        }))
\ No newline at end of file
+            'type': event['event'],
+            'conversation': event['conversation']
+        }))
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    WebSocket consumer for a user's new notifications.
+    The page loads the list once; each notification created afterwards
+    arrives here already resolved, with the new unread count.
+    """
+
+    async def connect(self):
+        # Only allow authenticated users. Accept first so the 4401 reaches the
+        # page, which stops reconnecting; a rejected handshake looks like 1006.
+        user = self.scope['user']
+        if not user.is_authenticated:
+            await self.accept()
+            await self.close(code=4401)
+            return
+
+        self.notification_group_name = notification_group_name(user.id)
+        await self.channel_layer.group_add(
+            self.notification_group_name,
+            self.channel_name
+        )
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'notification_group_name'):
+            await self.channel_layer.group_discard(
+                self.notification_group_name,
+                self.channel_name
+            )
+
+    async def notifications_created(self, event):
+        for notification in event['notifications']:
+            await self.send(text_data=json.dumps({
+                'type': 'notification',
+                'notification': notification,
+                'unread_count': event['unread_count']
+            }))
@@ -0,0 +1,130 @@
+"""
+Thread pool for the Channels consumers' database work.
+
+``database_sync_to_async`` is thread-sensitive by default, which funnels
+every consumer's queries on a worker through one thread, so a slow save in
+one room delays all the others. Consumers use ``consumer_database_sync_to_async``
+instead, which runs on a pool of ``CONSUMER_DB_POOL_SIZE`` threads. Each
+thread keeps its own persistent connection (``CONN_MAX_AGE``), so the pool
+size is what this worker takes from the database's connection budget.
+Setting it to 0 restores the thread-sensitive default.
+"""
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from channels.db import DatabaseSyncToAsync, database_sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+class ConsumerDBExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that records queue depth and how long work waits for a thread."""
+
+    def __init__(self, max_workers):
+        super().__init__(max_workers=max_workers, thread_name_prefix='consumer-db')
+        self._stats_lock = threading.Lock()
+        self._recent_waits = deque(maxlen=1000)
+        self.stats = {
+            'tasks': 0,
+            'queue_depth': 0,
+            'max_queue_depth': 0,
+            'in_flight': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'total_run_ms': 0.0,
+            'max_run_ms': 0.0,
+        }
+
+    def submit(self, fn, /, *args, **kwargs):
+        submitted = time.perf_counter()
+        with self._stats_lock:
+            self.stats['queue_depth'] += 1
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self.stats['queue_depth'])
+
+        def run():
+            started = time.perf_counter()
+            self._record_start((started - submitted) * 1000)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._record_finish((time.perf_counter() - started) * 1000)
+
+        return super().submit(run)
+
+    def _record_start(self, wait_ms):
+        with self._stats_lock:
+            stats = self.stats
+            stats['queue_depth'] -= 1
+            stats['in_flight'] += 1
+            stats['tasks'] += 1
+            stats['total_wait_ms'] += wait_ms
+            stats['max_wait_ms'] = max(stats['max_wait_ms'], wait_ms)
+            self._recent_waits.append(wait_ms)
+
+    def _record_finish(self, run_ms):
+        with self._stats_lock:
+            stats = self.stats
+            stats['in_flight'] -= 1
+            stats['total_run_ms'] += run_ms
+            stats['max_run_ms'] = max(stats['max_run_ms'], run_ms)
+
+    async def run(self, func, *args, **kwargs):
+        return await DatabaseSyncToAsync(func, thread_sensitive=False, executor=self)(*args, **kwargs)
+
+    def close_connections(self):
+        """
+        Close the database connection held by every pool thread. Each of
+        ``max_workers`` tasks waits at a barrier until all of them are running,
+        which puts exactly one on every thread.
+        """
+        barrier = threading.Barrier(self._max_workers)
+
+        def close():
+            barrier.wait()
+            connections.close_all()
+
+        futures = [super(ConsumerDBExecutor, self).submit(close) for _ in range(self._max_workers)]
+        for future in futures:
+            future.result()
+
+    def snapshot(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+            recent_waits = sorted(self._recent_waits)
+        tasks = stats['tasks'] or 1
+        stats['pool_size'] = self._max_workers
+        stats['avg_wait_ms'] = stats['total_wait_ms'] / tasks
+        stats['avg_run_ms'] = stats['total_run_ms'] / tasks
+        stats['p95_wait_ms'] = recent_waits[int(len(recent_waits) * 0.95) - 1] if len(recent_waits) > 1 else stats['max_wait_ms']
+        return stats
+
+
+_executor = None
+
+
+def get_consumer_db_executor():
+    """The shared pool, or None when CONSUMER_DB_POOL_SIZE is 0."""
+    global _executor
+    pool_size = getattr(settings, 'CONSUMER_DB_POOL_SIZE', 10)
+    if pool_size <= 0:
+        return None
+    if _executor is None or _executor._max_workers != pool_size:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ConsumerDBExecutor(max_workers=pool_size)
+    return _executor
+
+
+def consumer_database_sync_to_async(func):
+    """``database_sync_to_async`` on the consumer pool instead of the shared thread."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        executor = get_consumer_db_executor()
+        if executor is None:
+            return await database_sync_to_async(func)(*args, **kwargs)
+        return await executor.run(func, *args, **kwargs)
+
+    return wrapper
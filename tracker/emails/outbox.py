@@ -0,0 +1,123 @@
+import logging
+from datetime import timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from tracker.models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed batch stays invisible to other workers before it is retried.
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def outbox_enabled() -> bool:
+    return getattr(settings, "EMAIL_OUTBOX_ENABLED", False)
+
+
+def enqueue_email(
+    *,
+    subject: str,
+    recipient_email: str,
+    text_body: str,
+    html_body: str = "",
+    template_name: str = "",
+) -> EmailOutbox:
+    return EmailOutbox.objects.create(
+        recipient_email=recipient_email,
+        subject=subject,
+        text_body=text_body,
+        html_body=html_body,
+        template_name=template_name,
+    )
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    base_seconds = getattr(settings, "EMAIL_OUTBOX_RETRY_BASE_SECONDS", 60)
+    max_seconds = getattr(settings, "EMAIL_OUTBOX_RETRY_MAX_SECONDS", 3600)
+    return timedelta(seconds=min(base_seconds * (2 ** max(attempts - 1, 0)), max_seconds))
+
+
+def claim_due_batch(batch_size: int) -> List[EmailOutbox]:
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.filter(status="pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        EmailOutbox.objects.filter(pk__in=[item.pk for item in batch]).update(next_attempt_at=now + CLAIM_LEASE)
+    return batch
+
+
+def _record_failure(item: EmailOutbox, exc: Exception, max_attempts: int) -> str:
+    item.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+    if item.attempts >= max_attempts:
+        item.status = "dead"
+        return "dead"
+
+    item.next_attempt_at = timezone.now() + _retry_delay(item.attempts)
+    return "retried"
+
+
+def _reopen(connection) -> None:
+    """Continue the rest of a batch on a fresh connection after a failed send."""
+    connection.close()
+    try:
+        connection.open()
+    except Exception:
+        logger.warning("Could not reopen email connection; remaining messages will connect individually.")
+
+
+def deliver_outbox_batch(batch_size: int = 100, connection=None) -> Dict[str, int]:
+    """Send one claimed batch over a single SMTP connection and record each outcome."""
+    counts = {"sent": 0, "retried": 0, "dead": 0}
+    batch = claim_due_batch(batch_size)
+    if not batch:
+        return counts
+
+    max_attempts = max(int(getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5)), 1)
+    connection = connection or get_connection()
+    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", None)
+
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.exception("Could not open email connection for outbox batch of %s", len(batch))
+        for item in batch:
+            item.attempts += 1
+            counts[_record_failure(item, exc, max_attempts)] += 1
+    else:
+        for item in batch:
+            item.attempts += 1
+            message = EmailMultiAlternatives(
+                subject=item.subject,
+                body=item.text_body,
+                from_email=from_email,
+                to=[item.recipient_email],
+                connection=connection,
+            )
+            if item.html_body:
+                message.attach_alternative(item.html_body, "text/html")
+
+            try:
+                message.send()
+            except Exception as exc:
+                logger.exception("Failed sending outbox email id=%s recipient=%s", item.pk, item.recipient_email)
+                counts[_record_failure(item, exc, max_attempts)] += 1
+                _reopen(connection)
+                continue
+
+            item.status = "sent"
+            item.sent_at = timezone.now()
+            item.last_error = ""
+            counts["sent"] += 1
+    finally:
+        connection.close()
+
+    EmailOutbox.objects.bulk_update(batch, ["status", "attempts", "next_attempt_at", "last_error", "sent_at"])
+    return counts
@@ -133,6 +133,25 @@ def _send_templated_email(
     html_content = render_to_string(html_template, context)
     text_content = render_to_string(text_template, context)
 
+    from tracker.emails.outbox import enqueue_email, outbox_enabled
+
+    if outbox_enabled():
+        # Queued in the caller's transaction; the send_outbox worker delivers it.
+        try:
+            enqueue_email(
+                subject=subject,
+                recipient_email=recipient_email,
+                text_body=text_content,
+                html_body=html_content,
+                template_name=html_template,
+            )
+            return True
+        except Exception:
+            logger.exception("Failed queueing email template=%s recipient=%s", html_template, recipient_email)
+            if fail_silently:
+                return False
+            raise
+
     message = EmailMultiAlternatives(
         subject=subject,
         body=text_content,
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tracker.models import Notification
+from tracker.views import _fill_default_targets
+
+
+class Command(BaseCommand):
+    help = 'Store the default navigation target on notifications created without one.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows resolved and written per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Count the rows without writing targets.')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        dry_run = options['dry_run']
+
+        pending = (
+            Notification.objects.filter(target_url='', target_section_id='')
+            .only('id', 'user_id', 'type', 'title', 'message', 'target_url', 'target_section_id')
+            .order_by('id')
+        )
+
+        started = time.perf_counter()
+        resolved = 0
+        last_id = 0
+
+        # Keyset batches, so an interrupted run simply resumes with the rows still empty.
+        while True:
+            batch = list(pending.filter(id__gt=last_id)[:chunk_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            _fill_default_targets(batch)
+            if not dry_run:
+                with transaction.atomic():
+                    Notification.objects.bulk_update(batch, ['target_url', 'target_section_id'], batch_size=chunk_size)
+            resolved += len(batch)
+
+        elapsed = time.perf_counter() - started
+        rate = resolved / elapsed if elapsed else 0
+        verb = 'Would backfill' if dry_run else 'Backfilled'
+        self.stdout.write(
+            self.style.SUCCESS(f'{verb} targets for {resolved} notifications in {elapsed:.2f}s ({rate:.0f} rows/s).')
+        )
@@ -0,0 +1,83 @@
+import asyncio
+import statistics
+import time
+
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from tracker.channel_layers import PostgresChannelLayer
+
+
+async def _measure(sender, receiver, messages, payload_size):
+    """group_send from `sender`, receive on a channel of `receiver`."""
+    channel = await receiver.new_channel()
+    await receiver.group_add('benchmark', channel)
+    body = 'x' * payload_size
+
+    latencies = []
+    for number in range(messages):
+        started = time.perf_counter()
+        await sender.group_send('benchmark', {'type': 'benchmark.message', 'number': number, 'body': body})
+        await receiver.receive(channel)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for number in range(messages):
+        await sender.group_send('benchmark', {'type': 'benchmark.message', 'number': number, 'body': body})
+    for _ in range(messages):
+        await receiver.receive(channel)
+    burst = time.perf_counter() - started
+
+    await receiver.group_discard('benchmark', channel)
+    latencies.sort()
+    return {
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0],
+        'throughput': messages / burst if burst else 0,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare group_send latency and throughput of the in-memory and PostgreSQL channel layers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500, help='Messages per measurement.')
+        parser.add_argument(
+            '--payload-size',
+            type=int,
+            action='append',
+            help='Message body size in bytes; repeatable. Defaults to 200 and 20000 (table fallback).',
+        )
+
+    def handle(self, *args, **options):
+        messages = max(options['messages'], 1)
+        payload_sizes = options['payload_size'] or [200, 20000]
+
+        for payload_size in payload_sizes:
+            layer = InMemoryChannelLayer(capacity=messages)
+            self._report('in-memory (one process)', payload_size, asyncio.run(_measure(layer, layer, messages, payload_size)))
+
+            if connection.vendor != 'postgresql':
+                self.stdout.write('  postgres: skipped, the default database is not PostgreSQL')
+                continue
+
+            # Two layer instances have separate process ids and connections, so every
+            # message makes the same NOTIFY round trip it would between two workers.
+            results = asyncio.run(self._measure_postgres(messages, payload_size))
+            self._report('postgres (across layers)', payload_size, results)
+
+    async def _measure_postgres(self, messages, payload_size):
+        sender = PostgresChannelLayer(capacity=messages)
+        receiver = PostgresChannelLayer(capacity=messages)
+        try:
+            return await _measure(sender, receiver, messages, payload_size)
+        finally:
+            await sender.close()
+            await receiver.close()
+
+    def _report(self, name, payload_size, results):
+        self.stdout.write(
+            f'{name}, {payload_size} B: p50 {results["p50"] * 1000:.3f} ms, '
+            f'p95 {results["p95"] * 1000:.3f} ms, {results["throughput"]:.0f} msg/s'
+        )
@@ -0,0 +1,64 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+IMPORT_PROBE = """
+import os, sys, time
+sys.path.insert(0, {base_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+import django
+django.setup()
+started = time.perf_counter()
+import tracker.ml.predict as predict
+imported = time.perf_counter()
+predict.predict_cycle([28, 5, 5, 3, 2, 0, 22.0])
+first_call = time.perf_counter()
+print(imported - started, first_call - imported, 'xgboost' in sys.modules)
+"""
+
+
+class Command(BaseCommand):
+    help = 'Measure import-time and first-call latency of the lazily loaded cycle prediction model.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreter runs to average over.')
+        parser.add_argument('--calls', type=int, default=200, help='Warm predict_cycle calls to time.')
+
+    def handle(self, *args, **options):
+        runs = max(options['runs'], 1)
+        probe = IMPORT_PROBE.format(
+            base_dir=str(settings.BASE_DIR),
+            settings_module=os.environ.get('DJANGO_SETTINGS_MODULE', 'FemiCare.settings'),
+        )
+        env = dict(os.environ, CYCLE_MODEL_WARMUP='False')
+
+        import_times = []
+        first_call_times = []
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, '-c', probe],
+                check=True,
+                capture_output=True,
+                text=True,
+                env=env,
+            ).stdout.split()
+            import_times.append(float(output[0]))
+            first_call_times.append(float(output[1]))
+
+        from tracker.ml.predict import predict_cycle, warm_up
+
+        warm_up()
+        warm_times = []
+        for _ in range(max(options['calls'], 1)):
+            started = time.perf_counter()
+            predict_cycle([28, 5, 5, 3, 2, 0, 22.0])
+            warm_times.append(time.perf_counter() - started)
+
+        self.stdout.write(f'Module import (median of {runs}): {statistics.median(import_times) * 1000:.2f} ms')
+        self.stdout.write(f'First predict_cycle call, incl. model load (median of {runs}): {statistics.median(first_call_times) * 1000:.2f} ms')
+        self.stdout.write(f'Warm predict_cycle call (median of {len(warm_times)}): {statistics.median(warm_times) * 1000:.3f} ms')
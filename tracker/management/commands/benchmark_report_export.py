@@ -0,0 +1,133 @@
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from tracker.models import CycleLog, MoodEntry, SymptomLog, User
+from tracker.reports import ReportDataset
+from tracker.views import _build_pdf_report_data, _DateWindow
+
+SYMPTOMS = ['Cramps', 'Fatigue', 'Headache', 'Bloating', 'Back Pain', 'Acne', 'Nausea', 'Pelvic Pain']
+MOODS = [code for code, _ in MoodEntry.MOOD_CHOICES]
+
+
+def _scan_cycle_counts(cycle_logs, mood_entries, symptom_entries, today):
+    """Per-cycle counts the way the report used to find them: a full pass over every entry per cycle."""
+    counts = []
+    for log in cycle_logs:
+        reference_date = log.last_period_start or log.predicted_start_date or today
+        window_start = reference_date - timedelta(days=1)
+        window_end = reference_date + timedelta(days=2)
+        moods = Counter(mood for mood, day in mood_entries if window_start <= day <= window_end)
+        symptoms = Counter(
+            symptom
+            for symptom, day in symptom_entries
+            if day == reference_date or (log.id and reference_date <= day <= reference_date + timedelta(days=6))
+        )
+        counts.append((moods, symptoms))
+    return counts
+
+
+def _windowed_cycle_counts(cycle_logs, mood_entries, symptom_entries, today):
+    mood_window = _DateWindow(mood_entries)
+    symptom_window = _DateWindow(symptom_entries)
+    counts = []
+    for log in cycle_logs:
+        reference_date = log.last_period_start or log.predicted_start_date or today
+        counts.append((
+            mood_window.count(reference_date - timedelta(days=1), reference_date + timedelta(days=2)),
+            symptom_window.count(reference_date, reference_date + timedelta(days=6) if log.id else reference_date),
+        ))
+    return counts
+
+
+class Command(BaseCommand):
+    help = 'Time the PDF report data build for a synthetic user with years of daily mood and symptom logs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=10, help='Years of daily logs to generate.')
+        parser.add_argument('--symptoms-per-day', type=int, default=3, help='Symptom entries logged each day.')
+        parser.add_argument('--seed', type=int, default=7, help='Random seed for the synthetic logs.')
+
+    def handle(self, *args, **options):
+        days = max(options['years'], 1) * 365
+        symptoms_per_day = min(max(options['symptoms_per_day'], 1), len(SYMPTOMS))
+        rng = random.Random(options['seed'])
+
+        # The synthetic user and its logs only ever exist inside this transaction,
+        # which is rolled back, so nothing is left in (or committed to) the real tables.
+        # The dataset is built directly rather than through get_report_dataset, so
+        # the shared cache never holds data for a user that was never committed.
+        with transaction.atomic():
+            try:
+                user = User.objects.create(username=f'reportbench-{uuid.uuid4().hex[:8]}', role='user')
+                self._create_logs(user, days, symptoms_per_day, rng)
+
+                started = time.perf_counter()
+                dataset = ReportDataset(user.id)
+                load_seconds = time.perf_counter() - started
+
+                today = timezone.localdate()
+                args = (dataset.cycle_logs, dataset.mood_entries, dataset.symptom_entries, today)
+                started = time.perf_counter()
+                scanned = _scan_cycle_counts(*args)
+                scan_seconds = time.perf_counter() - started
+
+                started = time.perf_counter()
+                windowed = _windowed_cycle_counts(*args)
+                window_seconds = time.perf_counter() - started
+                if windowed != scanned:
+                    raise CommandError('Windowed per-cycle counts differ from the full scan.')
+
+                started = time.perf_counter()
+                _build_pdf_report_data(user, dataset)
+                build_seconds = time.perf_counter() - started
+            finally:
+                transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'{len(dataset.cycle_logs)} cycles, {len(dataset.mood_entries)} mood and '
+            f'{len(dataset.symptom_entries)} symptom entries loaded in {load_seconds * 1000:.0f} ms'
+        )
+        self.stdout.write(
+            f'per-cycle counts: full scan {scan_seconds * 1000:.1f} ms, bisect windows {window_seconds * 1000:.1f} ms '
+            f'({scan_seconds / window_seconds if window_seconds else 0:.0f}x)'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Report data built in {build_seconds * 1000:.1f} ms.'))
+
+    def _create_logs(self, user, days, symptoms_per_day, rng):
+        first_day = timezone.localdate() - timedelta(days=days - 1)
+        MoodEntry.objects.bulk_create(
+            [MoodEntry(user=user, mood=rng.choice(MOODS), date=first_day + timedelta(days=offset)) for offset in range(days)],
+            batch_size=2000,
+        )
+        SymptomLog.objects.bulk_create(
+            [
+                SymptomLog(user=user, symptom=symptom, date=first_day + timedelta(days=offset))
+                for offset in range(days)
+                for symptom in rng.sample(SYMPTOMS, symptoms_per_day)
+            ],
+            batch_size=2000,
+        )
+        CycleLog.objects.bulk_create(
+            [
+                CycleLog(
+                    user=user,
+                    last_period_start=first_day + timedelta(days=offset),
+                    length_of_cycle=28,
+                    length_of_menses=5,
+                    mean_menses_length=5,
+                    mean_bleeding_intensity=2,
+                    total_menses_score=3,
+                    height_cm=165,
+                    weight_kg=62,
+                )
+                for offset in range(0, days, 28)
+            ],
+            batch_size=2000,
+        )
@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tracker.models import Appointment, ChatMessage, CycleLog, DoctorAvailability, Notification, SymptomLog
+from tracker.views import EMERGENCY_ALERT_TITLE
+
+
+def _hot_path_queries():
+    """
+    (description, queryset, expected index, filters on a boolean index column)
+    for the dashboard, chat and alert paths.
+    """
+    today = timezone.localdate()
+    now = timezone.now()
+    return [
+        (
+            'chat history (timestamp order)',
+            ChatMessage.objects.filter(room_name='chat_1_2', is_note=False).order_by('timestamp'),
+            'chatmsg_room_note_ts_idx',
+            True,
+        ),
+        (
+            'chat history page (keyset on id)',
+            ChatMessage.objects.filter(room_name='chat_1_2', is_note=False, id__lt=1000).order_by('-id')[:51],
+            'chatmsg_room_note_id_idx',
+            True,
+        ),
+        (
+            'unread notifications',
+            Notification.objects.filter(user_id=1, is_read=False).order_by('-created_at'),
+            'notif_user_read_created_idx',
+            True,
+        ),
+        (
+            'alert cooldown lookup',
+            Notification.objects.filter(
+                user_id=1,
+                title=EMERGENCY_ALERT_TITLE,
+                created_at__gte=now - timedelta(hours=24),
+            ),
+            'notif_user_title_created_idx',
+            False,
+        ),
+        (
+            "dashboard today's symptoms",
+            SymptomLog.objects.filter(user_id=1, date=today),
+            'symptomlog_user_date_idx',
+            False,
+        ),
+        (
+            'dashboard tracked symptoms',
+            SymptomLog.objects.filter(user_id=1, source='manual').order_by('-created_at'),
+            'symptomlog_user_src_crt_idx',
+            False,
+        ),
+        (
+            'dashboard active cycle',
+            CycleLog.objects.filter(user_id=1, last_period_start__lte=today).order_by('-last_period_start'),
+            'cyclelog_user_start_idx',
+            False,
+        ),
+        (
+            'doctor open slots',
+            DoctorAvailability.objects.filter(doctor_id=1, is_active=True, date__gte=today).order_by('date', 'start_time'),
+            'availability_doc_active_idx',
+            True,
+        ),
+        (
+            'overdue unpaid appointments',
+            Appointment.objects.filter(status='awaiting_payment', payment_due_at__lt=now),
+            'appointment_status_due_idx',
+            False,
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the dashboard, chat and alert hot-path queries and verify they use their composite indexes.'
+
+    def handle(self, *args, **options):
+        missing = []
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Small or empty tables make a sequential scan look cheapest; we only
+                # want to know whether the planner *can* use the index.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for description, queryset, index_name, boolean_filter in _hot_path_queries():
+                if boolean_filter and connection.vendor != 'postgresql':
+                    # Django compiles is_x=False to "NOT is_x", which only PostgreSQL
+                    # can match against an index column.
+                    self.stdout.write(f'[SKIP] {description}: boolean index column, checked on PostgreSQL only')
+                    continue
+
+                plan = queryset.explain()
+                uses_index = index_name in plan
+                if not uses_index:
+                    missing.append(description)
+                marker = 'OK' if uses_index else 'MISSING'
+                self.stdout.write(f'[{marker}] {description}: expected {index_name}')
+                if not uses_index or options['verbosity'] > 1:
+                    self.stdout.write(f'    {plan}')
+
+        if missing:
+            raise CommandError(f'{len(missing)} hot-path queries do not use their index: {", ".join(missing)}')
+        self.stdout.write(self.style.SUCCESS('All hot-path queries use their composite indexes.'))
@@ -1,26 +1,59 @@
+import time
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
-from tracker.models import Appointment
+from tracker.management.sharding import (
+    add_sharding_arguments,
+    parse_shard,
+    run_sharded,
+    shard_pk_ranges,
+    write_shard_report,
+)
+from tracker.models import Appointment, DoctorAvailability
+
+
+def _overdue_appointments(now):
+    return Appointment.objects.filter(
+        status='awaiting_payment',
+        payment_due_at__isnull=False,
+        payment_due_at__lt=now,
+    )
+
+
+def expire_appointment_range(low, high, now):
+    with transaction.atomic():
+        overdue = list(
+            _overdue_appointments(now)
+            .filter(pk__gte=low, pk__lte=high)
+            .select_for_update()
+            .values_list('pk', 'availability_id')
+        )
+        DoctorAvailability.objects.filter(pk__in=[slot_id for _, slot_id in overdue]).update(is_active=True)
+        Appointment.objects.filter(pk__in=[appointment_id for appointment_id, _ in overdue]).delete()
+    return {'processed': len(overdue)}
 
 
 class Command(BaseCommand):
     help = 'Expire awaiting-payment appointments that passed payment_due_at and release their slots.'
 
+    def add_arguments(self, parser):
+        add_sharding_arguments(parser)
+
     def handle(self, *args, **options):
         now = timezone.localtime(timezone.now())
-        overdue = Appointment.objects.filter(
-            status='awaiting_payment',
-            payment_due_at__isnull=False,
-            payment_due_at__lt=now,
-        ).select_related('availability')
-
-        expired_count = 0
-        for appt in overdue:
-            slot = appt.availability
-            slot.is_active = True
-            slot.save(update_fields=['is_active'])
-            appt.delete()
-            expired_count += 1
+        workers = max(options['workers'], 1)
+        pk_ranges = shard_pk_ranges(
+            _overdue_appointments(now),
+            shard=parse_shard(options['shard']),
+            workers=workers,
+        )
+
+        started = time.perf_counter()
+        results = run_sharded(expire_appointment_range, pk_ranges, workers=workers, args=(now,))
+        elapsed = time.perf_counter() - started
 
+        write_shard_report(self, results, elapsed, 'appointments')
+        expired_count = sum(result['processed'] for result in results)
         self.stdout.write(self.style.SUCCESS(f'Expired unpaid appointments: {expired_count}'))
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+from tracker.consumers import ChatConsumer
+from tracker.db_executor import get_consumer_db_executor
+from tracker.models import ChatMessage, Conversation, User
+
+
+async def _chat(room_name, patient, messages, latencies):
+    """Send `messages` chat messages in one room, timing each until its echo arrives."""
+    communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/ws/chat/{room_name}/')
+    communicator.scope['user'] = patient
+    communicator.scope['url_route'] = {'kwargs': {'room_name': room_name}}
+    connected, _ = await communicator.connect()
+    assert connected, f'{room_name} did not connect'
+    try:
+        for number in range(messages):
+            started = time.perf_counter()
+            # The echo is broadcast after the message is saved, so this covers the write.
+            await communicator.send_to(text_data=json.dumps({'message': f'Load test {number}'}))
+            await communicator.receive_from(timeout=60)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        await communicator.disconnect()
+
+
+async def _run_rooms(rooms, messages):
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(_chat(room_name, patient, messages, latencies) for room_name, patient in rooms))
+    return latencies, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Measure chat message latency with many rooms chatting at once, per consumer DB pool size.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=200, help='Concurrent chat rooms.')
+        parser.add_argument('--messages', type=int, default=5, help='Messages sent in each room.')
+        parser.add_argument(
+            '--db-latency-ms',
+            type=float,
+            default=0,
+            help='Extra round-trip time added to every query, to mimic a database across the network.',
+        )
+        parser.add_argument(
+            '--pool-size',
+            type=int,
+            action='append',
+            help='Consumer DB pool size; repeatable. 0 is the shared thread-sensitive thread. '
+                 'Defaults to 0 and CONSUMER_DB_POOL_SIZE.',
+        )
+
+    def handle(self, *args, **options):
+        room_count = max(options['rooms'], 1)
+        messages = max(options['messages'], 1)
+        pool_sizes = options['pool_size'] or [0, getattr(settings, 'CONSUMER_DB_POOL_SIZE', 10)]
+
+        prefix = f'loadtest-{uuid.uuid4().hex[:8]}'
+        rooms = self._create_rooms(prefix, room_count)
+
+        latency = options['db_latency_ms'] / 1000
+
+        def delay_queries(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            connection.execute_wrappers.append(delay_queries)
+
+        if latency:
+            # Only connections opened from here on, i.e. the consumers' threads.
+            connection_created.connect(add_latency)
+        try:
+            for pool_size in pool_sizes:
+                with override_settings(CONSUMER_DB_POOL_SIZE=pool_size):
+                    latencies, elapsed = asyncio.run(_run_rooms(rooms, messages))
+                    executor = get_consumer_db_executor()
+                    self._report(pool_size, room_count, latencies, elapsed, executor)
+                    if executor is not None:
+                        executor.close_connections()
+        finally:
+            connection_created.disconnect(add_latency)
+            ChatMessage.objects.filter(room_name__in=[room_name for room_name, _ in rooms]).delete()
+            User.objects.filter(username__startswith=prefix).delete()
+            connections.close_all()
+
+    def _create_rooms(self, prefix, room_count):
+        User.objects.bulk_create(
+            [User(username=f'{prefix}-p{number}', role='user') for number in range(room_count)]
+            + [User(username=f'{prefix}-d{number}', role='doctor') for number in range(room_count)]
+        )
+        users = {user.username: user for user in User.objects.filter(username__startswith=prefix)}
+
+        rooms, conversations = [], []
+        for number in range(room_count):
+            patient, doctor = users[f'{prefix}-p{number}'], users[f'{prefix}-d{number}']
+            room_name = f'chat_{patient.id}_{doctor.id}'
+            conversations.append(Conversation(doctor=doctor, patient=patient, room_name=room_name))
+            rooms.append((room_name, patient))
+        Conversation.objects.bulk_create(conversations)
+        return rooms
+
+    def _report(self, pool_size, room_count, latencies, elapsed, executor):
+        latencies.sort()
+        name = f'pool of {pool_size}' if executor is not None else 'shared thread'
+        self.stdout.write(
+            f'{name}, {room_count} rooms: p50 {statistics.median(latencies) * 1000:.1f} ms, '
+            f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, '
+            f'max {latencies[-1] * 1000:.1f} ms, {len(latencies) / elapsed:.0f} msg/s'
+        )
+        if executor is not None:
+            stats = executor.snapshot()
+            self.stdout.write(
+                f'  queue depth max {stats["max_queue_depth"]}, '
+                f'wait avg {stats["avg_wait_ms"]:.1f} ms / p95 {stats["p95_wait_ms"]:.1f} ms, '
+                f'run avg {stats["avg_run_ms"]:.1f} ms'
+            )
@@ -0,0 +1,122 @@
+import operator
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import reduce
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, DateField, F, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from tracker.models import Notification, NotificationMonthlyRollup
+
+
+def _month_of(created_at):
+    return timezone.localtime(created_at).date().replace(day=1)
+
+
+def _add_pruned(counts):
+    for (month, notification_type), count in counts.items():
+        rollup, _ = NotificationMonthlyRollup.objects.get_or_create(month=month, type=notification_type)
+        NotificationMonthlyRollup.objects.filter(pk=rollup.pk).update(pruned_count=F('pruned_count') + count)
+
+
+def _month_range(month):
+    next_month = (month + timedelta(days=32)).replace(day=1)
+    return Q(
+        created_at__gte=timezone.make_aware(datetime(month.year, month.month, 1)),
+        created_at__lt=timezone.make_aware(datetime(next_month.year, next_month.month, 1)),
+    )
+
+
+def refresh_rollup_totals(months):
+    """total_count = live rows + pruned rows, for the given months (first days) only."""
+    if not months:
+        return
+
+    # One created_at range per month, so the count reads only those months' rows.
+    in_months = reduce(operator.or_, (_month_range(month) for month in months))
+    live = {
+        (row['month'], row['type']): row['count']
+        for row in Notification.objects.filter(in_months)
+        .annotate(month=TruncMonth('created_at', output_field=DateField()))
+        .values('month', 'type')
+        .annotate(count=Count('id'))
+    }
+    rollups = {
+        (rollup.month, rollup.type): rollup
+        for rollup in NotificationMonthlyRollup.objects.filter(month__in=months)
+    }
+
+    now = timezone.now()
+    for key, rollup in rollups.items():
+        rollup.total_count = live.get(key, 0) + rollup.pruned_count
+        rollup.updated_at = now
+    NotificationMonthlyRollup.objects.bulk_update(list(rollups.values()), ['total_count', 'updated_at'])
+    NotificationMonthlyRollup.objects.bulk_create(
+        [
+            NotificationMonthlyRollup(month=month, type=notification_type, total_count=live[(month, notification_type)])
+            for month, notification_type in live.keys() - rollups.keys()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Delete read notifications older than the retention period, keeping monthly per-type counts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Keep read notifications this many days. Defaults to NOTIFICATION_RETENTION_DAYS.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows deleted per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Count the prunable rows without deleting.')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+        if days <= 0:
+            self.stdout.write('Notification retention is disabled (0 days); nothing pruned.')
+            return
+
+        chunk_size = max(options['chunk_size'], 1)
+        cutoff = timezone.now() - timedelta(days=days)
+        prunable = Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'Would prune {prunable.count()} read notifications older than {days} days.')
+            return
+
+        started = time.perf_counter()
+        pruned = 0
+        last_id = 0
+        months = set()
+
+        # Walk the primary key so each chunk is a short, index-ordered delete and
+        # never rescans rows an earlier chunk already passed.
+        while True:
+            rows = list(
+                prunable.filter(id__gt=last_id).order_by('id').values_list('id', 'created_at', 'type')[:chunk_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            counts = Counter((_month_of(created_at), notification_type) for _, created_at, notification_type in rows)
+            with transaction.atomic():
+                Notification.objects.filter(id__in=[row[0] for row in rows]).delete()
+                _add_pruned(counts)
+            pruned += len(rows)
+            months.update(month for month, _ in counts)
+
+        refresh_rollup_totals(months)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Pruned {pruned} read notifications older than {days} days in {elapsed:.2f}s.')
+        )
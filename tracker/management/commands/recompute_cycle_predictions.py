@@ -0,0 +1,99 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tracker.ml.predict import FEATURE_FIELDS, cycle_features, predicted_cycle_days_batch, scored_cycle_days_batch
+from tracker.models import CycleLog
+from tracker.reports import invalidate_report_datasets
+
+PREDICTION_FIELDS = [
+    'predicted_next_period',
+    'predicted_start_date',
+    'estimated_ovulation_day',
+    'fertile_window_start',
+    'fertile_window_end',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the stored prediction dates of every cycle log. By default this applies the rule '
+        'add_cycle_log uses: the mean of the cycle lengths logged up to each cycle, or the XGBoost '
+        'score when there are none. With --model every log is re-scored by the XGBoost model instead, '
+        'e.g. after retraining it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows scored and written per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Score the logs without writing results.')
+        parser.add_argument(
+            '--model',
+            action='store_true',
+            help='Predict every log from its own features with the XGBoost model, one feature matrix per batch.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        dry_run = options['dry_run']
+        use_model = options['model']
+
+        # Each user's logs in date order, so the lengths logged up to a cycle are
+        # the ones add_cycle_log averaged when that cycle was added.
+        logs = (
+            CycleLog.objects.exclude(last_period_start__isnull=True)
+            .only('id', 'user_id', 'last_period_start', *FEATURE_FIELDS)
+            .order_by('user_id', 'last_period_start', 'id')
+            .iterator(chunk_size=chunk_size)
+        )
+
+        started = time.perf_counter()
+        scored = 0
+        chunk = []
+        histories = []
+        history_user_id = None
+        cycle_lengths = []
+
+        def flush(batch, batch_histories):
+            rows = [cycle_features(log) for log in batch]
+            if use_model:
+                predicted_days = scored_cycle_days_batch(rows)
+            else:
+                predicted_days = predicted_cycle_days_batch(batch_histories, rows)
+
+            for log, days in zip(batch, predicted_days):
+                log.predicted_next_period = log.last_period_start + timedelta(days=days)
+                log.predicted_start_date = log.predicted_next_period
+                log.estimated_ovulation_day = log.predicted_next_period - timedelta(days=14)
+                log.fertile_window_start = log.estimated_ovulation_day - timedelta(days=5)
+                log.fertile_window_end = log.estimated_ovulation_day
+
+            if not dry_run:
+                with transaction.atomic():
+                    CycleLog.objects.bulk_update(batch, PREDICTION_FIELDS, batch_size=chunk_size)
+                    invalidate_report_datasets(*{log.user_id for log in batch})
+
+        for log in logs:
+            if log.user_id != history_user_id:
+                history_user_id = log.user_id
+                cycle_lengths = []
+            cycle_lengths.append(log.length_of_cycle)
+            chunk.append(log)
+            histories.append(list(cycle_lengths))
+            if len(chunk) >= chunk_size:
+                flush(chunk, histories)
+                scored += len(chunk)
+                chunk = []
+                histories = []
+
+        if chunk:
+            flush(chunk, histories)
+            scored += len(chunk)
+
+        elapsed = time.perf_counter() - started
+        rate = scored / elapsed if elapsed else 0
+        verb = 'Computed' if dry_run else 'Recomputed'
+        self.stdout.write(
+            self.style.SUCCESS(f'{verb} predictions for {scored} cycle logs in {elapsed:.2f}s ({rate:.0f} logs/s).')
+        )
@@ -1,31 +1,52 @@
+import time
+
 from django.core.management.base import BaseCommand
 
+from tracker.management.sharding import (
+    add_sharding_arguments,
+    parse_shard,
+    run_sharded,
+    shard_pk_ranges,
+    write_shard_report,
+)
 from tracker.models import User
-from tracker.views import check_period_delay, trigger_emergency_alert
+from tracker.views import run_bulk_emergency_alerts, run_bulk_period_delay_checks
+
+
+def check_user_range(low, high):
+    users = User.objects.filter(role='user', pk__gte=low, pk__lte=high)
+    alert_counts = run_bulk_emergency_alerts(users=users)
+    return {
+        'processed': users.count(),
+        'high': alert_counts['high'],
+        'medium': alert_counts['medium'],
+        'delayed': run_bulk_period_delay_checks(users=users),
+    }
 
 
 class Command(BaseCommand):
     help = 'Run emergency risk and delayed-period checks for all app users.'
 
-    def handle(self, *args, **options):
-        users = User.objects.filter(role='user')
-        high_alerts = 0
-        medium_alerts = 0
-        delayed_alerts = 0
+    def add_arguments(self, parser):
+        add_sharding_arguments(parser)
 
-        for user in users:
-            assessment = trigger_emergency_alert(user)
-            if assessment.get('level') == 'high' and assessment.get('triggered'):
-                high_alerts += 1
-            elif assessment.get('level') == 'medium' and assessment.get('triggered'):
-                medium_alerts += 1
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        pk_ranges = shard_pk_ranges(
+            User.objects.filter(role='user'),
+            shard=parse_shard(options['shard']),
+            workers=workers,
+        )
 
-            if check_period_delay(user):
-                delayed_alerts += 1
+        started = time.perf_counter()
+        results = run_sharded(check_user_range, pk_ranges, workers=workers)
+        elapsed = time.perf_counter() - started
 
+        write_shard_report(self, results, elapsed, 'users')
         self.stdout.write(
             self.style.SUCCESS(
-                f'Emergency checks complete. High alerts: {high_alerts}, '
-                f'Medium alerts: {medium_alerts}, Delayed period alerts: {delayed_alerts}.'
+                f'Emergency checks complete. High alerts: {sum(result["high"] for result in results)}, '
+                f'Medium alerts: {sum(result["medium"] for result in results)}, '
+                f'Delayed period alerts: {sum(result["delayed"] for result in results)}.'
             )
         )
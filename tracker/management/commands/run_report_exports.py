@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracker.report_exports import delete_expired_exports, run_report_export_batch
+
+
+class Command(BaseCommand):
+    help = 'Render queued PDF report exports into media storage and notify their users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5, help='Jobs rendered per batch, each claimed as it starts.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs instead of exiting when drained.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep between polls with --loop.')
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        totals = {'done': 0, 'retried': 0, 'failed': 0}
+
+        while True:
+            started = time.perf_counter()
+            counts = run_report_export_batch(batch_size=batch_size)
+            for key, value in counts.items():
+                totals[key] += value
+
+            if sum(counts.values()):
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"Export batch: rendered {counts['done']}, retrying {counts['retried']}, "
+                    f"failed {counts['failed']} in {elapsed:.2f}s."
+                )
+                continue
+
+            expired = delete_expired_exports()
+            if expired:
+                self.stdout.write(f'Deleted {expired} expired report exports.')
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Report exports drained. Rendered: {totals['done']}, Failed: {totals['failed']}.")
+        )
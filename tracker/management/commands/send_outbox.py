@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracker.emails.outbox import deliver_outbox_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued EmailOutbox messages in batches over a reused SMTP connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Messages claimed and sent per connection.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new messages instead of exiting when drained.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls with --loop.')
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        totals = {'sent': 0, 'retried': 0, 'dead': 0}
+
+        while True:
+            counts = deliver_outbox_batch(batch_size=batch_size)
+            for key, value in counts.items():
+                totals[key] += value
+
+            if sum(counts.values()):
+                self.stdout.write(
+                    f"Outbox batch: sent {counts['sent']}, retrying {counts['retried']}, dead-lettered {counts['dead']}."
+                )
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Outbox drained. Sent: {totals['sent']}, Retrying: {totals['retried']}, Dead-lettered: {totals['dead']}."
+            )
+        )
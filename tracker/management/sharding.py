@@ -0,0 +1,93 @@
+"""
+Primary-key sharding for the periodic management commands.
+
+``--shard i/N`` restricts a run to the i-th (0-based) of N contiguous pk
+ranges so several hosts/cron entries can split a table, and ``--workers N``
+further splits the selected range across a process pool. Each worker runs
+``worker(low, high, *args)`` on an inclusive pk range and returns a dict
+with at least a ``processed`` count.
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import CommandError
+from django.db import connections
+from django.db.models import Max, Min
+
+
+def add_sharding_arguments(parser):
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes to split the run across.')
+    parser.add_argument('--shard', default=None, help='Only process shard i of N (0-based), e.g. 0/4.')
+
+
+def parse_shard(value):
+    if not value:
+        return 0, 1
+
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise CommandError('--shard must look like i/N, e.g. 0/4.')
+
+    if count < 1 or not 0 <= index < count:
+        raise CommandError('--shard index must be between 0 and N-1.')
+    return index, count
+
+
+def split_pk_range(low, high, parts):
+    """Split the inclusive range [low, high] into up to `parts` contiguous inclusive ranges."""
+    if low is None or high is None:
+        return []
+
+    span = high - low + 1
+    parts = max(1, min(parts, span))
+    bounds = [low + (span * step) // parts for step in range(parts + 1)]
+    return [(bounds[step], bounds[step + 1] - 1) for step in range(parts)]
+
+
+def shard_pk_ranges(queryset, shard=(0, 1), workers=1):
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    index, count = shard
+
+    shard_ranges = split_pk_range(bounds['low'], bounds['high'], count)
+    if index >= len(shard_ranges):
+        return []
+
+    low, high = shard_ranges[index]
+    return split_pk_range(low, high, workers)
+
+
+def _run_timed(worker, low, high, args):
+    started = time.perf_counter()
+    result = worker(low, high, *args)
+    return dict(result, pk_range=(low, high), elapsed=time.perf_counter() - started)
+
+
+def run_sharded(worker, pk_ranges, workers=1, args=()):
+    """Run `worker` over every pk range, in a process pool when workers > 1."""
+    if workers <= 1 or len(pk_ranges) <= 1:
+        return [_run_timed(worker, low, high, args) for low, high in pk_ranges]
+
+    # Forked workers must not share the parent's DB sockets; each one opens its own on first query.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(_run_timed, worker, low, high, args) for low, high in pk_ranges]
+        return [future.result() for future in futures]
+
+
+def write_shard_report(command, results, elapsed, unit):
+    for number, result in enumerate(results):
+        rate = result['processed'] / result['elapsed'] if result['elapsed'] else 0
+        command.stdout.write(
+            f"  shard {number}: pk {result['pk_range'][0]}-{result['pk_range'][1]}, "
+            f"{result['processed']} {unit} in {result['elapsed']:.2f}s ({rate:.0f} {unit}/s)"
+        )
+
+    processed = sum(result['processed'] for result in results)
+    rate = processed / elapsed if elapsed else 0
+    command.stdout.write(
+        f'Processed {processed} {unit} in {elapsed:.2f}s across {len(results)} '
+        f'partition(s) ({rate:.0f} {unit}/s).'
+    )
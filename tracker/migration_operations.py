@@ -0,0 +1,60 @@
+from django.db.migrations.operations import AddConstraint, AddIndex
+
+
+class AddIndexConcurrentlyOnPostgres(AddIndex):
+    """
+    AddIndex that uses CREATE INDEX CONCURRENTLY on PostgreSQL so busy tables
+    stay writable while the index builds; other backends add it normally.
+    The migration using it must set atomic = False.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.remove_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, self.index)
+
+    def describe(self):
+        return f'{super().describe()} (concurrently on PostgreSQL)'
+
+
+class AddUniqueConstraintConcurrentlyOnPostgres(AddConstraint):
+    """
+    AddConstraint for a plain UniqueConstraint over fields. On PostgreSQL the
+    unique index is built CONCURRENTLY first and then attached as the
+    constraint, so the table stays writable; other backends add it normally.
+    The migration using it must set atomic = False.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+
+        if schema_editor.connection.vendor != 'postgresql':
+            schema_editor.add_constraint(model, self.constraint)
+            return
+
+        quote = schema_editor.quote_name
+        table = quote(model._meta.db_table)
+        name = quote(self.constraint.name)
+        columns = ', '.join(quote(model._meta.get_field(field).column) for field in self.constraint.fields)
+        schema_editor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY {name} ON {table} ({columns})')
+        schema_editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}')
+
+    def describe(self):
+        return f'{super().describe()} (concurrently on PostgreSQL)'
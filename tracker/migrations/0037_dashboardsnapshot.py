@@ -0,0 +1,33 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0036_resourcecategory_resourceitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mood_counts', models.JSONField(blank=True, default=dict)),
+                ('symptom_frequency', models.JSONField(blank=True, default=list)),
+                ('recent_symptom_entries', models.JSONField(blank=True, default=list)),
+                ('recent_symptoms', models.JSONField(blank=True, default=list)),
+                ('total_feedback', models.PositiveIntegerField(default=0)),
+                ('correct_feedback', models.PositiveIntegerField(default=0)),
+                ('answered_feedback_cycle_ids', models.JSONField(blank=True, default=list)),
+                ('risk_assessment', models.JSONField(blank=True, default=dict)),
+                ('risk_assessed_on', models.DateField(blank=True, null=True)),
+                ('period_delay_checked_on', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_snapshot', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
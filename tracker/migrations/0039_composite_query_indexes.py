@@ -0,0 +1,53 @@
+# Generated by Django 4.2.19 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+from tracker.migration_operations import AddIndexConcurrentlyOnPostgres
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('tracker', '0038_emailoutbox'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'payment_due_at'], name='appointment_status_due_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='chatmessage',
+            index=models.Index(fields=['room_name', 'is_note', 'timestamp'], name='chatmsg_room_note_ts_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='chatmessage',
+            index=models.Index(fields=['room_name', 'is_note', 'id'], name='chatmsg_room_note_id_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='cyclelog',
+            index=models.Index(fields=['user', 'last_period_start'], name='cyclelog_user_start_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='doctoravailability',
+            index=models.Index(fields=['doctor', 'is_active', 'date', 'start_time'], name='availability_doc_active_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', 'created_at'], name='notif_user_read_created_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='notification',
+            index=models.Index(fields=['user', 'title', 'created_at'], name='notif_user_title_created_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='symptomlog',
+            index=models.Index(fields=['user', 'date'], name='symptomlog_user_date_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='symptomlog',
+            index=models.Index(fields=['user', 'source', 'created_at'], name='symptomlog_user_src_crt_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.19 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0039_composite_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChannelLayerPayload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.TextField()),
+                ('created_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
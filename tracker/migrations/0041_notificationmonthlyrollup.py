@@ -0,0 +1,28 @@
+# Generated by Django 4.2.19 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0040_channellayerpayload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('type', models.CharField(choices=[('appointment', 'Appointment'), ('appointment_accepted', 'Appointment Accepted'), ('appointment_rejected', 'Appointment Rejected'), ('message_received', 'Message Received'), ('emergency_alert', 'Emergency Alert'), ('profile', 'Profile'), ('settings_update', 'Settings Update'), ('system', 'System'), ('cycle', 'Cycle'), ('email', 'Email')], max_length=20)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('pruned_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-month', 'type'],
+                'unique_together': {('month', 'type')},
+            },
+        ),
+    ]
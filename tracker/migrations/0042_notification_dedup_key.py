@@ -0,0 +1,72 @@
+# Generated by Django 4.2.19 on 2026-10-18 13:05
+
+import re
+from datetime import datetime, time
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+SYMPTOM_PATTERN = re.compile(r'You have been experiencing (.+?) for multiple days')
+REQUEST_PATTERN = re.compile(r'Request #(\d+)\.')
+
+
+def todays_dedup_key(title, message, today):
+    """The key the sender would now give a notification of this title sent today, if any."""
+    if title == 'Period Day Reminder':
+        return f'period_day:{today}'
+    if title == 'Delayed Period Reminder':
+        return f'period_delay:{today}'
+    if title == 'Health Attention Needed':
+        match = SYMPTOM_PATTERN.search(message)
+        return match and f'health_attention:{match.group(1)}:{today}'
+    if title == 'Emergency consultation request':
+        match = REQUEST_PATTERN.search(message)
+        return match and f'emergency:{match.group(1)}:{today}'
+    return None
+
+
+def backfill_todays_dedup_keys(apps, schema_editor):
+    # The senders used to skip anything already sent today; key today's rows so
+    # the constraint keeps doing that on the day this ships.
+    Notification = apps.get_model('tracker', 'Notification')
+    today = timezone.localdate()
+    start = timezone.make_aware(datetime.combine(today, time.min))
+    rows = Notification.objects.filter(
+        created_at__gte=start,
+        title__in=[
+            'Period Day Reminder',
+            'Delayed Period Reminder',
+            'Health Attention Needed',
+            'Emergency consultation request',
+        ],
+    ).order_by('created_at', 'id')
+
+    seen = set()
+    keyed = []
+    for row in rows.only('id', 'user_id', 'title', 'message'):
+        key = todays_dedup_key(row.title, row.message, today)
+        if key and (row.user_id, key) not in seen:
+            seen.add((row.user_id, key))
+            row.dedup_key = key
+            keyed.append(row)
+    Notification.objects.bulk_update(keyed, ['dedup_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    # The column and its backfill commit together; the unique constraint is
+    # built concurrently, outside a transaction, in
+    # 0045_notification_dedup_key_uniq.
+
+    dependencies = [
+        ('tracker', '0041_notificationmonthlyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='dedup_key',
+            field=models.CharField(blank=True, max_length=150, null=True),
+        ),
+        migrations.RunPython(backfill_todays_dedup_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0043_reportexportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportexportjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
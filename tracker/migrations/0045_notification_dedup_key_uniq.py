@@ -0,0 +1,21 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+from tracker.migration_operations import AddUniqueConstraintConcurrentlyOnPostgres
+
+
+class Migration(migrations.Migration):
+    # CREATE UNIQUE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('tracker', '0044_reportexportjob_attempts'),
+    ]
+
+    operations = [
+        AddUniqueConstraintConcurrentlyOnPostgres(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('user', 'dedup_key'), name='notif_user_dedup_key_uniq'),
+        ),
+    ]
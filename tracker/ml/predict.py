@@ -1,13 +1,124 @@
 import os
-import numpy as np
-import xgboost as xgb
+import threading
+
 from django.conf import settings
 
-model = xgb.XGBRegressor()
-model.load_model(
-    os.path.join(settings.BASE_DIR, "tracker", "ml", "xgboost_cycle_model.json")
+MODEL_PATH = os.path.join(settings.BASE_DIR, "tracker", "ml", "xgboost_cycle_model.json")
+
+# CycleLog columns in the order the model was trained on.
+FEATURE_FIELDS = (
+    "length_of_cycle",
+    "length_of_menses",
+    "mean_menses_length",
+    "total_menses_score",
+    "mean_bleeding_intensity",
+    "unusual_bleeding",
+    "bmi",
 )
 
+
+class CycleModelHolder:
+    """Process-wide, lazily loaded XGBoost regressor.
+
+    numpy/xgboost are only imported and the model file is only parsed the
+    first time the model is needed, so management commands and workers that
+    never predict do not pay for it.
+    """
+
+    def __init__(self, path=MODEL_PATH):
+        self.path = path
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self):
+        return self._model is not None
+
+    def get(self):
+        model = self._model
+        if model is None:
+            with self._lock:
+                model = self._model
+                if model is None:
+                    import xgboost as xgb
+
+                    model = xgb.XGBRegressor()
+                    model.load_model(self.path)
+                    self._model = model
+        return model
+
+    def reset(self):
+        with self._lock:
+            self._model = None
+
+
+cycle_model = CycleModelHolder()
+
+
+def warm_up():
+    """Load the model eagerly, e.g. from TrackerConfig.ready() before serving traffic."""
+    return cycle_model.get()
+
+
+def cycle_features(cycle):
+    features = [getattr(cycle, field) for field in FEATURE_FIELDS]
+    features[FEATURE_FIELDS.index("unusual_bleeding")] = int(cycle.unusual_bleeding)
+    return features
+
+
 def predict_cycle(features):
+    import numpy as np
+
     features = np.array(features).reshape(1, -1)
-    return float(model.predict(features)[0])
\ No newline at end of file
+    return float(cycle_model.get().predict(features)[0])
+
+
+def predict_cycle_batch(rows):
+    """Score an N x 7 feature matrix with a single model.predict call.
+
+    Missing values (None) become NaN, which XGBoost treats as missing.
+    """
+    import numpy as np
+
+    matrix = np.asarray(rows, dtype=float)
+    if matrix.size == 0:
+        return np.empty(0, dtype=float)
+    matrix = matrix.reshape(-1, len(FEATURE_FIELDS))
+    return cycle_model.get().predict(matrix).astype(float)
+
+
+def _mean_cycle_length(cycle_lengths):
+    lengths = [length for length in cycle_lengths if length]
+    if not lengths:
+        return None
+    return int(round(sum(lengths) / len(lengths)))
+
+
+def predicted_cycle_days(cycle_lengths, features):
+    """Days from a period start to the next, as add_cycle_log predicts them:
+    the rounded mean of the user's logged cycle lengths, or the model's score
+    when none are logged.
+    """
+    days = _mean_cycle_length(cycle_lengths)
+    if days is None:
+        days = round(predict_cycle(features))
+    return days
+
+
+def predicted_cycle_days_batch(histories, rows):
+    """predicted_cycle_days for each (cycle lengths, features) pair.
+
+    Only the logs without any cycle-length history are scored, in a single
+    model.predict call.
+    """
+    days = [_mean_cycle_length(lengths) for lengths in histories]
+    missing = [index for index, value in enumerate(days) if value is None]
+    if missing:
+        for index, score in zip(missing, scored_cycle_days_batch([rows[index] for index in missing])):
+            days[index] = score
+    return days
+
+
+def scored_cycle_days_batch(rows):
+    """round(predict_cycle(row)) for every row, from a single model.predict call."""
+    return [round(score) for score in predict_cycle_batch(rows).tolist()]
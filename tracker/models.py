@@ -3,7 +3,7 @@ from django.db import models
 from django.utils import timezone
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Avg
+from django.db.models import Avg, F
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
@@ -121,6 +121,9 @@ class CycleLog(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'last_period_start'], name='cyclelog_user_start_idx'),
+        ]
 
 
 
@@ -212,6 +215,11 @@ class DoctorAvailability(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['doctor', 'is_active', 'date', 'start_time'], name='availability_doc_active_idx'),
+        ]
+
     def is_expired(self):
         """Check if availability is in the past"""
         end_datetime = timezone.make_aware(
@@ -251,6 +259,11 @@ class Appointment(models.Model):
     # optional fields
     cancel_reason = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'payment_due_at'], name='appointment_status_due_idx'),
+        ]
+
     def is_expired(self):
         from django.utils import timezone
         return self.status == "pending" and (timezone.now() - self.created_at).total_seconds() >= 21600
@@ -462,6 +475,11 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['room_name', 'is_note', 'timestamp'], name='chatmsg_room_note_ts_idx'),
+            # Keyset pagination of the history API walks rooms by id.
+            models.Index(fields=['room_name', 'is_note', 'id'], name='chatmsg_room_note_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sender.username}: {self.message[:50]}"
@@ -502,12 +520,66 @@ class Conversation(models.Model):
         return self.unread_count_patient
 
     def mark_as_read(self, user):
-        """Mark conversation as read for a specific user"""
-        if user.role == 'doctor':
-            self.unread_count_doctor = 0
-        else:
-            self.unread_count_patient = 0
-        self.save()
+        """
+        Mark conversation as read for a specific user. Only that user's counter
+        is written, so a message recorded since this instance was loaded keeps
+        its increment of the other counter and its last_message.
+        """
+        from .realtime import invalidate_conversation_lists
+        from .unread import invalidate_unread_chats
+
+        field = 'unread_count_doctor' if user.role == 'doctor' else 'unread_count_patient'
+        Conversation.objects.filter(pk=self.pk).update(**{field: 0})
+        setattr(self, field, 0)
+        invalidate_conversation_lists(self.doctor_id, self.patient_id)
+        invalidate_unread_chats(user.id)
+
+    @staticmethod
+    def unread_increments(sender):
+        """The unread-count bump for one message from `sender`: the other side's counter."""
+        if sender.role == 'doctor':
+            return {'unread_doctor': 0, 'unread_patient': 1}
+        return {'unread_doctor': 1, 'unread_patient': 0}
+
+    @classmethod
+    def record_message(cls, room_name, sender, last_message, sent_at, participants=None):
+        """
+        Bump the recipient's unread count and set the last message in one UPDATE,
+        so concurrent messages cannot lose increments. Returns the rows updated.
+        """
+        return cls.record_messages(room_name, last_message, sent_at, participants=participants, **cls.unread_increments(sender))
+
+    @classmethod
+    def record_messages(cls, room_name, last_message, sent_at, unread_doctor=0, unread_patient=0, participants=None):
+        """
+        update() sends no post_save, so the participants' cached conversation
+        lists and unread counters must be refreshed separately. Pass the room's
+        (doctor_id, patient_id) as `participants` to refresh them here;
+        callers that load the conversation afterwards call messages_recorded()
+        on it instead.
+        """
+        updated = cls.objects.filter(room_name=room_name).update(
+            unread_count_doctor=F('unread_count_doctor') + unread_doctor,
+            unread_count_patient=F('unread_count_patient') + unread_patient,
+            last_message=last_message,
+            last_message_time=sent_at,
+            updated_at=timezone.now(),
+        )
+        if updated and participants:
+            cls._refresh_participant_caches(*participants, unread_doctor, unread_patient)
+        return updated
+
+    def messages_recorded(self, unread_doctor=0, unread_patient=0):
+        """Refresh the participants' cached state after record_messages() on this room."""
+        self._refresh_participant_caches(self.doctor_id, self.patient_id, unread_doctor, unread_patient)
+
+    @staticmethod
+    def _refresh_participant_caches(doctor_id, patient_id, unread_doctor, unread_patient):
+        from .realtime import invalidate_conversation_lists
+        from .unread import chat_messages_recorded
+
+        invalidate_conversation_lists(doctor_id, patient_id)
+        chat_messages_recorded(doctor_id, patient_id, unread_doctor, unread_patient)
 
 
 class UserDocument(models.Model):
@@ -627,11 +699,41 @@ class SymptomLog(models.Model):
     class Meta:
         ordering = ['-date', '-created_at']
         unique_together = ('user', 'symptom', 'date')
+        indexes = [
+            models.Index(fields=['user', 'date'], name='symptomlog_user_date_idx'),
+            models.Index(fields=['user', 'source', 'created_at'], name='symptomlog_user_src_crt_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.symptom} ({self.date:%Y-%m-%d})"
 
 
+class DashboardSnapshot(models.Model):
+    """
+    Precomputed per-user dashboard aggregates.
+    Refreshed by the write views that change them so dashboard_home reads one row.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='dashboard_snapshot'
+    )
+    mood_counts = models.JSONField(default=dict, blank=True)
+    symptom_frequency = models.JSONField(default=list, blank=True)
+    recent_symptom_entries = models.JSONField(default=list, blank=True)
+    recent_symptoms = models.JSONField(default=list, blank=True)
+    total_feedback = models.PositiveIntegerField(default=0)
+    correct_feedback = models.PositiveIntegerField(default=0)
+    answered_feedback_cycle_ids = models.JSONField(default=list, blank=True)
+    risk_assessment = models.JSONField(default=dict, blank=True)
+    risk_assessed_on = models.DateField(null=True, blank=True)
+    period_delay_checked_on = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} dashboard snapshot"
+
+
 class PeriodCheckIn(models.Model):
     PAIN_LEVEL_CHOICES = (
         ('low', 'Low'),
@@ -692,15 +794,44 @@ class Notification(models.Model):
     target_url = models.CharField(max_length=255, blank=True, default='')
     target_section_id = models.CharField(max_length=100, blank=True, default='')
     is_read = models.BooleanField(default=False)
+    # Idempotency key such as "period_day:2026-03-01"; at most one row per user and key
+    dedup_key = models.CharField(max_length=150, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read', 'created_at'], name='notif_user_read_created_idx'),
+            models.Index(fields=['user', 'title', 'created_at'], name='notif_user_title_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'dedup_key'], name='notif_user_dedup_key_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
 
+class NotificationMonthlyRollup(models.Model):
+    """
+    Notifications created per month and type, kept so admin stats survive
+    prune_notifications. total_count is live rows plus pruned_count as of the
+    last prune run that deleted rows from that month.
+    """
+    month = models.DateField()
+    type = models.CharField(max_length=20, choices=Notification.TYPE_CHOICES)
+    total_count = models.PositiveIntegerField(default=0)
+    pruned_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-month', 'type']
+        unique_together = ['month', 'type']
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.type}: {self.total_count}"
+
+
 class TwoFactorCode(models.Model):
     PURPOSE_CHOICES = (
         ('login', 'Login Verification'),
@@ -724,4 +855,88 @@ class TwoFactorCode(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.user.username} - {self.purpose}"
\ No newline at end of file
+        return f"{self.user.username} - {self.purpose}"
+
+
+class EmailOutbox(models.Model):
+    """
+    Rendered outgoing email, written in the same transaction as the change that caused it.
+    Delivered by the send_outbox worker instead of inside the request.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead Letter'),
+    )
+
+    recipient_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    text_body = models.TextField()
+    html_body = models.TextField(blank=True, default='')
+    template_name = models.CharField(max_length=150, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='emailoutbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient_email} - {self.subject} ({self.status})"
+
+
+class ReportExportJob(models.Model):
+    """
+    PDF health report export, rendered by the run_report_exports worker instead
+    of inside the request. A user has at most one pending or running job, so
+    repeated export clicks while one renders share it.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='report_export_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='report_exports/', blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='reportjob_one_active_per_user',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} report export {self.pk} ({self.status})"
+
+
+class ChannelLayerPayload(models.Model):
+    """
+    Channel layer message too large for a NOTIFY payload (8000 bytes).
+    The notification carries this row's id; rows are pruned after the layer's expiry.
+    """
+    payload = models.TextField()
+    created_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Channel layer payload {self.pk}"
@@ -0,0 +1,137 @@
+"""
+Per-user conversation-list updates.
+
+Every authenticated ``ws/broadcast/`` socket joins its owner's ``user_<id>``
+group. When a conversation changes, only its two participants are notified,
+and each receives that conversation's summary (the same shape as an
+``/api/conversations/`` item, from their own point of view) so the client can
+patch its list in place instead of re-fetching it.
+
+With ``SHARED_CACHE``, the full list behind ``/api/conversations/`` is
+cached per user and dropped whenever one of the user's conversations (or
+consultations) changes. Those changes also come from other processes
+(expire_unpaid_appointments, the chat write-behind flush in another ASGI
+worker, ...), whose invalidations a per-process cache would never see, so
+without a shared cache the list is read from the database every time.
+
+New notifications travel the same way on ``ws/notifications/`` sockets,
+which join the user's ``notifications_<id>`` group.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+
+from .models import Appointment, Conversation
+
+
+def user_group_name(user_id):
+    return f'user_{user_id}'
+
+
+def notification_group_name(user_id):
+    """Group of a user's ``ws/notifications/`` sockets."""
+    return f'notifications_{user_id}'
+
+
+def conversation_queryset():
+    """Conversations with both participants and the latest consultation id in one query."""
+    latest_appointment = Appointment.objects.filter(
+        doctor_id=OuterRef('doctor_id'),
+        user_id=OuterRef('patient_id'),
+    ).order_by('-availability__date', '-availability__start_time').values('id')[:1]
+    return Conversation.objects.select_related('doctor__doctor_profile', 'patient').annotate(
+        latest_appointment_id=Subquery(latest_appointment),
+    )
+
+
+def get_room_conversation(room_name):
+    return conversation_queryset().filter(room_name=room_name).first()
+
+
+def conversation_list_cache_key(user_id):
+    return f'conversation_list:{user_id}'
+
+
+def list_cache_enabled():
+    return getattr(settings, 'SHARED_CACHE', False)
+
+
+def _load_conversation_list(user):
+    if user.role == 'doctor':
+        conversations = conversation_queryset().filter(doctor=user)
+    else:
+        conversations = conversation_queryset().filter(patient=user)
+    return [serialize_conversation(conv, user) for conv in conversations]
+
+
+def get_conversation_list(user):
+    """The /api/conversations/ items for `user`, cached until one of their conversations changes when the cache is shared."""
+    if not list_cache_enabled():
+        return _load_conversation_list(user)
+    cache_key = conversation_list_cache_key(user.id)
+    conversations_data = cache.get(cache_key)
+    if conversations_data is None:
+        conversations_data = _load_conversation_list(user)
+        cache.set(cache_key, conversations_data, getattr(settings, 'CONVERSATION_LIST_CACHE_SECONDS', 300))
+    return conversations_data
+
+
+def invalidate_conversation_lists(*user_ids):
+    if list_cache_enabled():
+        cache.delete_many([conversation_list_cache_key(user_id) for user_id in user_ids])
+
+
+def serialize_conversation(conversation, viewer):
+    other_user = conversation.get_other_user(viewer)
+
+    if viewer.role == 'user':
+        doctor_profile = getattr(other_user, 'doctor_profile', None)
+        doctor_name = (doctor_profile.full_name if doctor_profile else '') or other_user.username
+        display_name = f"Dr. {doctor_name}"
+    else:
+        display_name = other_user.username
+
+    return {
+        'id': conversation.id,
+        'other_user': {
+            'id': other_user.id,
+            'name': display_name,
+            'role': other_user.role
+        },
+        'last_message': conversation.last_message or 'No messages yet',
+        'last_message_time': conversation.last_message_time.isoformat(),
+        'unread_count': conversation.get_unread_count(viewer),
+        'appointment_id': conversation.latest_appointment_id,
+        'room_name': conversation.room_name
+    }
+
+
+def conversation_update_events(conversation, event_type):
+    """
+    (group name, channel layer event) for each participant of `conversation`,
+    which must come from conversation_queryset().
+    """
+    return [
+        (
+            user_group_name(participant.id),
+            {
+                'type': 'conversation_update',
+                'event': event_type,
+                'conversation': serialize_conversation(conversation, participant),
+            },
+        )
+        for participant in (conversation.patient, conversation.doctor)
+    ]
+
+
+def push_conversation_update(room_name, event_type):
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+
+    conversation = get_room_conversation(room_name)
+    if conversation is None:
+        return
+
+    channel_layer = get_channel_layer()
+    for group_name, event in conversation_update_events(conversation, event_type):
+        async_to_sync(channel_layer.group_send)(group_name, event)
@@ -0,0 +1,179 @@
+"""
+Background PDF report exports.
+
+With REPORT_EXPORT_BACKGROUND on, ``export_reports_pdf`` only queues a
+ReportExportJob and returns. The run_report_exports worker renders queued
+jobs into media storage and notifies each user with a link to
+``download_report_export``. A job that fails, or whose worker dies mid-render
+(its lease of CLAIM_LEASE runs out), is tried again up to
+REPORT_EXPORT_MAX_ATTEMPTS times before the user is told it failed. Finished
+exports are deleted after REPORT_EXPORT_RETENTION_DAYS.
+
+A job is a snapshot of the user's data when the worker runs it, not when it
+was queued: the worker loads a fresh ReportDataset rather than the cached one,
+whose invalidations it cannot rely on seeing.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import ReportExportJob
+from .reports import ReportDataset
+
+logger = logging.getLogger(__name__)
+
+# A running job whose worker died is picked up again after this long.
+CLAIM_LEASE = timedelta(minutes=10)
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+def background_exports_enabled():
+    return getattr(settings, 'REPORT_EXPORT_BACKGROUND', False)
+
+
+def enqueue_report_export(user):
+    """(job, created): the user's pending or running export, queuing a new one if there is none."""
+    active = ReportExportJob.objects.filter(user=user, status__in=ACTIVE_STATUSES)
+    job = active.first()
+    if job is not None:
+        return job, False
+    try:
+        with transaction.atomic():
+            return ReportExportJob.objects.create(user=user), True
+    except IntegrityError:
+        # A concurrent request queued one first (reportjob_one_active_per_user)
+        return active.get(), False
+
+
+def max_attempts():
+    return max(int(getattr(settings, 'REPORT_EXPORT_MAX_ATTEMPTS', 3)), 1)
+
+
+def claim_report_export():
+    """
+    Claim the oldest runnable job, or None. Jobs are claimed one at a time, so
+    each lease starts when its render does rather than when a batch was taken.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            ReportExportJob.objects.filter(
+                Q(status='pending') | Q(status='running', started_at__lt=now - CLAIM_LEASE)
+            )
+            .order_by('id')
+            .select_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = now
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'attempts'])
+    return job
+
+
+def _give_up(job, error):
+    from .views import _create_notification
+
+    job.status = 'failed'
+    job.last_error = error[:2000]
+    job.finished_at = timezone.now()
+    with transaction.atomic():
+        job.save(update_fields=['status', 'last_error', 'finished_at'])
+        _create_notification(
+            job.user,
+            'Report export failed',
+            'We could not generate your PDF report. Please try exporting it again.',
+            'system',
+            target_url=reverse('dashboard_reports'),
+            target_section_id='reports-section',
+            dedup_key=f'report_export:{job.pk}',
+        )
+    return 'failed'
+
+
+def _record_failure(job, exc):
+    """Queue the job again, or give up on it once it has used REPORT_EXPORT_MAX_ATTEMPTS."""
+    error = f'{type(exc).__name__}: {exc}'
+    if job.file:
+        # Saved to storage, but the job row that points at it was not
+        job.file.delete(save=False)
+    if job.attempts >= max_attempts():
+        return _give_up(job, error)
+    job.status = 'pending'
+    job.last_error = error[:2000]
+    job.save(update_fields=['status', 'last_error', 'file'])
+    return 'retried'
+
+
+def _render(job):
+    from .views import _create_notification, render_report_pdf, spooled_report_file
+
+    with spooled_report_file() as output:
+        render_report_pdf(job.user, output, ReportDataset(job.user_id))
+        output.seek(0)
+        job.file.save(f'femicare_health_report_{job.pk}.pdf', File(output), save=False)
+
+    job.status = 'done'
+    job.last_error = ''
+    job.finished_at = timezone.now()
+    with transaction.atomic():
+        job.save(update_fields=['file', 'status', 'last_error', 'finished_at'])
+        _create_notification(
+            job.user,
+            'Report export completed',
+            'Your PDF health report is ready. Open this notification to download it.',
+            'system',
+            target_url=reverse('download_report_export', args=[job.pk]),
+            dedup_key=f'report_export:{job.pk}',
+        )
+
+
+def run_report_export(job):
+    """
+    Render one claimed job and notify its user; returns 'done', 'retried' or
+    'failed'. Never raises, so one bad job cannot stop the worker.
+    """
+    try:
+        if job.attempts > max_attempts():
+            # Every earlier attempt died with its worker before recording an outcome
+            return _give_up(job, f'Abandoned after {job.attempts - 1} unfinished attempts')
+        _render(job)
+        return 'done'
+    except Exception as exc:
+        logger.exception('Unable to generate ReportLab PDF report for user %s (export job %s)', job.user_id, job.pk)
+        try:
+            return _record_failure(job, exc)
+        except Exception:
+            # e.g. the database is gone too; the lease hands the job out again
+            logger.exception('Unable to record the outcome of export job %s', job.pk)
+            return 'failed'
+
+
+def run_report_export_batch(batch_size=5):
+    counts = {'done': 0, 'retried': 0, 'failed': 0}
+    for _ in range(batch_size):
+        job = claim_report_export()
+        if job is None:
+            break
+        counts[run_report_export(job)] += 1
+    return counts
+
+
+def delete_expired_exports():
+    """Delete finished jobs, and their files, older than REPORT_EXPORT_RETENTION_DAYS."""
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'REPORT_EXPORT_RETENTION_DAYS', 7))
+    expired = list(ReportExportJob.objects.filter(status__in=('done', 'failed'), finished_at__lt=cutoff))
+    for job in expired:
+        if job.file:
+            job.file.delete(save=False)
+    ReportExportJob.objects.filter(pk__in=[job.pk for job in expired]).delete()
+    return len(expired)
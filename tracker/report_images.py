@@ -0,0 +1,96 @@
+"""
+Process-wide image cache for the PDF health report.
+
+Report images are decoded once, scaled down to the size they are drawn at
+(``REPORT_IMAGE_DPI``), and kept as ReportLab ImageReaders. Entries are
+keyed by path and mtime, so a replaced file is picked up on the next export.
+The static logo has its own small cache so avatars never evict it. Avatars
+share a bounded LRU of ``REPORT_AVATAR_CACHE_SIZE`` entries.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from PIL import Image as PILImage
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable
+
+# Embedded resolution: print quality for the sub-inch header images, which
+# would otherwise carry every pixel of the source (the logo is ~2600px wide).
+REPORT_IMAGE_DPI = 300
+
+
+def _load_scaled(path, max_width, max_height):
+    with PILImage.open(path) as source:
+        width, height = source.size
+        scale = min(max_width / width, max_height / height)
+        draw_width, draw_height = width * scale, height * scale
+        pixels = (
+            max(round(draw_width / 72 * REPORT_IMAGE_DPI), 1),
+            max(round(draw_height / 72 * REPORT_IMAGE_DPI), 1),
+        )
+
+        image = source
+        if image.mode not in ('1', 'L', 'LA', 'RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        if pixels[0] < width:
+            image = image.resize(pixels, PILImage.LANCZOS)
+        else:
+            image = image.copy()
+    return ImageReader(image), draw_width, draw_height
+
+
+class ScaledImageCache:
+    """LRU of (ImageReader, draw width, draw height) keyed by path, mtime and bounding box."""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _limit(self):
+        if self.max_entries is not None:
+            return self.max_entries
+        return max(getattr(settings, 'REPORT_AVATAR_CACHE_SIZE', 32), 1)
+
+    def get(self, path, max_width, max_height):
+        """The image at `path` scaled to fit max_width x max_height points; OSError if unreadable."""
+        key = (path, os.stat(path).st_mtime_ns, max_width, max_height)
+        with self._lock:
+            entry = self._images.get(key)
+            if entry is not None:
+                self._images.move_to_end(key)
+                return entry
+
+        entry = _load_scaled(path, max_width, max_height)
+        with self._lock:
+            self._images[key] = entry
+            self._images.move_to_end(key)
+            while len(self._images) > self._limit():
+                self._images.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+
+
+static_images = ScaledImageCache(max_entries=4)
+avatar_images = ScaledImageCache()
+
+
+class ReportImage(Flowable):
+    """Draws a cached ImageReader at a fixed size."""
+
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
@@ -0,0 +1,105 @@
+"""
+Per-user data behind the health report.
+
+``generate_report`` (the report summary) and ``_build_pdf_report_data`` (the
+PDF sections) both derive from one ``ReportDataset``, which reads each table
+the report uses exactly once. With ``SHARED_CACHE``, datasets are cached
+under the user's current data version. Writes to those tables drop the version
+once they commit (see signals.py), so the next export reloads, while repeated
+exports of unchanged data skip the database entirely.
+
+Those writes also happen outside the web process (run_emergency_checks,
+recompute_cycle_predictions, ...), and a per-process cache would never see
+their invalidations, so without a shared cache every export loads afresh.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import (
+    Appointment,
+    CycleLog,
+    MoodEntry,
+    Notification,
+    PeriodCheckIn,
+    PredictionFeedback,
+    SymptomLog,
+    UserDocument,
+)
+
+HEALTH_ATTENTION_TITLE = 'Health Attention Needed'
+
+
+class ReportDataset:
+    """
+    Every row the report reads for one user, one query per table. Symptom and
+    mood entries are (name, date) tuples in date order.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.cycle_logs = list(
+            CycleLog.objects.filter(user_id=user_id)
+            .exclude(last_period_start__isnull=True)
+            .order_by('-last_period_start', '-created_at')
+        )
+        self.checkins = {item.cycle_log_id: item for item in PeriodCheckIn.objects.filter(user_id=user_id)}
+        self.symptom_entries = list(
+            SymptomLog.objects.filter(user_id=user_id).order_by('date', 'id').values_list('symptom', 'date')
+        )
+        self.mood_entries = list(
+            MoodEntry.objects.filter(user_id=user_id).order_by('date', 'id').values_list('mood', 'date')
+        )
+        self.feedback = list(PredictionFeedback.objects.filter(user_id=user_id).values_list('is_correct', flat=True))
+        self.health_alerts = list(
+            Notification.objects.filter(user_id=user_id, title=HEALTH_ATTENTION_TITLE).order_by('-created_at')[:15]
+        )
+        self.documents = list(UserDocument.objects.filter(user_id=user_id).order_by('-uploaded_at'))
+        self.appointments = list(
+            Appointment.objects.filter(user_id=user_id)
+            .select_related('doctor', 'doctor__doctor_profile', 'availability')
+            .order_by('-created_at')
+        )
+
+
+def dataset_cache_enabled():
+    return getattr(settings, 'SHARED_CACHE', False)
+
+
+def _version_key(user_id):
+    return f'report_data_version:{user_id}'
+
+
+def get_report_data_version(user_id):
+    """An opaque token that changes whenever the user's report data does."""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Random rather than a counter, so a version lost to eviction can never
+        # come back and match a dataset cached before it.
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def get_report_dataset(user_id):
+    """The user's ReportDataset, cached until their report data changes when the cache is shared."""
+    if not dataset_cache_enabled():
+        return ReportDataset(user_id)
+    # Read the version before loading: a write that commits meanwhile drops this
+    # version, so whatever is loaded here can never be served for newer data.
+    cache_key = f'report_dataset:{user_id}:{get_report_data_version(user_id)}'
+    dataset = cache.get(cache_key)
+    if dataset is None:
+        dataset = ReportDataset(user_id)
+        cache.set(cache_key, dataset, getattr(settings, 'REPORT_DATASET_CACHE_SECONDS', 3600))
+    return dataset
+
+
+def invalidate_report_datasets(*user_ids):
+    """Start a new data version for each user once the current transaction commits."""
+    keys = [_version_key(user_id) for user_id in user_ids if user_id]
+    if keys and dataset_cache_enabled():
+        transaction.on_commit(lambda: cache.delete_many(keys))
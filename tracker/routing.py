@@ -7,4 +7,6 @@ websocket_urlpatterns = [
     re_path(r'ws/chat/(?P<room_name>\w+)/$', consumers.ChatConsumer.as_asgi()),
     # Broadcast channel for real-time conversation list updates
     re_path(r'ws/broadcast/$', consumers.BroadcastConsumer.as_asgi()),
+    # New notifications for the signed-in user
+    re_path(r'ws/notifications/$', consumers.NotificationConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -1,6 +1,20 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import DoctorProfile, SymptomLog
+from .models import (
+    Appointment,
+    Conversation,
+    CycleLog,
+    DashboardSnapshot,
+    DoctorProfile,
+    MoodEntry,
+    PeriodCheckIn,
+    PredictionFeedback,
+    SymptomLog,
+    UserDocument,
+)
+from .realtime import invalidate_conversation_lists
+from .reports import invalidate_report_datasets
+from .unread import invalidate_unread_chats
 from allauth.account.signals import user_signed_up
 from tracker.emails.utils import send_notification_email
 
@@ -48,6 +62,42 @@ def run_symptom_emergency_check(sender, instance, created, **kwargs):
     trigger_emergency_alert(instance.user)
 
 
+@receiver(post_save, sender=Conversation)
+@receiver(post_delete, sender=Conversation)
+def drop_cached_conversation_lists(sender, instance, **kwargs):
+    invalidate_conversation_lists(instance.doctor_id, instance.patient_id)
+    # e.g. marked as read; recounting is simpler than tracking the old values
+    invalidate_unread_chats(instance.doctor_id, instance.patient_id)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def drop_cached_conversation_lists_for_appointment(sender, instance, **kwargs):
+    # Conversation list items carry the participants' latest appointment id
+    invalidate_conversation_lists(instance.doctor_id, instance.user_id)
+
+
+def drop_cached_report_dataset(sender, instance, **kwargs):
+    # Bulk writes skip this; they call invalidate_report_datasets themselves
+    invalidate_report_datasets(instance.user_id)
+
+
+def drop_dashboard_risk_assessment(sender, instance, **kwargs):
+    # The dashboard reuses today's assessment until something resets it; the
+    # views that write health data store a fresh one right after.
+    DashboardSnapshot.objects.filter(user_id=instance.user_id, risk_assessed_on__isnull=False).update(
+        risk_assessment={},
+        risk_assessed_on=None,
+    )
+
+
+for report_model in (Appointment, CycleLog, MoodEntry, PeriodCheckIn, PredictionFeedback, SymptomLog, UserDocument):
+    for handler in (drop_cached_report_dataset, drop_dashboard_risk_assessment):
+        uid = f'{handler.__name__}_{report_model.__name__}'
+        post_save.connect(handler, sender=report_model, dispatch_uid=f'{uid}_save')
+        post_delete.connect(handler, sender=report_model, dispatch_uid=f'{uid}_delete')
+
+
 @receiver(user_signed_up)
 def prompt_2fa_after_allauth_signup(request, user, **kwargs):
     if request is None:
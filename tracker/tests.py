@@ -1,30 +1,96 @@
+import asyncio
+import gc
+import io
 import json
+import os
+import threading
+import time as time_module
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from datetime import timedelta
-from unittest.mock import MagicMock, patch
-
+from datetime import date, time, timedelta
+from importlib import import_module
+from unittest import skipUnless
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.apps import apps as django_apps
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
-from django.test.utils import override_settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import FileResponse
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
 from django.utils import timezone
-
+from PIL import Image as PILImage
+from reportlab.lib.units import inch
+
+from .channel_layers import PostgresChannelLayer
+from .chat_buffer import ChatMessageBuffer
+from .consumers import NotificationConsumer
+from .db_executor import ConsumerDBExecutor, get_consumer_db_executor
+from .emails.utils import send_notification_email
 from .forms import DoctorProfileForm
+from .management.sharding import split_pk_range
+from .ml.predict import (
+    CycleModelHolder,
+    cycle_features,
+    cycle_model,
+    predict_cycle,
+    predict_cycle_batch,
+    predicted_cycle_days,
+    predicted_cycle_days_batch,
+    scored_cycle_days_batch,
+)
 from .models import (
     Appointment,
     ChatMessage,
     Conversation,
     CycleLog,
+    DashboardSnapshot,
     DoctorAvailability,
     EmergencyRequest,
     DoctorProfile,
+    EmailOutbox,
+    MoodEntry,
     Notification,
+    NotificationMonthlyRollup,
     Payment,
+    ReportExportJob,
     SymptomLog,
     User,
     UserProfile,
 )
-from .views import trigger_emergency_alert
+from .realtime import get_conversation_list
+from .report_exports import run_report_export, run_report_export_batch
+from .report_images import avatar_images, static_images
+from .reports import get_report_dataset
+from .unread import get_unread_summary
+from .views import (
+    AsyncFileResponse,
+    _bulk_create_notifications,
+    _build_report_styles,
+    _create_notification,
+    _get_active_period,
+    calculate_risk_score,
+    calculate_risk_scores_bulk,
+    generate_report,
+    trigger_emergency_alert,
+)
+
+
+def _noise_png(width, height):
+    # Random pixels do not compress, so the image keeps its full size in a PDF
+    output = io.BytesIO()
+    PILImage.frombytes('RGB', (width, height), os.urandom(width * height * 3)).save(output, 'PNG')
+    return output.getvalue()
 
 
 @override_settings(
@@ -46,6 +112,8 @@ from .views import trigger_emergency_alert
 class TrackerTestCase(TestCase):
     def setUp(self):
         self.client = Client()
+        # Cached per-user responses would otherwise outlive each test's rollback
+        cache.clear()
 
         self.patient_password = 'StrongPassw0rd!123'
         self.doctor_password = 'DoctorPassw0rd!123'
@@ -311,6 +379,79 @@ class ChatAccessTests(TrackerTestCase):
         self.assertTrue(payload['consultation']['can_chat'])
         self.assertEqual(payload['consultation']['status'], 'upcoming')
 
+    def test_message_history_is_keyset_paginated(self):
+        messages = [
+            ChatMessage.objects.create(room_name=self.chat_room_name, sender=self.patient, message=f'Message {index}')
+            for index in range(5)
+        ]
+        ChatMessage.objects.create(room_name=self.chat_room_name, sender=self.doctor, message='Private note', is_note=True)
+        self._login_as(self.patient)
+        url = reverse('get_message_history', args=[self.active_chat_appointment.id])
+
+        latest = self.client.get(url, {'limit': 2}).json()
+        older = self.client.get(url, {'limit': 2, 'before_id': latest['next_cursor']}).json()
+        newer = self.client.get(url, {'after_id': messages[2].id}).json()
+
+        self.assertEqual([item['id'] for item in latest['messages']], [messages[3].id, messages[4].id])
+        self.assertTrue(latest['has_more'])
+        self.assertEqual([item['id'] for item in older['messages']], [messages[1].id, messages[2].id])
+        self.assertEqual(older['next_cursor'], messages[1].id)
+        self.assertEqual([item['id'] for item in newer['messages']], [messages[3].id, messages[4].id])
+        self.assertEqual(newer['next_cursor'], messages[4].id)
+        self.assertFalse(newer['has_more'])
+        self.assertEqual(self.client.get(url, {'before_id': 'abc'}).status_code, 400)
+
+    @patch('tracker.views.timezone.now')
+    def test_idle_poll_returns_not_modified(self, mock_now):
+        mock_now.return_value = self.chat_now
+        first = ChatMessage.objects.create(room_name=self.chat_room_name, sender=self.patient, message='Hello')
+        self._login_as(self.patient)
+        url = reverse('get_message_history', args=[self.active_chat_appointment.id])
+
+        initial = self.client.get(url, {'since_id': first.id})
+        idle = self.client.get(url, {'since_id': first.id}, HTTP_IF_NONE_MATCH=initial['ETag'])
+        other_page = self.client.get(url, HTTP_IF_NONE_MATCH=initial['ETag'])
+        second = ChatMessage.objects.create(room_name=self.chat_room_name, sender=self.doctor, message='Hi')
+        delta = self.client.get(url, {'since_id': first.id}, HTTP_IF_NONE_MATCH=initial['ETag'])
+        ChatMessage.objects.filter(pk=second.pk).update(is_read=True)
+        read = self.client.get(url, {'since_id': first.id}, HTTP_IF_NONE_MATCH=delta['ETag'])
+        self.active_chat_slot.end_time = (self.chat_now + timedelta(minutes=45)).time()
+        self.active_chat_slot.save()
+        rescheduled = self.client.get(url, {'since_id': first.id}, HTTP_IF_NONE_MATCH=delta['ETag'])
+
+        self.assertEqual(idle.status_code, 304)
+        self.assertEqual(idle['ETag'], initial['ETag'])
+        # The latest page has a different cursor, so the since_id poll's tag does not validate it
+        self.assertEqual(other_page.status_code, 200)
+        self.assertEqual(delta.status_code, 200)
+        self.assertNotEqual(delta['ETag'], initial['ETag'])
+        # first is re-sent as part of the overlap window; second is the new message
+        self.assertEqual([item['id'] for item in delta.json()['messages']], [first.id, second.id])
+        self.assertEqual(delta.json()['next_cursor'], second.id)
+        # Read receipts do not invalidate pollers' tags
+        self.assertEqual(read.status_code, 304)
+        self.assertEqual(rescheduled.status_code, 200)
+
+    @patch('tracker.views.timezone.now')
+    def test_delta_poll_picks_up_a_message_committed_below_the_cursor(self, mock_now):
+        mock_now.return_value = self.chat_now
+        old = ChatMessage.objects.create(room_name=self.chat_room_name, sender=self.patient, message='Earlier')
+        ChatMessage.objects.filter(pk=old.pk).update(timestamp=self.chat_now - timedelta(hours=1))
+        seen = ChatMessage.objects.create(id=old.id + 5, room_name=self.chat_room_name, sender=self.patient, message='Hello')
+        self._login_as(self.doctor)
+        url = reverse('get_message_history', args=[self.active_chat_appointment.id])
+
+        initial = self.client.get(url, {'since_id': seen.id})
+        # Took its id before `seen` but committed after the poller moved past it
+        late = ChatMessage.objects.create(id=old.id + 2, room_name=self.chat_room_name, sender=self.doctor, message='Late')
+        delta = self.client.get(url, {'since_id': seen.id}, HTTP_IF_NONE_MATCH=initial['ETag'])
+
+        self.assertEqual([item['id'] for item in initial.json()['messages']], [seen.id])
+        self.assertEqual(delta.status_code, 200)
+        self.assertEqual([item['id'] for item in delta.json()['messages']], [late.id, seen.id])
+        self.assertEqual(delta.json()['next_cursor'], seen.id)
+        self.assertFalse(delta.json()['has_more'])
+
     def test_chat_access_blocked_for_non_participant(self):
         outsider_client = Client()
         outsider_client.force_login(self.outsider)
@@ -419,6 +560,98 @@ class ChatAccessTests(TrackerTestCase):
         self.assertEqual(self.conversation.unread_count_doctor, 1)
         self.assertTrue(Notification.objects.filter(user=self.doctor, type='message_received').exists())
 
+    @patch('channels.layers.get_channel_layer')
+    @patch('asgiref.sync.async_to_sync', side_effect=lambda func: func)
+    @patch('tracker.views.timezone.now')
+    def test_conversation_update_goes_to_participant_groups_only(self, mock_now, mock_async_to_sync, mock_get_channel_layer):
+        mock_now.return_value = self.chat_now
+        mock_channel_layer = MagicMock()
+        mock_get_channel_layer.return_value = mock_channel_layer
+
+        self._login_as(self.patient)
+        self.client.post(
+            reverse('send_message'),
+            data=json.dumps({
+                'appointment_id': self.active_chat_appointment.id,
+                'room_name': self.chat_room_name,
+                'content': 'Hello doctor',
+            }),
+            content_type='application/json',
+        )
+
+        events = {group: event for group, event in (call.args for call in mock_channel_layer.group_send.call_args_list)}
+        self.assertNotIn('broadcast', events)
+        self.assertEqual(
+            set(events),
+            {f'chat_{self.chat_room_name}', f'user_{self.patient.id}', f'user_{self.doctor.id}'},
+        )
+        doctor_view = events[f'user_{self.doctor.id}']['conversation']
+        patient_view = events[f'user_{self.patient.id}']['conversation']
+        self.assertEqual(events[f'user_{self.doctor.id}']['type'], 'conversation_update')
+        self.assertEqual(doctor_view['last_message'], 'Hello doctor')
+        self.assertEqual(doctor_view['unread_count'], 1)
+        self.assertEqual(doctor_view['other_user']['name'], self.patient.username)
+        self.assertEqual(patient_view['unread_count'], 0)
+        self.assertEqual(patient_view['other_user']['name'], 'Dr. Dr Test')
+        self.assertEqual(patient_view['appointment_id'], self.active_chat_appointment.id)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_conversation_list_is_one_query_and_cached_until_it_changes(self):
+        self._login_as(self.patient)
+        url = reverse('get_conversations')
+
+        with self.assertNumQueries(1):
+            get_conversation_list(self.patient)
+        first = self.client.get(url).json()['conversations']
+        with self.assertNumQueries(0):
+            get_conversation_list(self.patient)
+
+        # One UPDATE: the participants are passed in rather than read back
+        with self.assertNumQueries(1):
+            Conversation.record_message(
+                self.chat_room_name, self.doctor, 'Fresh reply', timezone.now(),
+                participants=(self.doctor.id, self.patient.id),
+            )
+        updated = self.client.get(url).json()['conversations']
+        self.conversation.refresh_from_db()
+        self.conversation.mark_as_read(self.patient)
+        read = self.client.get(url).json()['conversations']
+        appointment_id = self.active_chat_appointment.id
+        get_conversation_list(self.patient)
+        self.active_chat_appointment.delete()
+        deleted = get_conversation_list(self.patient)
+
+        self.assertEqual(first[0]['appointment_id'], appointment_id)
+        self.assertEqual(first[0]['other_user']['name'], 'Dr. Dr Test')
+        self.assertEqual((updated[0]['last_message'], updated[0]['unread_count']), ('Fresh reply', 1))
+        self.assertEqual(read[0]['unread_count'], 0)
+        self.assertNotEqual(deleted[0]['appointment_id'], appointment_id)
+
+    def test_conversation_list_is_read_from_the_database_without_a_shared_cache(self):
+        get_conversation_list(self.patient)
+        # As expire_unpaid_appointments would, in a process whose invalidations never reach this one
+        Appointment.objects.filter(pk=self.active_chat_appointment.pk).delete()
+
+        with self.assertNumQueries(1):
+            conversations = get_conversation_list(self.patient)
+        self.assertNotEqual(conversations[0]['appointment_id'], self.active_chat_appointment.id)
+
+    def test_mark_read_keeps_messages_recorded_since_the_conversation_was_loaded(self):
+        self._login_as(self.doctor)
+        stale = Conversation.objects.get(pk=self.conversation.pk)
+        Conversation.record_message(self.chat_room_name, self.patient, 'Are you there?', timezone.now())
+        Conversation.record_message(self.chat_room_name, self.doctor, 'Yes', timezone.now())
+
+        stale.mark_as_read(self.doctor)
+        Conversation.record_message(self.chat_room_name, self.patient, 'Thanks', timezone.now())
+        self.client.post(reverse('mark_conversation_as_read', args=[self.active_chat_appointment.id]))
+        Conversation.record_message(self.chat_room_name, self.doctor, 'Take care', timezone.now())
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.unread_count_doctor, 0)
+        self.assertEqual(self.conversation.unread_count_patient, 2)
+        self.assertEqual(self.conversation.last_message, 'Take care')
+
 
 class DoctorProfileValidationTests(TrackerTestCase):
     def test_prevent_saving_profile_when_required_fields_are_empty(self):
@@ -513,6 +746,250 @@ class NotificationAndCycleLogTests(TrackerTestCase):
         self.assertTrue(Notification.objects.filter(user=self.patient, title='Health Warning').exists())
         mock_send_email_alert.assert_called_once_with(self.patient, symptom)
 
+    def test_unread_summary_counts_from_the_database_without_a_shared_cache(self):
+        self._login_as(self.patient)
+        url = reverse('unread_summary')
+        self.assertEqual(self.client.get(url).json(), {'notifications': 0, 'chats': 0})
+
+        # Counter adjustments made in another process would never reach this one's cache
+        Notification.objects.create(user=self.patient, title='From a worker', message='Created elsewhere')
+        Conversation.objects.filter(pk=self.conversation.pk).update(unread_count_patient=2)
+
+        self.assertEqual(self.client.get(url).json(), {'notifications': 1, 'chats': 2})
+
+    @override_settings(SHARED_CACHE=True)
+    def test_unread_summary_counters_follow_notification_and_chat_writes(self):
+        self._login_as(self.patient)
+        url = reverse('unread_summary')
+        Notification.objects.create(user=self.patient, title='Existing', message='Already there')
+
+        # Cold cache: counted from the database, then served from the counters
+        self.assertEqual(self.client.get(url).json(), {'notifications': 1, 'chats': 0})
+        with self.assertNumQueries(0):
+            get_unread_summary(self.patient.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            _create_notification(self.patient, 'Reminder', 'Log your symptoms')
+            _bulk_create_notifications([Notification(user=self.patient, title='Bulk', message='Batch alert')])
+            Conversation.record_message(
+                self.chat_room_name, self.doctor, 'Hello', timezone.now(), participants=(self.doctor.id, self.patient.id)
+            )
+        self.assertEqual(self.client.get(url).json(), {'notifications': 3, 'chats': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notification = Notification.objects.get(user=self.patient, title='Existing')
+            self.client.post(reverse('mark_as_read', args=[notification.id]))
+            # Marking it again is a no-op and does not decrement a second time
+            self.client.post(reverse('mark_as_read', args=[notification.id]))
+        self.assertEqual(self.client.get(url).json(), {'notifications': 2, 'chats': 1})
+        self.assertEqual(self.client.post(reverse('mark_as_read', args=[notification.id + 1000])).status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('mark_all_as_read'))
+            self.conversation.refresh_from_db()
+            self.conversation.mark_as_read(self.patient)
+        self.assertEqual(self.client.get(url).json(), {'notifications': 0, 'chats': 0})
+
+    @patch('channels.layers.get_channel_layer')
+    def test_new_notifications_are_pushed_resolved_once_per_user_on_commit(self, mock_get_channel_layer):
+        mock_channel_layer = MagicMock()
+        mock_channel_layer.group_send = AsyncMock()
+        mock_get_channel_layer.return_value = mock_channel_layer
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            _bulk_create_notifications([
+                Notification(user_id=self.patient.id, title='Appointment confirmed', message='Your appointment is booked'),
+                Notification(user_id=self.patient.id, title='Cycle update', message='Log today'),
+                Notification(user_id=self.doctor.id, title='New appointment request', message='A patient booked'),
+            ])
+        mock_channel_layer.group_send.assert_not_awaited()
+        with self.assertNumQueries(1):
+            for callback in callbacks:
+                callback()
+
+        events = dict(call.args for call in mock_channel_layer.group_send.await_args_list)
+        self.assertEqual(set(events), {f'notifications_{self.patient.id}', f'notifications_{self.doctor.id}'})
+        event = events[f'notifications_{self.patient.id}']
+        self.assertEqual(event['type'], 'notifications_created')
+        self.assertEqual([item['title'] for item in event['notifications']], ['Appointment confirmed', 'Cycle update'])
+        self.assertEqual(
+            (event['notifications'][0]['target_url'], event['notifications'][0]['target_section_id']),
+            (reverse('appointment'), 'appointments-section'),
+        )
+        self.assertEqual(event['unread_count'], 2)
+
+    def test_in_memory_layer_skips_users_without_a_local_socket(self):
+        with patch.object(get_channel_layer(), 'group_send', new=AsyncMock()) as group_send:
+            with self.captureOnCommitCallbacks(execute=True):
+                _create_notification(self.patient, 'Appointment confirmed', 'Your appointment is booked')
+
+        group_send.assert_not_awaited()
+
+    def test_targets_are_stored_at_write_time_and_backfilled(self):
+        _create_notification(self.doctor, 'New appointment request', 'A patient booked a session')
+        _bulk_create_notifications([Notification(user_id=self.patient.id, title='Cycle update', message='Log today')])
+        Notification.objects.bulk_create([
+            Notification(user=self.patient, title='Report ready', message='Your trend analysis'),
+            Notification(user=self.doctor, title='Password changed', message='Account security'),
+            Notification(user=self.patient, title='Kept', message='Explicit', target_section_id='custom-section'),
+        ])
+
+        call_command('backfill_notification_targets', chunk_size=1, stdout=MagicMock())
+
+        targets = {
+            item.title: (item.target_url, item.target_section_id)
+            for item in Notification.objects.filter(user__in=[self.patient, self.doctor])
+        }
+        self.assertEqual(targets['New appointment request'], (reverse('doctor_appointment'), 'appointments-section'))
+        self.assertEqual(targets['Cycle update'], (reverse('dashboard_home'), 'symptoms-section'))
+        self.assertEqual(targets['Report ready'], (reverse('dashboard_reports'), 'reports-section'))
+        self.assertEqual(targets['Password changed'], (reverse('doctor_settings'), 'settings-section'))
+        self.assertEqual(targets['Kept'], ('', 'custom-section'))
+
+    def test_prune_deletes_old_read_rows_in_chunks_and_keeps_monthly_counts(self):
+        old = timezone.now() - timedelta(days=200)
+        rows = Notification.objects.bulk_create([
+            Notification(user=self.patient, title='Old read 1', message='x', type='cycle', is_read=True),
+            Notification(user=self.patient, title='Old read 2', message='x', type='cycle', is_read=True),
+            Notification(user=self.doctor, title='Old read 3', message='x', type='system', is_read=True),
+            Notification(user=self.doctor, title='Old unread', message='x', type='system'),
+        ])
+        Notification.objects.filter(id__in=[row.id for row in rows]).update(created_at=old)
+        Notification.objects.create(user=self.patient, title='Recent read', message='x', type='cycle', is_read=True)
+        untouched = NotificationMonthlyRollup.objects.create(month=date(2020, 1, 1), type='cycle', total_count=7, pruned_count=7)
+
+        call_command('prune_notifications', days=30, chunk_size=2, stdout=MagicMock())
+
+        titles = ['Old read 1', 'Old read 2', 'Old read 3', 'Old unread', 'Recent read']
+        self.assertEqual(
+            set(Notification.objects.filter(title__in=titles).values_list('title', flat=True)),
+            {'Old unread', 'Recent read'},
+        )
+        month = timezone.localtime(old).date().replace(day=1)
+        counts = {
+            rollup.type: (rollup.total_count, rollup.pruned_count)
+            for rollup in NotificationMonthlyRollup.objects.filter(month=month)
+        }
+        self.assertEqual(counts, {'cycle': (2, 2), 'system': (2, 1)})
+        # Only the months this run pruned from are recounted
+        self.assertEqual(set(NotificationMonthlyRollup.objects.values_list('month', flat=True)), {month, untouched.month})
+        self.assertEqual(NotificationMonthlyRollup.objects.get(pk=untouched.pk).updated_at, untouched.updated_at)
+
+    def test_notification_socket_relays_its_users_group(self):
+        async def listen():
+            communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+            communicator.scope['user'] = self.patient
+            connected, _ = await communicator.connect()
+            await get_channel_layer().group_send(
+                f'notifications_{self.patient.id}',
+                {'type': 'notifications_created', 'notifications': [{'id': 1}, {'id': 2}], 'unread_count': 4},
+            )
+            received = [json.loads(await communicator.receive_from(timeout=2)) for _ in range(2)]
+            await communicator.disconnect()
+            return connected, received
+
+        connected, received = asyncio.run(listen())
+
+        self.assertTrue(connected)
+        self.assertEqual(received, [
+            {'type': 'notification', 'notification': {'id': 1}, 'unread_count': 4},
+            {'type': 'notification', 'notification': {'id': 2}, 'unread_count': 4},
+        ])
+
+    def test_notification_socket_tells_logged_out_pages_not_to_reconnect(self):
+        async def listen():
+            communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+            communicator.scope['user'] = AnonymousUser()
+            connected, _ = await communicator.connect()
+            closed = await communicator.receive_output(timeout=2)
+            await communicator.wait()
+            return connected, closed
+
+        connected, closed = asyncio.run(listen())
+
+        self.assertTrue(connected)
+        self.assertEqual(closed, {'type': 'websocket.close', 'code': 4401})
+
+    def test_dedup_key_writes_one_row_per_user_and_key(self):
+        key = f'period_day:{timezone.localdate()}'
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = _create_notification(self.patient, 'Period Day Reminder', 'Log today', 'cycle', dedup_key=key)
+            duplicate = _create_notification(self.patient, 'Period Day Reminder', 'Log today', 'cycle', dedup_key=key)
+            created = _bulk_create_notifications([
+                Notification(user_id=self.patient.id, title='Period Day Reminder', message='Log today', dedup_key=key),
+                Notification(user_id=self.doctor.id, title='Period Day Reminder', message='Log today', dedup_key=key),
+            ])
+
+        self.assertIsNotNone(first.pk)
+        self.assertIsNone(duplicate)
+        self.assertEqual([(item.user_id, bool(item.pk)) for item in created], [(self.doctor.id, True)])
+        self.assertEqual(Notification.objects.filter(dedup_key=key).count(), 2)
+        self.assertEqual(get_unread_summary(self.patient.id)['notifications'], 1)
+
+    def test_key_taken_by_another_sender_in_the_same_tick_is_not_reported_as_inserted(self):
+        key = f'period_day:{timezone.localdate()}'
+        tick = timezone.now()
+
+        with patch('django.utils.timezone.now', return_value=tick):
+            theirs = Notification.objects.create(user=self.patient, title='Period Day Reminder', message='Log today', dedup_key=key)
+            created = _bulk_create_notifications([
+                Notification(user_id=self.patient.id, title='Period Day Reminder', message='Log today', target_url='/', dedup_key=key),
+            ])
+
+        self.assertEqual(created, [])
+        self.assertEqual(list(Notification.objects.filter(dedup_key=key).values_list('pk', flat=True)), [theirs.pk])
+
+    @skipUnless(connection.vendor == 'postgresql', 'RETURNING path is PostgreSQL only')
+    def test_keyed_insert_is_one_statement_on_postgresql(self):
+        key = f'period_day:{timezone.localdate()}'
+        _create_notification(self.patient, 'Period Day Reminder', 'Log today', 'cycle', dedup_key=key)
+
+        rows = [
+            Notification(user_id=user_id, title='Period Day Reminder', message='Log today', target_url='/', dedup_key=key)
+            for user_id in (self.patient.id, self.doctor.id, self.doctor.id)
+        ]
+
+        with self.assertNumQueries(1):
+            created = _bulk_create_notifications(rows)
+
+        self.assertEqual(len(created), 1)
+        self.assertEqual(Notification.objects.get(pk=created[0].pk).user_id, self.doctor.id)
+
+    def test_migration_backfills_keys_for_reminders_already_sent_today(self):
+        migration = import_module('tracker.migrations.0042_notification_dedup_key')
+        today = timezone.localdate()
+        sent = [
+            Notification.objects.create(user=self.patient, title='Period Day Reminder', message='Log today'),
+            Notification.objects.create(user=self.patient, title='Period Day Reminder', message='Log today'),
+            Notification.objects.create(
+                user=self.patient,
+                title='Health Attention Needed',
+                message='You have been experiencing cramps for multiple days. This may require attention.',
+            ),
+            Notification.objects.create(
+                user=self.doctor,
+                title='Emergency consultation request',
+                message='A patient requires urgent consultation. Request #7.',
+            ),
+            Notification.objects.create(user=self.patient, title='Appointment booked', message='See you soon'),
+        ]
+        yesterday = Notification.objects.create(user=self.doctor, title='Delayed Period Reminder', message='Late')
+        Notification.objects.filter(pk=yesterday.pk).update(created_at=timezone.now() - timedelta(days=1))
+
+        migration.backfill_todays_dedup_keys(django_apps, None)
+
+        keys = dict(Notification.objects.values_list('id', 'dedup_key'))
+        self.assertEqual([keys[item.pk] for item in sent], [
+            f'period_day:{today}',
+            None,
+            f'health_attention:cramps:{today}',
+            f'emergency:7:{today}',
+            None,
+        ])
+        self.assertIsNone(keys[yesterday.pk])
+        self.assertIsNone(_create_notification(self.patient, 'Period Day Reminder', 'Log today', 'cycle', dedup_key=f'period_day:{today}'))
+
 
 class EmergencyTriggerTests(TrackerTestCase):
     @patch('tracker.views.send_emergency_email')
@@ -632,3 +1109,643 @@ class PaymentFlowTests(TrackerTestCase):
                 type='appointment_accepted',
             ).exists()
         )
+
+
+class CycleModelLoaderTests(TestCase):
+    def test_model_is_loaded_once_on_first_use(self):
+        holder = CycleModelHolder()
+        self.assertFalse(holder.is_loaded)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            models = list(executor.map(lambda _: holder.get(), range(8)))
+
+        self.assertTrue(holder.is_loaded)
+        self.assertTrue(all(model is models[0] for model in models))
+
+    def test_predict_cycle_returns_float(self):
+        self.assertIsInstance(predict_cycle([28, 5, 5, 3, 2, 0, 22.0]), float)
+
+    def test_batch_prediction_matches_single_row_prediction(self):
+        rows = [
+            [28, 5, 5, 3, 2, 0, 22.0],
+            [32, 7, 6, 6, 3, 1, None],
+        ]
+
+        batch = predict_cycle_batch(rows)
+
+        self.assertEqual(len(batch), 2)
+        self.assertEqual(batch.tolist(), [predict_cycle(row) for row in rows])
+        self.assertEqual(scored_cycle_days_batch(rows), [round(predict_cycle(row)) for row in rows])
+
+
+class RecomputeCyclePredictionsTests(TrackerTestCase):
+    def _create_cycle_logs(self):
+        first_start = timezone.localdate() - timedelta(days=40)
+        return [
+            CycleLog.objects.create(
+                user=self.patient,
+                last_period_start=start,
+                length_of_cycle=length,
+                length_of_menses=5,
+                mean_menses_length=5,
+                mean_bleeding_intensity=2,
+                total_menses_score=3,
+                height_cm=165,
+                weight_kg=62,
+                bmi=22.8,
+            )
+            for start, length in ((first_start, 28), (first_start + timedelta(days=30), 32))
+        ]
+
+    def test_command_applies_the_add_cycle_log_prediction_rule(self):
+        cycle_logs = self._create_cycle_logs()
+
+        call_command('recompute_cycle_predictions', chunk_size=1, stdout=MagicMock())
+
+        # The mean of the cycle lengths logged up to each cycle, as add_cycle_log predicts
+        for cycle_log, expected_days in zip(cycle_logs, (28, 30)):
+            cycle_log.refresh_from_db()
+            self.assertEqual(cycle_log.predicted_next_period, cycle_log.last_period_start + timedelta(days=expected_days))
+            self.assertEqual(cycle_log.estimated_ovulation_day, cycle_log.predicted_next_period - timedelta(days=14))
+            self.assertEqual(cycle_log.fertile_window_end, cycle_log.estimated_ovulation_day)
+
+    def test_model_scores_only_cycles_without_logged_lengths(self):
+        features = [28, 5, 5, 3, 2, 0, 22.8]
+
+        days = predicted_cycle_days_batch([[28, 32], []], [features, features])
+
+        self.assertEqual(days, [30, round(predict_cycle(features))])
+        self.assertEqual(predicted_cycle_days([], features), days[1])
+
+    def test_model_option_rescores_every_log_with_the_current_model(self):
+        cycle_logs = self._create_cycle_logs()
+        retrained = MagicMock()
+        retrained.predict.side_effect = lambda matrix: np.full(len(matrix), 35.0)
+
+        call_command('recompute_cycle_predictions', model=True, stdout=MagicMock())
+        scored = [CycleLog.objects.get(pk=log.pk).predicted_next_period for log in cycle_logs]
+        with patch.object(cycle_model, 'get', return_value=retrained):
+            call_command('recompute_cycle_predictions', model=True, chunk_size=2, stdout=MagicMock())
+
+        # One feature matrix for the whole batch, and the new model's scores stored
+        self.assertEqual(retrained.predict.call_count, 1)
+        self.assertEqual(retrained.predict.call_args[0][0].shape, (2, 7))
+        for cycle_log, before in zip(cycle_logs, scored):
+            cycle_log.refresh_from_db()
+            self.assertEqual(before, cycle_log.last_period_start + timedelta(days=round(predict_cycle(cycle_features(cycle_log)))))
+            self.assertEqual(cycle_log.predicted_next_period, cycle_log.last_period_start + timedelta(days=35))
+
+
+class DashboardSnapshotTests(TrackerTestCase):
+    def test_write_views_refresh_snapshot_sections(self):
+        self._login_as(self.patient)
+
+        self.client.post(reverse('submit_mood_checkin'), {'mood': 'calm'})
+        self.client.post(reverse('save_symptoms'), {'symptoms': ['Fatigue', 'Headache']})
+
+        snapshot = DashboardSnapshot.objects.get(user=self.patient)
+        self.assertEqual(snapshot.mood_counts, {'calm': 1})
+        self.assertEqual(
+            {item['symptom'] for item in snapshot.symptom_frequency},
+            {'Fatigue', 'Headache'},
+        )
+        self.assertEqual(snapshot.risk_assessed_on, timezone.localdate())
+
+    @patch('tracker.views.check_period_delay')
+    @patch('tracker.views.trigger_emergency_alert', wraps=trigger_emergency_alert)
+    def test_dashboard_reuses_todays_snapshot(self, mock_trigger_emergency_alert, mock_check_period_delay):
+        SymptomLog.objects.create(user=self.patient, symptom='Fatigue', source='manual', date=timezone.localdate())
+        mock_trigger_emergency_alert.reset_mock()
+        self._login_as(self.patient)
+
+        first_response = self.client.get(reverse('dashboard_home'))
+        second_response = self.client.get(reverse('dashboard_home'))
+
+        self.assertEqual(first_response.status_code, 200)
+        self.assertEqual(second_response.context['symptom_frequency'], [{'symptom': 'Fatigue', 'count': 1}])
+        self.assertEqual(mock_trigger_emergency_alert.call_count, 1)
+        self.assertEqual(mock_check_period_delay.call_count, 1)
+
+        # A symptom written outside the dashboard's own views still resets today's assessment
+        SymptomLog.objects.create(user=self.patient, symptom='Dizziness', source='manual', date=timezone.localdate())
+        third_response = self.client.get(reverse('dashboard_home'))
+
+        self.assertEqual(mock_trigger_emergency_alert.call_count, 3)
+        self.assertEqual(third_response.status_code, 200)
+        self.assertEqual(DashboardSnapshot.objects.get(user=self.patient).risk_assessment['symptoms'], ['Dizziness', 'Fatigue'])
+
+    def test_dashboard_picks_the_same_active_period_as_the_period_views(self):
+        today = timezone.localdate()
+        fields = {
+            'length_of_cycle': 28,
+            'length_of_menses': 5,
+            'mean_menses_length': 5,
+            'mean_bleeding_intensity': 2,
+            'total_menses_score': 3,
+            'height_cm': 165,
+            'weight_kg': 62,
+        }
+        confirmed = CycleLog.objects.create(user=self.patient, start_date=today, actual_start_date=today, last_period_start=today, **fields)
+        # Same start, logged later, without the confirmed date
+        CycleLog.objects.create(user=self.patient, start_date=today, last_period_start=today, **fields)
+        self._login_as(self.patient)
+
+        response = self.client.get(reverse('dashboard_home'))
+
+        self.assertEqual(_get_active_period(self.patient), confirmed)
+        self.assertEqual(response.context['active_period'], confirmed)
+
+
+class ReportExportTests(TrackerTestCase):
+    @override_settings(SHARED_CACHE=True)
+    def test_export_loads_each_table_once_and_reuses_it_until_data_changes(self):
+        today = timezone.localdate()
+        SymptomLog.objects.create(user=self.patient, symptom='Fatigue', source='manual', date=today)
+        MoodEntry.objects.create(user=self.patient, mood='calm', date=today)
+        self._login_as(self.patient)
+
+        with CaptureQueriesContext(connection) as first_export:
+            response = self.client.get(reverse('export_reports_pdf'))
+        with CaptureQueriesContext(connection) as second_export:
+            self.client.get(reverse('export_reports_pdf'))
+
+        def report_table_reads(queries):
+            return [
+                query['sql'] for query in queries
+                if 'FROM "tracker_symptomlog"' in query['sql'] or 'FROM "tracker_moodentry"' in query['sql']
+            ]
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(len(report_table_reads(first_export.captured_queries)), 2)
+        self.assertEqual(report_table_reads(second_export.captured_queries), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SymptomLog.objects.create(user=self.patient, symptom='Headache', source='manual', date=today)
+
+        report = generate_report(self.patient)
+        self.assertEqual(
+            {item['symptom'] for item in report['symptom_report']['most_frequent_symptoms']},
+            {'Fatigue', 'Headache'},
+        )
+        self.assertEqual(report['symptom_report']['mood_trends'], [{'mood': 'calm', 'count': 1}])
+
+    def test_export_loads_afresh_without_a_shared_cache(self):
+        today = timezone.localdate()
+        SymptomLog.objects.create(user=self.patient, symptom='Fatigue', source='manual', date=today)
+        generate_report(self.patient)
+
+        # As a worker process would: the write's invalidation never reaches this process
+        SymptomLog.objects.create(user=self.patient, symptom='Headache', source='manual', date=today)
+
+        report = generate_report(self.patient)
+        self.assertEqual(
+            {item['symptom'] for item in report['symptom_report']['most_frequent_symptoms']},
+            {'Fatigue', 'Headache'},
+        )
+
+    @override_settings(REPORT_EXPORT_BACKGROUND=True)
+    def test_background_export_is_queued_once_and_linked_from_a_notification(self):
+        self._login_as(self.patient)
+
+        first = self.client.get(reverse('export_reports_pdf'))
+        self.client.get(reverse('export_reports_pdf'))
+
+        self.assertRedirects(first, reverse('dashboard_reports'), fetch_redirect_response=False)
+        job = ReportExportJob.objects.get(user=self.patient)
+        self.assertEqual(job.status, 'pending')
+
+        call_command('run_report_exports', stdout=MagicMock())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        download_url = reverse('download_report_export', args=[job.pk])
+        notification = Notification.objects.get(user=self.patient, title='Report export completed')
+        self.assertEqual(notification.target_url, download_url)
+
+        response = self.client.get(download_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+        self._login_as(self.outsider)
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+        job.file.delete()
+
+    @override_settings(REPORT_EXPORT_MAX_ATTEMPTS=2)
+    def test_export_worker_survives_failures_and_gives_up_after_max_attempts(self):
+        flaky = ReportExportJob.objects.create(user_id=self.patient.id)
+        abandoned = ReportExportJob.objects.create(
+            user_id=self.doctor.id, status='running', attempts=2, started_at=timezone.now() - timedelta(hours=1),
+        )
+
+        # Fails after the PDF is in storage: the batch carries on and the job is queued again
+        with patch('tracker.views._create_notification', side_effect=RuntimeError('database went away')):
+            first = run_report_export_batch(batch_size=1)
+        flaky.refresh_from_db()
+        self.assertEqual(first, {'done': 0, 'retried': 1, 'failed': 0})
+        self.assertEqual((flaky.status, flaky.attempts, flaky.file.name), ('pending', 1, ''))
+
+        second = run_report_export_batch(batch_size=5)
+        flaky.refresh_from_db()
+        abandoned.refresh_from_db()
+        self.assertEqual(second, {'done': 1, 'retried': 0, 'failed': 1})
+        self.assertEqual((flaky.status, flaky.attempts), ('done', 2))
+        # Its worker died on both attempts it was allowed
+        self.assertEqual((abandoned.status, abandoned.attempts), ('failed', 3))
+        self.assertTrue(Notification.objects.filter(user=self.doctor, title='Report export failed').exists())
+        flaky.file.delete()
+
+    @override_settings(SHARED_CACHE=True)
+    def test_export_worker_renders_from_the_data_at_run_time(self):
+        get_report_dataset(self.patient.id)
+        # Committed by another process: this process's cached dataset is never dropped
+        SymptomLog.objects.create(user=self.patient, symptom='Cramps', source='manual', date=timezone.localdate())
+        job = ReportExportJob.objects.create(user_id=self.patient.id, status='running')
+
+        with CaptureQueriesContext(connection) as run:
+            self.assertEqual(run_report_export(job), 'done')
+
+        self.assertTrue(any('FROM "tracker_symptomlog"' in query['sql'] for query in run.captured_queries))
+        job.file.delete()
+
+    @override_settings(REPORT_PDF_SPOOL_MAX_BYTES=16 * 1024)
+    def test_large_export_is_streamed_to_asgi_servers_from_disk(self):
+        first_day = timezone.localdate() - timedelta(days=119)
+        MoodEntry.objects.bulk_create([
+            MoodEntry(user=self.patient, mood='calm', date=first_day + timedelta(days=offset)) for offset in range(120)
+        ])
+        SymptomLog.objects.bulk_create([
+            SymptomLog(user=self.patient, symptom=symptom, date=first_day + timedelta(days=offset))
+            for offset in range(120)
+            for symptom in ('Cramps', 'Fatigue', 'Headache')
+        ])
+        CycleLog.objects.bulk_create([
+            CycleLog(
+                user=self.patient,
+                last_period_start=first_day + timedelta(days=offset),
+                length_of_cycle=28,
+                length_of_menses=5,
+                mean_menses_length=5,
+                mean_bleeding_intensity=2,
+                total_menses_score=3,
+                height_cm=165,
+                weight_kg=62,
+            )
+            for offset in range(0, 120, 28)
+        ])
+        self.patient_profile.profile_picture = SimpleUploadedFile('avatar.png', _noise_png(400, 400), content_type='image/png')
+        self.patient_profile.save()
+        self.addCleanup(self.patient_profile.profile_picture.delete, save=False)
+        self.async_client.force_login(self.patient)
+        url = reverse('export_reports_pdf')
+
+        async def export():
+            response = await self.async_client.get(url)
+            # ReportLab builds the whole PDF in memory while rendering; once it is
+            # spooled to disk, only what is still reachable counts
+            gc.collect()
+            held = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.reset_peak()
+            streaming_from = tracemalloc.get_traced_memory()[0]
+            # The ASGI handler consumes responses through __aiter__
+            size = 0
+            async for chunk in response:
+                size += len(chunk)
+            stream_peak = tracemalloc.get_traced_memory()[1] - streaming_from
+            return response, size, held, stream_peak
+
+        async def warm_up():
+            async for _ in await self.async_client.get(url):
+                pass
+
+        # Warm the lazy imports and image caches so only the export itself is measured
+        async_to_sync(warm_up)()
+
+        tracemalloc.start()
+        try:
+            gc.collect()
+            before = tracemalloc.get_traced_memory()[0]
+            # Blocks well under the PDF size, so reading it whole would show
+            with patch.object(AsyncFileResponse, 'block_size', 8 * 1024):
+                response, size, held, stream_peak = async_to_sync(export)()
+        finally:
+            tracemalloc.stop()
+
+        measured = f'{size} B PDF, held {held} B, stream peak {stream_peak} B'
+        self.assertIsInstance(response, AsyncFileResponse)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(int(response['Content-Length']), size)
+        self.assertGreater(size, 8 * 16 * 1024, measured)
+        self.assertLess(held, size // 2, measured)
+        # Read a block at a time rather than listed whole by StreamingHttpResponse.__aiter__
+        self.assertLess(stream_peak, size // 4, measured)
+
+        # WSGI requests keep the plain, synchronously read FileResponse
+        self._login_as(self.patient)
+        wsgi_response = self.client.get(url)
+        self.assertIs(type(wsgi_response), FileResponse)
+        self.assertEqual(len(b''.join(wsgi_response.streaming_content)), size)
+
+    def test_report_styles_and_images_are_decoded_once_per_process(self):
+        self.patient_profile.profile_picture = SimpleUploadedFile('avatar.png', _noise_png(800, 600), content_type='image/png')
+        self.patient_profile.save()
+        avatar_path = self.patient_profile.profile_picture.path
+        self.addCleanup(self.patient_profile.profile_picture.delete, save=False)
+        avatar_images.clear()
+        static_images.clear()
+        self._login_as(self.patient)
+
+        with patch('tracker.report_images.PILImage.open', wraps=PILImage.open) as image_open:
+            self.client.get(reverse('export_reports_pdf'))
+            self.client.get(reverse('export_reports_pdf'))
+
+        # The logo and the avatar, on the first export only
+        self.assertEqual(image_open.call_count, 2)
+        self.assertIs(_build_report_styles(), _build_report_styles())
+
+        reader, width, height = avatar_images.get(avatar_path, 0.72 * inch, 0.72 * inch)
+        # Scaled down to the drawn size at REPORT_IMAGE_DPI rather than embedded at 800x600
+        self.assertEqual(reader.getSize(), (216, 162))
+        self.assertAlmostEqual(width, 0.72 * inch)
+        self.assertAlmostEqual(height, 0.54 * inch)
+
+        # A replaced photo has a new mtime and is decoded again
+        stat = os.stat(avatar_path)
+        os.utime(avatar_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNot(avatar_images.get(avatar_path, 0.72 * inch, 0.72 * inch)[0], reader)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_benchmark_windowed_cycle_counts_match_full_scan(self):
+        out = io.StringIO()
+
+        # Raises CommandError if the bisect windows and the full scan disagree
+        with patch('tracker.reports.cache') as mock_cache:
+            call_command('benchmark_report_export', years=1, stdout=out)
+
+        self.assertIn('14 cycles, 365 mood and 1095 symptom entries', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='reportbench-').exists())
+        self.assertFalse(MoodEntry.objects.exists())
+        # Nothing about the rolled-back user reaches the shared cache
+        mock_cache.add.assert_not_called()
+        mock_cache.set.assert_not_called()
+
+
+class BulkEmergencyCheckTests(TrackerTestCase):
+    def _log_symptoms(self, user, symptoms_by_offset):
+        today = timezone.localdate()
+        SymptomLog.objects.bulk_create([
+            SymptomLog(user=user, symptom=symptom, source='manual', date=today - timedelta(days=offset))
+            for offset, symptoms in symptoms_by_offset.items()
+            for symptom in symptoms
+        ])
+
+    def test_bulk_scores_match_per_user_scores(self):
+        self._log_symptoms(self.patient, {0: ['Pelvic Pain', 'Fatigue'], 1: ['Pelvic Pain'], 2: ['Pelvic Pain']})
+        self._log_symptoms(self.outsider, {0: ['Headache'], 1: ['Headache']})
+
+        assessments = calculate_risk_scores_bulk()
+
+        self.assertEqual(assessments[self.patient.id], calculate_risk_score(self.patient))
+        self.assertEqual(assessments[self.outsider.id], calculate_risk_score(self.outsider))
+        self.assertNotIn(self.doctor.id, assessments)
+
+    @patch('tracker.views.send_emergency_email')
+    def test_command_creates_each_alert_once(self, mock_send_emergency_email):
+        self._log_symptoms(self.patient, {0: ['Pelvic Pain', 'Fatigue'], 1: ['Pelvic Pain'], 2: ['Pelvic Pain']})
+
+        call_command('run_emergency_checks', stdout=MagicMock())
+        call_command('run_emergency_checks', stdout=MagicMock())
+
+        self.assertEqual(
+            Notification.objects.filter(user=self.patient, title='Health Alert', type='cycle').count(),
+            1,
+        )
+        mock_send_emergency_email.assert_called_once()
+
+
+class ShardedCommandTests(TrackerTestCase):
+    def test_split_pk_range_covers_range_without_gaps(self):
+        self.assertEqual(split_pk_range(1, 10, 3), [(1, 3), (4, 6), (7, 10)])
+        self.assertEqual(split_pk_range(5, 6, 4), [(5, 5), (6, 6)])
+        self.assertEqual(split_pk_range(None, None, 2), [])
+
+    def test_expire_unpaid_appointments_only_touches_its_shard(self):
+        overdue = []
+        for hour in (8, 9):
+            slot = self._create_availability(
+                self.doctor,
+                timezone.localdate() + timedelta(days=1),
+                time(hour, 0),
+                time(hour, 30),
+                is_active=False,
+            )
+            overdue.append(Appointment.objects.create(
+                user=self.patient,
+                doctor=self.doctor,
+                availability=slot,
+                status='awaiting_payment',
+                payment_due_at=timezone.now() - timedelta(minutes=5),
+            ))
+
+        call_command('expire_unpaid_appointments', shard='0/2', stdout=MagicMock())
+
+        self.assertFalse(Appointment.objects.filter(pk=overdue[0].pk).exists())
+        self.assertTrue(Appointment.objects.filter(pk=overdue[1].pk).exists())
+        overdue[0].availability.refresh_from_db()
+        self.assertTrue(overdue[0].availability.is_active)
+
+
+@override_settings(EMAIL_OUTBOX_ENABLED=True, EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+class EmailOutboxTests(TrackerTestCase):
+    def test_email_is_queued_then_sent_by_worker(self):
+        self.assertTrue(send_notification_email(self.patient, 'Your report is ready.'))
+
+        queued = EmailOutbox.objects.get(recipient_email=self.patient.email)
+        self.assertEqual(queued.status, 'pending')
+        self.assertEqual(mail.outbox, [])
+
+        call_command('send_outbox', stdout=MagicMock())
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'sent')
+        self.assertIn([self.patient.email], [message.to for message in mail.outbox])
+
+    @patch('django.core.mail.EmailMultiAlternatives.send', side_effect=OSError('SMTP unavailable'))
+    def test_failed_email_backs_off_then_dead_letters(self, mock_send):
+        send_notification_email(self.patient, 'Your report is ready.')
+
+        call_command('send_outbox', stdout=MagicMock())
+        queued = EmailOutbox.objects.get(recipient_email=self.patient.email)
+        self.assertEqual(queued.status, 'pending')
+        self.assertEqual(queued.attempts, 1)
+        self.assertGreater(queued.next_attempt_at, timezone.now())
+
+        EmailOutbox.objects.filter(pk=queued.pk).update(next_attempt_at=timezone.now())
+        call_command('send_outbox', stdout=MagicMock())
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'dead')
+        self.assertIn('SMTP unavailable', queued.last_error)
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_path_queries_use_composite_indexes(self):
+        call_command('check_query_plans', stdout=MagicMock())
+
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs concurrent writers')
+class ConversationCounterConcurrencyTests(TransactionTestCase):
+    def test_parallel_messages_do_not_lose_unread_increments(self):
+        patient = User.objects.create_user(username='race-patient', password='x', role='user')
+        doctor = User.objects.create_user(username='race-doctor', password='x', role='doctor')
+        room_name = f'chat_{patient.id}_{doctor.id}'
+        Conversation.objects.create(doctor=doctor, patient=patient, room_name=room_name)
+
+        def send(number):
+            sender = patient if number % 3 else doctor
+            try:
+                Conversation.record_message(room_name, sender, f'Message {number}', timezone.now())
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(send, range(60)))
+
+        conversation = Conversation.objects.get(room_name=room_name)
+        self.assertEqual(conversation.unread_count_doctor, 40)
+        self.assertEqual(conversation.unread_count_patient, 20)
+
+
+
+class ChatWriteBehindTests(TransactionTestCase):
+    def test_buffer_flushes_full_batches_and_drains_the_rest(self):
+        patient = User.objects.create_user(username='buffer-patient', password='x', role='user')
+        doctor = User.objects.create_user(username='buffer-doctor', password='x', role='doctor')
+        room_name = f'chat_{patient.id}_{doctor.id}'
+        Conversation.objects.create(doctor=doctor, patient=patient, room_name=room_name)
+        buffer = ChatMessageBuffer(flush_interval=60, batch_size=3)
+
+        async def chat():
+            for number, sender in enumerate([patient, doctor, patient]):
+                buffer.add(ChatMessage(room_name=room_name, sender=sender, message=f'Message {number}'))
+            # The third message starts a flush without waiting for the timer.
+            await asyncio.sleep(0)
+            buffer.add(ChatMessage(room_name=room_name, sender=doctor, message='Private note', is_note=True))
+            await buffer.flush()
+            get_consumer_db_executor().close_connections()
+
+        asyncio.run(chat())
+
+        conversation = Conversation.objects.get(room_name=room_name)
+        stats = buffer.snapshot()
+        self.assertEqual(ChatMessage.objects.filter(room_name=room_name).count(), 4)
+        self.assertEqual(conversation.unread_count_doctor, 2)
+        self.assertEqual(conversation.unread_count_patient, 1)
+        self.assertEqual(conversation.last_message, 'Message 2')
+        self.assertEqual(stats['flushes'], 2)
+        self.assertEqual(stats['messages'], 4)
+        self.assertEqual(stats['max_batch_size'], 3)
+        self.assertEqual(stats['pending'], 0)
+
+
+class ConsumerDBExecutorTests(TestCase):
+    def test_records_queue_depth_and_wait_time(self):
+        executor = ConsumerDBExecutor(max_workers=1)
+        release = threading.Event()
+        blocked = executor.submit(release.wait)
+        queued = [executor.submit(lambda number=number: number) for number in range(2)]
+        self.assertGreaterEqual(executor.snapshot()['queue_depth'], 2)
+
+        time_module.sleep(0.05)
+        release.set()
+        self.assertEqual([future.result() for future in queued], [0, 1])
+        blocked.result()
+        executor.shutdown()
+
+        stats = executor.snapshot()
+        self.assertEqual(stats['tasks'], 3)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertGreaterEqual(stats['max_queue_depth'], 2)
+        self.assertGreaterEqual(stats['max_wait_ms'], 50)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'concurrent writers need PostgreSQL')
+class ChatConsumerLoadTests(TransactionTestCase):
+    def test_two_hundred_rooms_chat_concurrently(self):
+        out = io.StringIO()
+        call_command('load_test_chat_consumers', rooms=200, messages=2, pool_size=[4], stdout=out)
+
+        self.assertIn('pool of 4, 200 rooms', out.getvalue())
+        self.assertIn('queue depth max', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='loadtest-').exists())
+        self.assertFalse(ChatMessage.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'LISTEN/NOTIFY needs PostgreSQL')
+class PostgresChannelLayerTests(TestCase):
+    def test_group_and_direct_messages_cross_layer_instances(self):
+        async def exchange():
+            # Separate instances stand in for two ASGI worker processes.
+            sender, receiver = PostgresChannelLayer(), PostgresChannelLayer()
+            channel = await receiver.new_channel()
+            await receiver.group_add('user_1', channel)
+
+            await sender.group_send('user_1', {'type': 'conversation_update', 'event': 'message'})
+            await sender.group_send('user_1', {'type': 'chat_message', 'message': 'x' * 20000})
+            await sender.send(channel, {'type': 'webrtc_signal'})
+            received = [await asyncio.wait_for(receiver.receive(channel), 5) for _ in range(3)]
+
+            await receiver.group_discard('user_1', channel)
+            await sender.group_send('user_1', {'type': 'chat_message', 'message': 'after discard'})
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(receiver.receive(channel), 0.5)
+
+            # The sender never listens, so it publishes on its shared sync connection
+            self.assertIsNone(sender._publisher)
+            self.assertFalse(sender._sync_publisher.closed)
+            await sender.close()
+            await receiver.close()
+            return received
+
+        received = asyncio.run(exchange())
+
+        self.assertEqual(received[0], {'type': 'conversation_update', 'event': 'message'})
+        self.assertEqual(len(received[1]['message']), 20000)
+        self.assertEqual(received[2], {'type': 'webrtc_signal'})
+
+    def test_queues_of_channels_nobody_receives_on_are_swept_once_expired(self):
+        async def deliver():
+            layer = PostgresChannelLayer(expiry=1)
+            live, gone = await layer.new_channel(), await layer.new_channel()
+            waiting = asyncio.ensure_future(layer.receive(live))
+            await asyncio.sleep(0)
+            # e.g. the consumer on `gone` disconnected before this arrived
+            await layer.send(gone, {'type': 'chat_message', 'message': 'late'})
+            queued = gone in layer.channels
+
+            with patch('tracker.channel_layers.time.time', return_value=time_module.time() + 5):
+                await layer.send(live, {'type': 'chat_message', 'message': 'hello'})
+            swept = gone not in layer.channels
+            message = await asyncio.wait_for(waiting, 5)
+            await layer.close()
+            return queued, swept, message
+
+        queued, swept, message = asyncio.run(deliver())
+
+        self.assertTrue(queued)
+        self.assertTrue(swept)
+        # A channel with a pending receive() keeps its queue
+        self.assertEqual(message, {'type': 'chat_message', 'message': 'hello'})
+
+    def test_sync_callers_reuse_one_publishing_connection(self):
+        layer = PostgresChannelLayer()
+
+        # Each async_to_sync call runs on a new event loop
+        async_to_sync(layer.group_send)('user_1', {'type': 'conversation_update'})
+        publisher = layer._sync_publisher
+        async_to_sync(layer.group_send)('user_1', {'type': 'conversation_update'})
+
+        self.assertIs(layer._sync_publisher, publisher)
+        self.assertFalse(publisher.closed)
+        async_to_sync(layer.close)()
+        self.assertTrue(publisher.closed)
@@ -0,0 +1,153 @@
+"""
+Per-user unread counters behind ``/api/unread-summary/`` and the navbar badges.
+
+Counts live in the cache and are adjusted, once the surrounding transaction
+commits, wherever notifications are created or read and chat messages are
+recorded. A counter that is missing (cold cache, eviction, or dropped after a
+change that is easier to recount than to track) is rebuilt from the database
+on the next read. Counters expire after ``UNREAD_COUNTER_CACHE_SECONDS`` so
+any drift from a race with that rebuild is bounded.
+
+Notifications are also created outside the web process (run_emergency_checks,
+send_outbox, run_report_exports, ...), whose adjustments a per-process cache
+would never see. So the counters are only kept with ``SHARED_CACHE``;
+otherwise every read counts from the database.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import Conversation, Notification
+
+
+def _notifications_key(user_id):
+    return f'unread_notifications:{user_id}'
+
+
+def _chats_key(user_id):
+    return f'unread_chats:{user_id}'
+
+
+def _timeout():
+    return getattr(settings, 'UNREAD_COUNTER_CACHE_SECONDS', 3600)
+
+
+def counters_enabled():
+    return getattr(settings, 'SHARED_CACHE', False)
+
+
+def _count_unread_notifications(user_id):
+    return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
+
+def _count_unread_chats(user_id):
+    as_doctor = Conversation.objects.filter(doctor_id=user_id).aggregate(total=Sum('unread_count_doctor'))['total']
+    as_patient = Conversation.objects.filter(patient_id=user_id).aggregate(total=Sum('unread_count_patient'))['total']
+    return (as_doctor or 0) + (as_patient or 0)
+
+
+def _adjust(key, delta):
+    if not delta:
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Not cached; the next read counts from the database.
+        pass
+
+
+def _adjust_on_commit(key, delta):
+    if counters_enabled():
+        transaction.on_commit(lambda: _adjust(key, delta))
+
+
+def _delete_on_commit(keys):
+    if counters_enabled():
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def notifications_created(user_id, count=1):
+    _adjust_on_commit(_notifications_key(user_id), count)
+
+
+def notifications_read(user_id, count=1):
+    _adjust_on_commit(_notifications_key(user_id), -count)
+
+
+def all_notifications_read(user_id):
+    if counters_enabled():
+        transaction.on_commit(lambda: cache.set(_notifications_key(user_id), 0, _timeout()))
+
+
+def invalidate_unread_notifications(user_id):
+    _delete_on_commit([_notifications_key(user_id)])
+
+
+def chat_messages_recorded(doctor_id, patient_id, unread_doctor=0, unread_patient=0):
+    _adjust_on_commit(_chats_key(doctor_id), unread_doctor)
+    _adjust_on_commit(_chats_key(patient_id), unread_patient)
+
+
+def invalidate_unread_chats(*user_ids):
+    _delete_on_commit([_chats_key(user_id) for user_id in user_ids])
+
+
+def _read_counter(key, count, user_id):
+    if not counters_enabled():
+        return count(user_id)
+    value = cache.get(key)
+    if value is None:
+        value = count(user_id)
+        cache.add(key, value, _timeout())
+    return max(value, 0)
+
+
+def get_unread_notification_count(user_id):
+    return _read_counter(_notifications_key(user_id), _count_unread_notifications, user_id)
+
+
+def get_unread_notification_counts(user_ids):
+    """{user_id: unread notification count}, counting every user not cached in one query."""
+    user_ids = set(user_ids)
+    counts = {}
+    if counters_enabled():
+        cached = cache.get_many([_notifications_key(user_id) for user_id in user_ids])
+        for user_id in user_ids:
+            if _notifications_key(user_id) in cached:
+                counts[user_id] = max(cached[_notifications_key(user_id)], 0)
+
+    missing = user_ids - counts.keys()
+    if missing:
+        counted = dict(
+            Notification.objects.filter(user_id__in=missing, is_read=False)
+            .order_by()
+            .values('user_id')
+            .annotate(total=Count('id'))
+            .values_list('user_id', 'total')
+        )
+        for user_id in missing:
+            counts[user_id] = counted.get(user_id, 0)
+            if counters_enabled():
+                cache.add(_notifications_key(user_id), counts[user_id], _timeout())
+    return counts
+
+
+def get_unread_summary(user_id):
+    """{'notifications': n, 'chats': n} for `user_id`, counting from the database on a cache miss."""
+    counters = {
+        'notifications': (_notifications_key(user_id), _count_unread_notifications),
+        'chats': (_chats_key(user_id), _count_unread_chats),
+    }
+    if not counters_enabled():
+        return {name: count(user_id) for name, (_, count) in counters.items()}
+    cached = cache.get_many([key for key, _ in counters.values()])
+
+    summary = {}
+    for name, (key, count) in counters.items():
+        if key in cached:
+            summary[name] = max(cached[key], 0)
+        else:
+            summary[name] = count(user_id)
+            cache.add(key, summary[name], _timeout())
+    return summary
@@ -47,12 +47,14 @@ urlpatterns = [
     path('dashboard/end-period/', views.end_period_view, name='end_period'),
     path('dashboard/reports/', views.dashboard_reports, name='dashboard_reports'),
     path('dashboard/reports/export-pdf/', views.export_reports_pdf, name='export_reports_pdf'),
+    path('dashboard/reports/exports/<int:job_id>/download/', views.download_report_export, name='download_report_export'),
     path('dashboard/period-checkin/', views.submit_period_checkin, name='submit_period_checkin'),
     path('dashboard/save-symptoms/', views.save_symptoms, name='save_symptoms'),
     path('dashboard/emergency/request/', views.submit_emergency_request, name='submit_emergency_request'),
     path('notifications/', views.get_notifications, name='get_notifications'),
     path('notifications/mark-read/<int:notification_id>/', views.mark_as_read, name='mark_as_read'),
     path('notifications/mark-all-read/', views.mark_all_as_read, name='mark_all_as_read'),
+    path('api/unread-summary/', views.unread_summary, name='unread_summary'),
 
     # Public doctor profile (USER)
     path('doctors/<int:pk>/', views.public_doctor_profile, name='public_doctor_profile'),
@@ -108,6 +110,8 @@ urlpatterns = [
     path('api/message/send/', views.send_message, name='send_message'),
     path('api/message/upload/', views.upload_message_file, name='upload_message_file'),
     path('api/conversation/<int:appointment_id>/mark-read/', views.mark_conversation_as_read, name='mark_conversation_as_read'),
+    path('api/chat/write-behind-stats/', views.chat_write_behind_stats, name='chat_write_behind_stats'),
+    path('api/chat/db-pool-stats/', views.chat_db_pool_stats, name='chat_db_pool_stats'),
 
     
      path(
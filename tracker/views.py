@@ -1,7 +1,9 @@
-from collections import Counter
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
 from decimal import Decimal, InvalidOperation
-from io import BytesIO
+from functools import lru_cache
 from pathlib import Path
+from tempfile import SpooledTemporaryFile
 from xml.sax.saxutils import escape
 
 from django.shortcuts import render, redirect, get_object_or_404
@@ -9,9 +11,12 @@ from django.contrib.auth import authenticate, login as auth_login, logout as aut
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.views import PasswordResetConfirmView
 from django.contrib import messages
+import hashlib
 import random
 import time
-from django.http import JsonResponse, HttpResponse, FileResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, FileResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from .models import User
 from django.contrib.auth.decorators import login_required
 from .models import (
@@ -33,6 +38,8 @@ from .models import (
     PeriodCheckIn,
     TwoFactorCode,
     EmergencyRequest,
+    DashboardSnapshot,
+    ReportExportJob,
 )
 from .forms import (
     CycleLogForm,
@@ -57,14 +64,22 @@ from .forms import (
     SignupEmailVerificationForm,
 )
 from .models import CycleLog
-from tracker.ml.predict import predict_cycle
-from datetime import timedelta, datetime
+from tracker.ml.predict import cycle_features, predicted_cycle_days
+from .realtime import get_conversation_list, notification_group_name, push_conversation_update
+from .chat_buffer import get_message_buffer, write_behind_enabled
+from .db_executor import get_consumer_db_executor
+from . import unread
+from .reports import get_report_dataset, invalidate_report_datasets
+from .report_exports import background_exports_enabled, enqueue_report_export
+from .report_images import ReportImage, avatar_images, static_images
+from datetime import date, timedelta, datetime
 from django.utils import timezone
 from django.core.paginator import Paginator
 from django.conf import settings
-from django.db.models import Avg, Count, Q, Sum
-from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, Max, Q, Sum
+from django.db import IntegrityError, connection, transaction
 from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
 from django.urls import reverse
 import logging
 from reportlab.lib import colors
@@ -72,8 +87,7 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
-from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 from tracker.emails.utils import (
     send_appointment_email as send_appointment_template_email,
     send_emergency_email as send_emergency_template_email,
@@ -785,6 +799,7 @@ class StrongPasswordResetConfirmView(PasswordResetConfirmView):
                 title='Security Update Required',
                 is_read=False,
             ).update(is_read=True)
+            unread.invalidate_unread_notifications(reset_user.id)
 
             _create_notification(
                 reset_user,
@@ -1692,22 +1707,171 @@ def _create_notification(
     notification_type='system',
     target_url='',
     target_section_id='',
+    dedup_key=None,
 ):
+    """
+    Create and push a notification. With a dedup_key the row is only written
+    if the user has none with that key yet; returns the notification, or None
+    when it was a duplicate.
+    """
     if not user:
-        return
+        return None
+
+    if not (target_url or target_section_id):
+        # Resolve the keyword-based default once here so reads are a plain column read
+        target_url, target_section_id = _default_navigation_target(user.role, notification_type, title, message)
 
-    Notification.objects.create(
+    notification = Notification(
         user=user,
         title=title,
         message=message,
         type=notification_type,
         target_url=(target_url or ''),
         target_section_id=(target_section_id or ''),
+        dedup_key=dedup_key,
+    )
+    if dedup_key:
+        created = _bulk_create_notifications([notification])
+        return created[0] if created else None
+
+    notification.save()
+    unread.notifications_created(user.id)
+    transaction.on_commit(lambda: _push_notifications([notification]))
+    return notification
+
+
+def _bulk_create_notifications(notifications, batch_size=500):
+    """
+    Insert prepared Notification instances in batches; the bulk counterpart of _create_notification.
+    Rows whose (user, dedup_key) already exists are skipped by the unique
+    constraint, and only the rows actually inserted are returned.
+    """
+    if not notifications:
+        return []
+    _fill_default_targets(notifications)
+    created = Notification.objects.bulk_create(
+        [item for item in notifications if not item.dedup_key],
+        batch_size=batch_size,
+    )
+    keyed = [item for item in notifications if item.dedup_key]
+    if keyed:
+        created += _insert_deduplicated(keyed, batch_size)
+    for user_id, count in Counter(item.user_id for item in created if not item.is_read).items():
+        unread.notifications_created(user_id, count)
+    transaction.on_commit(lambda: _push_notifications(created))
+    return created
+
+
+def _insert_deduplicated(notifications, batch_size):
+    """
+    Insert skipping conflicts on the (user, dedup_key) constraint, so concurrent
+    senders need no pre-check. PostgreSQL reports the inserted ids through
+    RETURNING. Other backends have no way to say which rows a bulk
+    ignore_conflicts insert wrote, so each row is inserted in its own savepoint
+    and a constraint violation means another sender already has that key.
+    """
+    if connection.vendor == 'postgresql':
+        return _insert_deduplicated_returning(notifications, batch_size)
+
+    created = []
+    for item in notifications:
+        try:
+            with transaction.atomic():
+                item.save(force_insert=True)
+        except IntegrityError:
+            item.pk = None
+            continue
+        created.append(item)
+    return created
+
+
+def _insert_deduplicated_returning(notifications, batch_size):
+    """One INSERT ... ON CONFLICT (user_id, dedup_key) DO NOTHING RETURNING per batch."""
+    meta = Notification._meta
+    fields = [field for field in meta.concrete_fields if not field.primary_key]
+    quote = connection.ops.quote_name
+    row_sql = '({})'.format(', '.join(['%s'] * len(fields)))
+    insert_sql = 'INSERT INTO {} ({}) VALUES {{}} ON CONFLICT ({}, {}) DO NOTHING RETURNING {}, {}, {}'.format(
+        quote(meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        quote('user_id'), quote('dedup_key'),
+        quote(meta.pk.column), quote('user_id'), quote('dedup_key'),
     )
 
+    # A repeated key within one statement would be a conflict ON CONFLICT cannot skip
+    by_key = {}
+    for item in notifications:
+        by_key.setdefault((item.user_id, item.dedup_key), item)
+    pending = list(by_key.values())
+
+    created = []
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        params = [
+            field.get_db_prep_save(field.pre_save(item, True), connection)
+            for item in batch
+            for field in fields
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(insert_sql.format(', '.join([row_sql] * len(batch))), params)
+            rows = cursor.fetchall()
+        for pk, user_id, dedup_key in rows:
+            item = by_key[(user_id, dedup_key)]
+            item.pk = pk
+            item._state.adding = False
+            item._state.db = connection.alias
+            created.append(item)
+    return created
+
+
+def _push_notifications(notifications):
+    """
+    Send committed notifications, fully resolved, to their owners' notification
+    sockets: one event per user, all sent through a single async_to_sync call.
+    """
+    from asgiref.sync import async_to_sync
+    from channels.layers import InMemoryChannelLayer, get_channel_layer
+
+    channel_layer = get_channel_layer()
+    by_user = defaultdict(list)
+    for item in notifications:
+        if item.pk:
+            by_user[item.user_id].append(item)
+    if isinstance(channel_layer, InMemoryChannelLayer):
+        # Only this process's sockets can hear an in-memory layer, and management
+        # commands and workers have none, so skip users without a local socket.
+        by_user = {
+            user_id: items
+            for user_id, items in by_user.items()
+            if channel_layer.groups.get(notification_group_name(user_id))
+        }
+    if not by_user:
+        return
+
+    async def send_all(events):
+        for group_name, event in events:
+            await channel_layer.group_send(group_name, event)
 
-def _default_navigation_target(user, notification_type, title, message):
-    role = getattr(user, 'role', 'user')
+    try:
+        unread_counts = unread.get_unread_notification_counts(by_user)
+        events = [
+            (
+                notification_group_name(user_id),
+                {
+                    'type': 'notifications_created',
+                    'notifications': [_serialize_notification(item) for item in items],
+                    'unread_count': unread_counts[user_id],
+                },
+            )
+            for user_id, items in by_user.items()
+        ]
+        async_to_sync(send_all)(events)
+    except Exception:
+        # The rows are committed; clients still see them on their next list load
+        logger.exception('Could not push %s notifications', sum(len(items) for items in by_user.values()))
+
+
+def _default_navigation_target(role, notification_type, title, message):
     haystack = f"{notification_type} {title} {message}".lower()
 
     if role == 'doctor':
@@ -1742,6 +1906,26 @@ def _default_navigation_target(user, notification_type, title, message):
     return reverse('dashboard_home'), ''
 
 
+def _fill_default_targets(notifications):
+    """
+    Set the keyword-based default target on notifications that have none,
+    looking up their owners' roles in one query. Returns the ones changed.
+    """
+    pending = [item for item in notifications if not (item.target_url or item.target_section_id)]
+    if not pending:
+        return []
+
+    roles = dict(User.objects.filter(id__in={item.user_id for item in pending}).values_list('id', 'role'))
+    for item in pending:
+        item.target_url, item.target_section_id = _default_navigation_target(
+            roles.get(item.user_id),
+            item.type,
+            item.title,
+            item.message,
+        )
+    return pending
+
+
 def _resolve_notification_target(notification):
     target_url = (notification.target_url or '').strip()
     target_section_id = (notification.target_section_id or '').strip()
@@ -1749,14 +1933,30 @@ def _resolve_notification_target(notification):
     if target_url or target_section_id:
         return target_url, target_section_id
 
+    # Only rows written before targets were stored at creation (see backfill_notification_targets)
     return _default_navigation_target(
-        notification.user,
+        getattr(notification.user, 'role', 'user'),
         notification.type,
         notification.title,
         notification.message,
     )
 
 
+def _serialize_notification(item):
+    resolved_url, resolved_section = _resolve_notification_target(item)
+    return {
+        'id': item.id,
+        'title': item.title,
+        'message': item.message,
+        'type': item.type,
+        'is_read': item.is_read,
+        'target_url': resolved_url,
+        'target_section_id': resolved_section,
+        'created_at': item.created_at.isoformat(),
+        'relative_time': _relative_time(item.created_at),
+    }
+
+
 def _has_recent_notification(user, title, hours=24, notification_type=None):
     if not user:
         return False
@@ -1881,19 +2081,10 @@ def trigger_health_alert(user, symptom):
     if symptom not in RISK_SYMPTOMS:
         return False
 
-    already_notified_today = Notification.objects.filter(
-        user=user,
-        title='Health Attention Needed',
-        message__icontains=symptom,
-        created_at__date=timezone.localdate(),
-    ).exists()
-    if already_notified_today:
-        return False
-
     resources_path = reverse('resources')
     doctor_path = reverse('explore_doctors')
 
-    _create_notification(
+    notification = _create_notification(
         user,
         'Health Attention Needed',
         (
@@ -1902,7 +2093,12 @@ def trigger_health_alert(user, symptom):
             f'Do not panic. Resources: {resources_path} | Doctor consultation: {doctor_path}'
         ),
         'cycle',
+        dedup_key=f'health_attention:{symptom}:{timezone.localdate()}',
     )
+    if not notification:
+        return False
+    # The report lists recent health alerts
+    invalidate_report_datasets(user.id)
 
     send_email_alert(user, symptom)
     return True
@@ -1924,9 +2120,17 @@ def calculate_risk_score(user, target_date=None):
         .values_list('symptom', flat=True)
     )
     unique_symptoms = sorted(set(symptoms_today))
+    repeated_symptoms = {
+        symptom
+        for symptom in unique_symptoms
+        if symptom in RISK_SYMPTOMS and check_consecutive_symptoms(user, symptom)
+    }
+    return _score_symptoms(unique_symptoms, repeated_symptoms)
 
+
+def _score_symptoms(unique_symptoms, repeated_symptoms):
     score = 0
-    repeated_symptoms = []
+    repeated = []
 
     for symptom in unique_symptoms:
         if symptom in HIGH_RISK_SYMPTOMS:
@@ -1934,9 +2138,9 @@ def calculate_risk_score(user, target_date=None):
         elif symptom in MEDIUM_RISK_SYMPTOMS:
             score += 2
 
-        if symptom in RISK_SYMPTOMS and check_consecutive_symptoms(user, symptom):
+        if symptom in repeated_symptoms:
             score += 5
-            repeated_symptoms.append(symptom)
+            repeated.append(symptom)
 
     multiple_symptoms = len(unique_symptoms) >= 2
     if multiple_symptoms:
@@ -1955,11 +2159,119 @@ def calculate_risk_score(user, target_date=None):
         'score': score,
         'level': level,
         'symptoms': unique_symptoms,
-        'repeated_symptoms': repeated_symptoms,
+        'repeated_symptoms': repeated,
         'multiple_symptoms': multiple_symptoms,
     }
 
 
+def calculate_risk_scores_bulk(users=None, target_date=None):
+    """
+    Set-based calculate_risk_score for many users at once.
+    Returns {user_id: assessment} for every user with symptoms on target_date,
+    using one query for the day's symptom sets and one for the 3-day streaks.
+    """
+    target_date = target_date or timezone.localdate()
+    streak_dates = [target_date - timedelta(days=offset) for offset in range(3)]
+
+    symptom_logs = SymptomLog.objects.all()
+    if users is not None:
+        symptom_logs = symptom_logs.filter(user__in=users)
+
+    symptoms_by_user = defaultdict(set)
+    for user_id, symptom in (
+        symptom_logs.filter(date=target_date)
+        .values_list('user_id', 'symptom')
+        .distinct()
+    ):
+        symptoms_by_user[user_id].add(symptom)
+
+    repeated_by_user = defaultdict(set)
+    streak_rows = (
+        symptom_logs.filter(date__in=streak_dates, symptom__in=RISK_SYMPTOMS)
+        .values('user_id', 'symptom')
+        .annotate(logged_days=Count('date', distinct=True))
+        .filter(logged_days=len(streak_dates))
+    )
+    for row in streak_rows:
+        repeated_by_user[row['user_id']].add(row['symptom'])
+
+    return {
+        user_id: _score_symptoms(sorted(symptoms), repeated_by_user[user_id])
+        for user_id, symptoms in symptoms_by_user.items()
+    }
+
+
+def run_bulk_emergency_alerts(users=None, target_date=None):
+    """
+    Bulk trigger_emergency_alert: scores every user in one pass, writes the
+    new alert notifications with a single bulk_create and then sends the
+    per-user emails. Returns {'high': n, 'medium': n} for triggered alerts.
+    """
+    assessments = calculate_risk_scores_bulk(users=users, target_date=target_date)
+    alert_titles = {'medium': 'Health Warning', 'high': EMERGENCY_ALERT_TITLE}
+    alert_messages = {
+        'medium': (
+            'Your recent symptom pattern suggests moderate risk. '
+            'Please continue monitoring and consult a doctor if symptoms persist.'
+        ),
+        'high': EMERGENCY_ALERT_MESSAGE,
+    }
+
+    at_risk = {
+        user_id: assessment
+        for user_id, assessment in assessments.items()
+        if assessment['level'] in alert_titles
+    }
+    counts = {'high': 0, 'medium': 0}
+    if not at_risk:
+        return counts
+
+    alert_cooldown_hours = max(int(getattr(settings, 'ALERT_NOTIFICATION_COOLDOWN_HOURS', 24) or 1), 1)
+    cutoff = timezone.now() - timedelta(hours=alert_cooldown_hours)
+    recently_notified = set(
+        Notification.objects.filter(
+            user_id__in=at_risk.keys(),
+            title__in=alert_titles.values(),
+            type='cycle',
+            created_at__gte=cutoff,
+        ).values_list('user_id', 'title')
+    )
+
+    triggered = {
+        user_id: assessment
+        for user_id, assessment in at_risk.items()
+        if (user_id, alert_titles[assessment['level']]) not in recently_notified
+    }
+    _bulk_create_notifications([
+        Notification(
+            user_id=user_id,
+            title=alert_titles[assessment['level']],
+            message=alert_messages[assessment['level']],
+            type='cycle',
+        )
+        for user_id, assessment in triggered.items()
+    ])
+
+    recipients = User.objects.in_bulk(triggered.keys())
+    for user_id, assessment in triggered.items():
+        user = recipients.get(user_id)
+        level = assessment['level']
+        counts[level] += 1
+        if level == 'medium':
+            if assessment['repeated_symptoms']:
+                send_email_alert(user, assessment['repeated_symptoms'][0])
+        else:
+            send_emergency_email(
+                user,
+                score=assessment['score'],
+                symptoms=assessment['symptoms'],
+                subject='Emergency Health Alert from FemiCare',
+                body_message=EMERGENCY_ALERT_MESSAGE,
+            )
+
+    return counts
+
+
 def send_emergency_email(user, score=None, symptoms=None, subject='Health Alert from FemiCare', body_message=None):
     if not user or not user.email:
         return False
@@ -2056,21 +2368,15 @@ def check_period_delay(user):
     if not delayed_cycle:
         return False
 
-    today = timezone.localdate()
-    already_notified = Notification.objects.filter(
-        user=user,
-        title='Delayed Period Reminder',
-        created_at__date=today,
-    ).exists()
-    if already_notified:
-        return False
-
-    _create_notification(
+    notification = _create_notification(
         user,
         'Delayed Period Reminder',
         DELAYED_PERIOD_MESSAGE,
         'cycle',
+        dedup_key=f'period_delay:{timezone.localdate()}',
     )
+    if not notification:
+        return False
     send_emergency_email(
         user,
         subject='Delayed Period Alert from FemiCare',
@@ -2079,6 +2385,50 @@ def check_period_delay(user):
     return True
 
 
+def run_bulk_period_delay_checks(users=None):
+    """Bulk check_period_delay: returns the number of delayed-period reminders sent."""
+    delay_threshold_days = max(int(getattr(settings, 'PERIOD_DELAY_ALERT_DAYS', 6)), 5)
+    today = timezone.localdate()
+    threshold_date = today - timedelta(days=delay_threshold_days)
+
+    cycle_logs = CycleLog.objects.all()
+    if users is not None:
+        cycle_logs = cycle_logs.filter(user__in=users)
+
+    delayed_user_ids = set(
+        cycle_logs.filter(actual_start_date__isnull=True, start_date__isnull=True)
+        .filter(
+            Q(predicted_start_date__lte=threshold_date)
+            | Q(predicted_start_date__isnull=True, predicted_next_period__lte=threshold_date)
+        )
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+    if not delayed_user_ids:
+        return 0
+
+    # Users already reminded today hit the dedup constraint and are left out of `created`
+    created = _bulk_create_notifications([
+        Notification(
+            user_id=user_id,
+            title='Delayed Period Reminder',
+            message=DELAYED_PERIOD_MESSAGE,
+            type='cycle',
+            dedup_key=f'period_delay:{today}',
+        )
+        for user_id in delayed_user_ids
+    ])
+    reminded_user_ids = {item.user_id for item in created}
+
+    for user in User.objects.filter(id__in=reminded_user_ids):
+        send_emergency_email(
+            user,
+            subject='Delayed Period Alert from FemiCare',
+            body_message=DELAYED_PERIOD_MESSAGE,
+        )
+    return len(reminded_user_ids)
+
+
 def _get_available_doctors_for_emergency():
     now = timezone.localtime(timezone.now())
     today = now.date()
@@ -2132,23 +2482,17 @@ def notify_available_doctors(request_obj):
     notified = 0
 
     for doctor in doctors:
-        already_sent = Notification.objects.filter(
-            user=doctor,
-            title='Emergency consultation request',
-            message__icontains=f'#{request_obj.id}',
-            created_at__date=timezone.localdate(),
-        ).exists()
-        if already_sent:
-            continue
-
-        _create_notification(
+        notification = _create_notification(
             doctor,
             'Emergency consultation request',
             f'A patient requires urgent consultation. Request #{request_obj.id}.',
             'emergency_alert',
             target_url=reverse('doctor_appointment'),
             target_section_id='emergency-section',
+            dedup_key=f'emergency:{request_obj.id}:{timezone.localdate()}',
         )
+        if not notification:
+            continue
 
         if doctor.email:
             send_notification_template_email(
@@ -2265,21 +2609,14 @@ def trigger_period_day_reminder(user, predicted_next_period):
     if predicted_next_period != today:
         return False
 
-    exists_today = Notification.objects.filter(
-        user=user,
-        title='Period Day Reminder',
-        created_at__date=today,
-    ).exists()
-    if exists_today:
-        return False
-
-    _create_notification(
+    notification = _create_notification(
         user,
         'Period Day Reminder',
         'Today is your predicted period day. Make sure to log your symptoms so we can support your health better.',
         'cycle',
+        dedup_key=f'period_day:{today}',
     )
-    return True
+    return notification is not None
 
 
 def _get_latest_confirmed_cycle(user):
@@ -2291,12 +2628,26 @@ def _get_latest_confirmed_cycle(user):
     )
 
 
+# Newest open period first. Nulls sort last explicitly so every backend picks
+# the same row, and _active_period_key mirrors this for logs already in memory.
+ACTIVE_PERIOD_ORDERING = (
+    F('start_date').desc(),
+    F('actual_start_date').desc(nulls_last=True),
+    F('last_period_start').desc(nulls_last=True),
+    F('created_at').desc(),
+)
+
+
+def _active_period_key(log):
+    return (log.start_date, log.actual_start_date or date.min, log.last_period_start or date.min, log.created_at)
+
+
 def _get_active_period(user):
     return (
         CycleLog.objects.filter(user=user)
         .filter(start_date__isnull=False)
         .filter(end_date__isnull=True)
-        .order_by('-start_date', '-actual_start_date', '-last_period_start', '-created_at')
+        .order_by(*ACTIVE_PERIOD_ORDERING)
         .first()
     )
 
@@ -2427,6 +2778,7 @@ def create_period(user, start_date, end_date=None):
         )
         SymptomLog.objects.filter(user=user, date=start_date, cycle_log__isnull=True).update(cycle_log=existing_cycle)
         update_cycle_prediction(user)
+        _refresh_dashboard_snapshot(user, 'cycles')
         return existing_cycle
 
     latest_log = CycleLog.objects.filter(user=user).order_by('-created_at').first()
@@ -2477,6 +2829,7 @@ def create_period(user, start_date, end_date=None):
 
     SymptomLog.objects.filter(user=user, date=start_date, cycle_log__isnull=True).update(cycle_log=cycle)
     update_cycle_prediction(user)
+    _refresh_dashboard_snapshot(user, 'cycles')
     return cycle
 
 
@@ -2504,6 +2857,7 @@ def end_period(user, end_date):
     active_period.save(update_fields=['end_date', 'length_of_menses', 'mean_menses_length'])
 
     update_cycle_prediction(user)
+    _refresh_dashboard_snapshot(user, 'cycles')
     return active_period
 
 
@@ -2535,14 +2889,11 @@ def _relative_time(value):
     return f'{days} day ago' if days == 1 else f'{days} days ago'
 
 
-def generate_report(user):
+def generate_report(user, dataset=None):
+    dataset = dataset or get_report_dataset(user.id)
     today = timezone.localdate()
 
-    cycle_logs = list(
-        CycleLog.objects.filter(user=user)
-        .exclude(last_period_start__isnull=True)
-        .order_by('-last_period_start')
-    )
+    cycle_logs = dataset.cycle_logs
     cycle_lengths = [item.length_of_cycle for item in cycle_logs if item.length_of_cycle]
     average_cycle_length = round(sum(cycle_lengths) / len(cycle_lengths), 1) if cycle_lengths else None
 
@@ -2551,33 +2902,25 @@ def generate_report(user):
     if cycle_logs:
         predicted_next_period = cycle_logs[0].predicted_start_date or cycle_logs[0].predicted_next_period
 
-    symptom_frequency = list(
-        SymptomLog.objects.filter(user=user)
-        .values('symptom')
-        .annotate(count=Count('id'))
-        .order_by('-count', 'symptom')[:10]
-    )
+    symptom_counts = Counter(symptom for symptom, _ in dataset.symptom_entries)
+    symptom_frequency = [
+        {'symptom': symptom, 'count': count}
+        for symptom, count in sorted(symptom_counts.items(), key=lambda item: (-item[1], item[0]))[:10]
+    ]
 
     last_30_days = today - timedelta(days=29)
-    mood_entries = MoodEntry.objects.filter(user=user, date__gte=last_30_days)
-    mood_trends = list(
-        mood_entries.values('mood')
-        .annotate(count=Count('id'))
-        .order_by('-count', 'mood')
-    )
+    mood_counts = Counter(mood for mood, day in dataset.mood_entries if day >= last_30_days)
+    mood_trends = [
+        {'mood': mood, 'count': count}
+        for mood, count in sorted(mood_counts.items(), key=lambda item: (-item[1], item[0]))
+    ]
 
-    repeated_alert_notifications = list(
-        Notification.objects.filter(
-            user=user,
-            title='Health Attention Needed',
-        )
-        .order_by('-created_at')[:15]
-    )
+    repeated_alert_notifications = dataset.health_alerts
 
     repeated_symptom_alerts = []
     symptom_dates = {}
-    for row in SymptomLog.objects.filter(user=user).values('symptom', 'date').order_by('symptom', 'date'):
-        symptom_dates.setdefault(row['symptom'], []).append(row['date'])
+    for symptom, day in dataset.symptom_entries:
+        symptom_dates.setdefault(symptom, []).append(day)
 
     for symptom_name, dates in symptom_dates.items():
         unique_dates = sorted(set(dates))
@@ -2603,19 +2946,10 @@ def generate_report(user):
 
     repeated_symptom_alerts.sort(key=lambda item: item['detected_on'], reverse=True)
 
-    documents = list(
-        UserDocument.objects.filter(user=user)
-        .order_by('-uploaded_at')
-    )
-
-    appointments = list(
-        Appointment.objects.filter(user=user)
-        .select_related('doctor', 'doctor__doctor_profile', 'availability')
-        .order_by('-created_at')
-    )
+    documents = dataset.documents
 
     consultation_history = []
-    for appt in appointments:
+    for appt in dataset.appointments:
         doctor_name = appt.doctor.get_full_name().strip() or appt.doctor.username
         consultation_history.append(
             {
@@ -2669,65 +3003,56 @@ def _safe_pdf_text(value, default='N/A'):
     return escape(str(value))
 
 
-def _build_image_flowable(path, max_width, max_height):
+def _build_image_flowable(path, max_width, max_height, images=avatar_images):
     if not path:
         return Spacer(max_width, max_height)
 
-    image_path = Path(path)
-    if not image_path.exists():
-        return Spacer(max_width, max_height)
-
     try:
-        image = Image(str(image_path))
-        width, height = ImageReader(str(image_path)).getSize()
-        scale = min(max_width / width, max_height / height)
-        image.drawWidth = width * scale
-        image.drawHeight = height * scale
-        return image
+        reader, width, height = images.get(str(path), max_width, max_height)
+        return ReportImage(reader, width, height)
     except Exception:
         return Spacer(max_width, max_height)
 
 
-def _build_pdf_report_data(user):
-    report_data = generate_report(user)
-    profile = getattr(user, 'user_profile', None)
-    today = timezone.localdate()
+class _DateWindow:
+    """
+    Counts names over date ranges of date-ordered (name, date) entries. Each
+    range is located by bisecting the dates, so a report with many cycles
+    only walks the entries inside each cycle's window.
+    """
 
-    cycle_logs = list(
-        CycleLog.objects.filter(user=user)
-        .exclude(last_period_start__isnull=True)
-        .order_by('-last_period_start', '-created_at')
-    )
-    cycle_log_ids = [item.id for item in cycle_logs]
+    def __init__(self, entries):
+        self.entries = entries
+        self.dates = [day for _, day in entries]
+
+    def count(self, start, end):
+        """Counter of names dated start..end inclusive; end=None runs to the last entry."""
+        low = bisect_left(self.dates, start)
+        high = len(self.dates) if end is None else bisect_right(self.dates, end)
+        return Counter(name for name, _ in self.entries[low:high])
 
-    checkins = {
-        item.cycle_log_id: item
-        for item in PeriodCheckIn.objects.filter(user=user, cycle_log_id__in=cycle_log_ids)
-    }
 
-    mood_entries = list(MoodEntry.objects.filter(user=user).values('mood', 'date'))
-    symptom_entries = list(SymptomLog.objects.filter(user=user).values('symptom', 'date'))
-    feedback_entries = list(PredictionFeedback.objects.filter(user=user).values('is_correct'))
+def _build_pdf_report_data(user, dataset=None):
+    dataset = dataset or get_report_dataset(user.id)
+    report_data = generate_report(user, dataset)
+    profile = getattr(user, 'user_profile', None)
+    today = timezone.localdate()
+
+    cycle_logs = dataset.cycle_logs
+    checkins = dataset.checkins
+    feedback_entries = dataset.feedback
+    mood_window = _DateWindow(dataset.mood_entries)
+    symptom_window = _DateWindow(dataset.symptom_entries)
 
     cycle_rows = []
     for log in cycle_logs:
         checkin = checkins.get(log.id)
         reference_date = log.last_period_start or log.predicted_start_date or today
-        window_start = reference_date - timedelta(days=1)
-        window_end = reference_date + timedelta(days=2)
 
-        cycle_moods = Counter(
-            item['mood']
-            for item in mood_entries
-            if window_start <= item['date'] <= window_end
-        )
-
-        cycle_symptoms = Counter(
-            item['symptom']
-            for item in symptom_entries
-            if item['date'] == reference_date or (
-                log.id and item['date'] >= reference_date and item['date'] <= reference_date + timedelta(days=6)
-            )
+        cycle_moods = mood_window.count(reference_date - timedelta(days=1), reference_date + timedelta(days=2))
+        cycle_symptoms = symptom_window.count(
+            reference_date,
+            reference_date + timedelta(days=6) if log.id else reference_date,
         )
 
         cycle_rows.append(
@@ -2768,7 +3093,7 @@ def _build_pdf_report_data(user):
     mood_trends = report_data['symptom_report']['mood_trends']
 
     if feedback_entries:
-        correct_predictions = sum(1 for item in feedback_entries if item['is_correct'])
+        correct_predictions = sum(1 for is_correct in feedback_entries if is_correct)
         prediction_accuracy = f"{correct_predictions} of {len(feedback_entries)} logged predictions matched the tracked date"
     else:
         prediction_accuracy = 'No prediction feedback has been logged yet'
@@ -2786,16 +3111,8 @@ def _build_pdf_report_data(user):
 
     recent_cutoff = today - timedelta(days=14)
     prior_cutoff = today - timedelta(days=28)
-    recent_symptoms = Counter(
-        item['symptom']
-        for item in symptom_entries
-        if item['date'] >= recent_cutoff
-    )
-    prior_symptoms = Counter(
-        item['symptom']
-        for item in symptom_entries
-        if prior_cutoff <= item['date'] < recent_cutoff
-    )
+    recent_symptoms = symptom_window.count(recent_cutoff, None)
+    prior_symptoms = symptom_window.count(prior_cutoff, recent_cutoff - timedelta(days=1))
 
     notable_changes = []
     for symptom, count in recent_symptoms.most_common(5):
@@ -2833,8 +3150,8 @@ def _build_pdf_report_data(user):
     else:
         age_text = 'Not provided'
 
-    if profile and getattr(profile, 'photo', None):
-        avatar_path = profile.photo.path if profile.photo else None
+    if profile and profile.profile_picture:
+        avatar_path = profile.profile_picture.path
     else:
         avatar_path = None
 
@@ -2862,6 +3179,8 @@ def _build_pdf_report_data(user):
     }
 
 
+# Built once per process; callers only read the styles.
+@lru_cache(maxsize=None)
 def _build_report_styles():
     styles = getSampleStyleSheet()
     styles.add(
@@ -2983,7 +3302,7 @@ def build_header_section(user, data=None):
     ]
 
     avatar = _build_image_flowable(report_data['avatar_path'], 0.72 * inch, 0.72 * inch)
-    logo = _build_image_flowable(report_data['logo_path'], 0.78 * inch, 0.78 * inch)
+    logo = _build_image_flowable(report_data['logo_path'], 0.78 * inch, 0.78 * inch, static_images)
 
     header_block = Table(
         [[avatar, [
@@ -3178,17 +3497,47 @@ def dashboard_reports(request):
     return render(request, 'dashboard/reports.html', context)
 
 
-@login_required
-def export_reports_pdf(request):
-    role_redirect = _ensure_user_access(request)
-    if role_redirect:
-        return role_redirect
+def spooled_report_file():
+    """
+    File to render a PDF report into: kept in memory up to
+    REPORT_PDF_SPOOL_MAX_BYTES, then rolled over to a temporary file on disk.
+    """
+    return SpooledTemporaryFile(max_size=getattr(settings, 'REPORT_PDF_SPOOL_MAX_BYTES', 1024 * 1024), mode='w+b')
+
+
+class AsyncFileResponse(FileResponse):
+    """
+    FileResponse for ASGI servers. Django 4.2 serves a plain FileResponse there
+    by reading the whole file into a list first (StreamingHttpResponse.__aiter__);
+    this one reads it a block at a time in a worker thread instead.
+    """
+
+    block_size = 64 * 1024
+
+    def _set_streaming_content(self, value):
+        super()._set_streaming_content(value)
+        if self.file_to_stream is not None:
+            self._iterator = self._read_blocks(self.file_to_stream)
+            self.is_async = True
 
-    report_data = _build_pdf_report_data(request.user)
-    buffer = BytesIO()
+    async def _read_blocks(self, filelike):
+        read = sync_to_async(filelike.read, thread_sensitive=False)
+        while block := await read(self.block_size):
+            yield block
+
+
+def _file_response(request, filelike, **kwargs):
+    """A FileResponse that streams `filelike` in blocks under both WSGI and ASGI."""
+    response_class = AsyncFileResponse if isinstance(request, ASGIRequest) else FileResponse
+    return response_class(filelike, **kwargs)
+
+
+def render_report_pdf(user, output, dataset=None):
+    """Write the user's PDF health report, from `dataset` if given, to the file-like `output`."""
+    report_data = _build_pdf_report_data(user, dataset)
 
     document = SimpleDocTemplate(
-        buffer,
+        output,
         pagesize=letter,
         leftMargin=0.55 * inch,
         rightMargin=0.55 * inch,
@@ -3200,22 +3549,47 @@ def export_reports_pdf(request):
     )
 
     story = []
-    story.extend(build_header_section(request.user, report_data))
+    story.extend(build_header_section(user, report_data))
     story.extend(build_insight_section(report_data))
     story.extend(build_cycle_table(report_data['cycle_rows']))
     story.extend(build_symptom_summary(report_data))
     story.extend(build_recommendations())
 
+    document.build(story, onFirstPage=_draw_report_page, onLaterPages=_draw_report_page)
+
+
+@login_required
+def export_reports_pdf(request):
+    role_redirect = _ensure_user_access(request)
+    if role_redirect:
+        return role_redirect
+
+    if background_exports_enabled():
+        _, created = enqueue_report_export(request.user)
+        if created:
+            messages.info(request, 'Your PDF report is being prepared. We will notify you when it is ready to download.')
+        else:
+            messages.info(request, 'Your PDF report is already being prepared. We will notify you when it is ready.')
+        return redirect('dashboard_reports')
+
+    output = spooled_report_file()
     try:
-        document.build(story, onFirstPage=_draw_report_page, onLaterPages=_draw_report_page)
+        render_report_pdf(request.user, output)
     except Exception:
+        output.close()
         logger.exception('Unable to generate ReportLab PDF report for user %s', request.user.pk)
         messages.error(request, 'Unable to generate PDF report at the moment.')
         return redirect('dashboard_reports')
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="femicare_health_report.pdf"'
-    response.write(buffer.getvalue())
+    # Streamed in blocks from the spooled file and closed once sent
+    output.seek(0)
+    response = _file_response(
+        request,
+        output,
+        as_attachment=True,
+        filename='femicare_health_report.pdf',
+        content_type='application/pdf',
+    )
 
     _create_notification(
         request.user,
@@ -3229,6 +3603,21 @@ def export_reports_pdf(request):
     return response
 
 
+@login_required
+def download_report_export(request, job_id):
+    role_redirect = _ensure_user_access(request)
+    if role_redirect:
+        return role_redirect
+
+    job = get_object_or_404(ReportExportJob, pk=job_id, user=request.user, status='done')
+    try:
+        report_file = job.file.open('rb')
+    except (FileNotFoundError, ValueError):
+        messages.error(request, 'This report export has expired. Please export your report again.')
+        return redirect('dashboard_reports')
+    return _file_response(request, report_file, as_attachment=True, filename='femicare_health_report.pdf')
+
+
 def _clear_email_verification_session(
     request,
     pending_key='pending_email',
@@ -3283,6 +3672,9 @@ def _delete_user_account_data(user):
         if document.file:
             document.file.delete(save=False)
 
+    for job in ReportExportJob.objects.filter(user=user).exclude(file=''):
+        job.file.delete(save=False)
+
     try:
         profile = user.user_profile
         if profile.profile_picture:
@@ -3547,25 +3939,9 @@ def verify_email_code(request):
 @login_required
 def get_notifications(request):
     notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:20]
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
-
-    payload = []
-    for item in notifications:
-        resolved_url, resolved_section = _resolve_notification_target(item)
-        payload.append(
-            {
-                'id': item.id,
-                'title': item.title,
-                'message': item.message,
-                'type': item.type,
-                'is_read': item.is_read,
-                'target_url': resolved_url,
-                'target_section_id': resolved_section,
-                'created_at': item.created_at.isoformat(),
-                'relative_time': _relative_time(item.created_at),
-            }
-        )
+    unread_count = unread.get_unread_notification_count(request.user.id)
 
+    payload = [_serialize_notification(item) for item in notifications]
     return JsonResponse({'notifications': payload, 'unread_count': unread_count})
 
 
@@ -3574,12 +3950,15 @@ def mark_as_read(request, notification_id):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
 
-    notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-    if not notification.is_read:
-        notification.is_read = True
-        notification.save(update_fields=['is_read'])
+    # A conditional update, so two concurrent requests for the same
+    # notification only decrement the counter once.
+    updated = Notification.objects.filter(pk=notification_id, user=request.user, is_read=False).update(is_read=True)
+    if updated:
+        unread.notifications_read(request.user.id, updated)
+    else:
+        get_object_or_404(Notification, id=notification_id, user=request.user)
 
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    unread_count = unread.get_unread_notification_count(request.user.id)
     return JsonResponse({'success': True, 'unread_count': unread_count})
 
 
@@ -3589,9 +3968,16 @@ def mark_all_as_read(request):
         return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
 
     Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    unread.all_notifications_read(request.user.id)
     return JsonResponse({'success': True, 'unread_count': 0})
 
 
+@login_required
+def unread_summary(request):
+    """Unread chat and notification totals for the navbar badges, served from cached counters."""
+    return JsonResponse(unread.get_unread_summary(request.user.id))
+
+
 @login_required
 def delete_account(request):
     role_redirect = _ensure_user_access(request)
@@ -3891,6 +4277,7 @@ def change_password(request):
             title='Security Update Required',
             is_read=False,
         ).update(is_read=True)
+        unread.invalidate_unread_notifications(request.user.id)
 
         update_session_auth_hash(request, user)
         _create_notification(
@@ -3916,6 +4303,87 @@ def change_password(request):
         },
     )
 
+DASHBOARD_SNAPSHOT_SECTIONS = ('moods', 'symptoms', 'feedback', 'cycles')
+
+
+def _refresh_dashboard_snapshot(user, *sections):
+    """Recompute the given DashboardSnapshot sections (all of them when none are named)."""
+    if not user:
+        return None
+
+    sections = set(sections or DASHBOARD_SNAPSHOT_SECTIONS)
+    snapshot, _ = DashboardSnapshot.objects.get_or_create(user=user)
+    update_fields = ['updated_at']
+
+    if 'moods' in sections:
+        snapshot.mood_counts = dict(
+            MoodEntry.objects.filter(user=user)
+            .values('mood')
+            .annotate(total=Count('id'))
+            .values_list('mood', 'total')
+        )
+        update_fields.append('mood_counts')
+
+    if 'symptoms' in sections:
+        tracked_symptoms = SymptomLog.objects.filter(user=user, source__in=['manual', 'first_login'])
+        snapshot.symptom_frequency = list(
+            tracked_symptoms.values('symptom')
+            .annotate(count=Count('id'))
+            .order_by('-count', 'symptom')[:10]
+        )
+        snapshot.recent_symptom_entries = [
+            {'symptom': row['symptom'], 'date': row['date'].isoformat()}
+            for row in tracked_symptoms.values('symptom', 'date').order_by('-date', '-created_at')[:8]
+        ]
+        snapshot.recent_symptoms = list(
+            tracked_symptoms.order_by('-created_at').values_list('symptom', flat=True)[:5]
+        )
+        # New symptoms change today's risk score, so the cached assessment is stale.
+        snapshot.risk_assessment = {}
+        snapshot.risk_assessed_on = None
+        update_fields += [
+            'symptom_frequency',
+            'recent_symptom_entries',
+            'recent_symptoms',
+            'risk_assessment',
+            'risk_assessed_on',
+        ]
+
+    if 'feedback' in sections:
+        feedback_qs = PredictionFeedback.objects.filter(user=user)
+        feedback_totals = feedback_qs.aggregate(
+            total=Count('id'),
+            correct=Count('id', filter=Q(is_correct=True)),
+        )
+        snapshot.total_feedback = feedback_totals['total']
+        snapshot.correct_feedback = feedback_totals['correct']
+        snapshot.answered_feedback_cycle_ids = list(
+            feedback_qs.filter(cycle_log__isnull=False, actual_date__isnull=False)
+            .values_list('cycle_log_id', flat=True)
+        )
+        update_fields += ['total_feedback', 'correct_feedback', 'answered_feedback_cycle_ids']
+
+    if 'cycles' in sections:
+        snapshot.period_delay_checked_on = None
+        update_fields.append('period_delay_checked_on')
+
+    snapshot.save(update_fields=update_fields)
+    return snapshot
+
+
+def _get_dashboard_snapshot(user):
+    snapshot = DashboardSnapshot.objects.filter(user=user).first()
+    if snapshot is None:
+        snapshot = _refresh_dashboard_snapshot(user)
+    return snapshot
+
+
+def _store_dashboard_risk_assessment(snapshot, assessment, assessed_on=None):
+    snapshot.risk_assessment = assessment
+    snapshot.risk_assessed_on = assessed_on or timezone.localdate()
+    snapshot.save(update_fields=['risk_assessment', 'risk_assessed_on', 'updated_at'])
+
+
 @login_required
 def dashboard_home(request):
     role_redirect = _ensure_user_access(request)
@@ -3924,10 +4392,13 @@ def dashboard_home(request):
 
     _ensure_password_security_notice(request.user)
 
-    logs = CycleLog.objects.filter(user=request.user)
-    latest_cycle = logs.first()
+    # Every cycle-derived figure below is computed from this single read.
+    logs = list(CycleLog.objects.filter(user=request.user))
+    latest_cycle = logs[0] if logs else None
+    snapshot = _get_dashboard_snapshot(request.user)
     profile, _ = UserProfile.objects.get_or_create(user=request.user)
     today = timezone.localdate()
+    last_30_start = today - timedelta(days=29)
     current_hour = timezone.localtime().hour
 
     if current_hour < 12:
@@ -3937,9 +4408,15 @@ def dashboard_home(request):
     else:
         greeting_prefix = "Good Evening"
 
-    today_mood_entry = MoodEntry.objects.filter(user=request.user, date=today).first()
-    today_mood_label = today_mood_entry.get_mood_display() if today_mood_entry else None
-    show_mood_prompt = today_mood_entry is None
+    recent_mood_rows = list(
+        MoodEntry.objects.filter(user=request.user, date__gte=last_30_start)
+        .order_by('date')
+        .values_list('date', 'mood')
+    )
+    recent_mood_entries = [mood for _, mood in recent_mood_rows]
+    today_mood_code = next((mood for mood_date, mood in recent_mood_rows if mood_date == today), None)
+    today_mood_label = dict(MoodEntry.MOOD_CHOICES).get(today_mood_code) if today_mood_code else None
+    show_mood_prompt = today_mood_code is None
 
     greeting_text = (
         f"{greeting_prefix}, you are feeling {today_mood_label} today"
@@ -3947,41 +4424,24 @@ def dashboard_home(request):
         f"{greeting_prefix}, tell us how you are feeling today"
     )
 
-    mood_counts = dict(
-        MoodEntry.objects.filter(user=request.user)
-        .values('mood')
-        .annotate(total=Count('id'))
-        .values_list('mood', 'total')
-    )
+    mood_counts = snapshot.mood_counts
     mood_chart_labels = [label for _, label in MoodEntry.MOOD_CHOICES]
     mood_chart_values = [mood_counts.get(code, 0) for code, _ in MoodEntry.MOOD_CHOICES]
 
-    cycle_log_qs = CycleLog.objects.filter(user=request.user)
-
-    symptom_frequency = list(
-        SymptomLog.objects.filter(user=request.user, source__in=['manual', 'first_login'])
-        .values('symptom')
-        .annotate(count=Count('id'))
-        .order_by('-count', 'symptom')[:10]
-    )
+    symptom_frequency = snapshot.symptom_frequency
     max_symptom_frequency = symptom_frequency[0]['count'] if symptom_frequency else 1
 
-    recent_cycle_symptoms = list(
-        SymptomLog.objects.filter(user=request.user, source__in=['manual', 'first_login'])
-        .values('symptom', 'date')
-        .order_by('-date', '-created_at')[:8]
-    )
+    recent_cycle_symptoms = [
+        {'symptom': entry['symptom'], 'date': parse_date(entry['date'])}
+        for entry in snapshot.recent_symptom_entries
+    ]
 
     most_common_symptom = symptom_frequency[0]['symptom'] if symptom_frequency else 'No Data Yet'
 
     today_symptoms_qs = SymptomLog.objects.filter(user=request.user, date=today).order_by('created_at')
     selected_today_symptoms = list(today_symptoms_qs.values_list('symptom', flat=True))
 
-    recent_symptoms = list(
-        SymptomLog.objects.filter(user=request.user, source__in=['manual', 'first_login'])
-        .order_by('-created_at')
-        .values_list('symptom', flat=True)[:5]
-    )
+    recent_symptoms = snapshot.recent_symptoms
 
     appointments_count = Appointment.objects.filter(user=request.user).count()
 
@@ -4002,7 +4462,10 @@ def dashboard_home(request):
         except (TypeError, ValueError, ZeroDivisionError):
             bmi = None
 
-    cycle_logs = list(logs.exclude(last_period_start__isnull=True).order_by('last_period_start'))
+    cycle_logs = sorted(
+        (log for log in logs if log.last_period_start),
+        key=lambda log: log.last_period_start,
+    )
     cycle_lengths = [log.length_of_cycle for log in cycle_logs if log.length_of_cycle]
     menses_lengths = [log.length_of_menses for log in cycle_logs if log.length_of_menses]
 
@@ -4042,13 +4505,6 @@ def dashboard_home(request):
             rounding_diff = 100 - sum(phase_values)
             phase_values[1] += rounding_diff
 
-    last_30_start = today - timedelta(days=29)
-    recent_mood_entries = list(
-        MoodEntry.objects.filter(user=request.user, date__gte=last_30_start)
-        .order_by('date')
-        .values_list('mood', flat=True)
-    )
-
     mood_trend_buckets = {
         'happy': {'label': 'Happy', 'emoji': '😊', 'codes': {'happy', 'calm', 'energetic'}},
         'neutral': {'label': 'Neutral', 'emoji': '😐', 'codes': {'stressed'}},
@@ -4134,8 +4590,16 @@ def dashboard_home(request):
 
     trigger_period_day_reminder(request.user, predicted_next_period)
 
-    active_period = _get_active_period(request.user)
-    active_cycle = cycle_log_qs.exclude(last_period_start__isnull=True).filter(last_period_start__lte=today).order_by('-last_period_start').first()
+    active_period = max(
+        (log for log in logs if log.start_date and not log.end_date),
+        key=_active_period_key,
+        default=None,
+    )
+    active_cycle = max(
+        (log for log in cycle_logs if log.last_period_start <= today),
+        key=lambda log: log.last_period_start,
+        default=None,
+    )
     is_on_period = False
     show_period_checkin_prompt = False
     current_period_range = None
@@ -4314,12 +4778,13 @@ def dashboard_home(request):
     )
 
     feedback_target = None
-    feedback_map = {
-        item['cycle_log_id']: item['actual_date']
-        for item in PredictionFeedback.objects.filter(user=request.user, cycle_log__isnull=False)
-        .values('cycle_log_id', 'actual_date')
-    }
-    for log in logs.exclude(predicted_next_period__isnull=True).order_by('-predicted_next_period'):
+    answered_feedback_cycle_ids = set(snapshot.answered_feedback_cycle_ids)
+    predicted_logs = sorted(
+        (log for log in logs if log.predicted_next_period),
+        key=lambda log: log.predicted_next_period,
+        reverse=True,
+    )
+    for log in predicted_logs:
         predicted_date = _resolve_prediction_date(log)
         if not predicted_date or predicted_date > today:
             continue
@@ -4327,21 +4792,27 @@ def dashboard_home(request):
         if log.start_date or log.actual_start_date:
             continue
 
-        feedback_actual_date = feedback_map.get(log.id)
-        if feedback_actual_date is None:
+        if log.id not in answered_feedback_cycle_ids:
             feedback_target = log
             break
 
-    emergency_assessment = trigger_emergency_alert(request.user)
-    check_period_delay(request.user)
+    if snapshot.risk_assessed_on == today:
+        emergency_assessment = snapshot.risk_assessment
+    else:
+        emergency_assessment = trigger_emergency_alert(request.user)
+        _store_dashboard_risk_assessment(snapshot, emergency_assessment, today)
+
+    if snapshot.period_delay_checked_on != today:
+        check_period_delay(request.user)
+        snapshot.period_delay_checked_on = today
+        snapshot.save(update_fields=['period_delay_checked_on', 'updated_at'])
     active_emergency_request = EmergencyRequest.objects.filter(
         user=request.user,
         status__in=['pending', 'assigned'],
     ).first()
 
-    feedback_stats = PredictionFeedback.objects.filter(user=request.user)
-    total_feedback = feedback_stats.count()
-    correct_feedback = feedback_stats.filter(is_correct=True).count()
+    total_feedback = snapshot.total_feedback
+    correct_feedback = snapshot.correct_feedback
     prediction_accuracy = round((correct_feedback / total_feedback) * 100, 1) if total_feedback else 0
 
     # Consume one-time prediction flags from session.
@@ -4350,10 +4821,7 @@ def dashboard_home(request):
 
     cycle = latest_cycle
     if last_cycle_id:
-        cycle = CycleLog.objects.filter(
-            id=last_cycle_id,
-            user=request.user
-        ).first()
+        cycle = next((log for log in logs if log.id == last_cycle_id), None)
 
     return render(request, "dashboard/first.html", {
         "form": CycleLogForm(user=request.user),
@@ -4398,7 +4866,7 @@ def dashboard_home(request):
         "period_status_variant": period_status_variant,
         "feedback_target": feedback_target,
         "active_period": active_period,
-        "is_active_period": is_period_active(request.user),
+        "is_active_period": active_period is not None,
         "prediction_accuracy": prediction_accuracy,
         "total_feedback": total_feedback,
         "cycle_pattern_short": cycle_pattern_short,
@@ -4443,6 +4911,7 @@ def submit_mood_checkin(request):
         date=timezone.localdate(),
         defaults={'mood': mood_value}
     )
+    _refresh_dashboard_snapshot(request.user, 'moods')
 
     messages.success(request, 'Mood check-in saved for today.')
     return redirect('dashboard_home')
@@ -4509,6 +4978,7 @@ def submit_prediction_feedback(request):
             'is_correct': is_correct,
         }
     )
+    _refresh_dashboard_snapshot(request.user, 'feedback', 'cycles')
 
     if actual_date:
         try:
@@ -4531,6 +5001,7 @@ def submit_prediction_feedback(request):
     cycle_log.end_date = None
     cycle_log.is_confirmed = False
     cycle_log.save(update_fields=['actual_start_date', 'start_date', 'end_date', 'is_confirmed'])
+    _refresh_dashboard_snapshot(request.user, 'cycles')
     handle_delayed_period(request.user)
     messages.info(request, 'We will keep tracking and remind you daily until your period starts.')
     return redirect('dashboard_home')
@@ -4665,9 +5136,12 @@ def submit_period_checkin(request):
             for symptom in selected_symptoms
         ]
     )
+    invalidate_report_datasets(request.user.id)
 
     emergency_assessment = trigger_emergency_alert(request.user)
     check_period_delay(request.user)
+    snapshot = _refresh_dashboard_snapshot(request.user, 'symptoms')
+    _store_dashboard_risk_assessment(snapshot, emergency_assessment)
 
     if emergency_assessment.get('level') == 'high' and emergency_assessment.get('triggered'):
         messages.warning(request, 'Emergency health alert has been triggered. Please review resources and consult a doctor if needed.')
@@ -4712,6 +5186,8 @@ def save_symptoms(request):
 
     emergency_assessment = trigger_emergency_alert(request.user)
     check_period_delay(request.user)
+    snapshot = _refresh_dashboard_snapshot(request.user, 'symptoms')
+    _store_dashboard_risk_assessment(snapshot, emergency_assessment)
 
     if emergency_assessment.get('level') == 'high' and emergency_assessment.get('triggered'):
         messages.warning(request, 'Emergency health alert has been triggered. Please review resources and consult a doctor if needed.')
@@ -4979,15 +5455,7 @@ def add_cycle_log(request):
                 cycle.bmi = 22.0
 
             # Build features for the cycle prediction model.
-            features = [
-                cycle.length_of_cycle,
-                cycle.length_of_menses,
-                cycle.mean_menses_length,
-                cycle.total_menses_score,
-                cycle.mean_bleeding_intensity,
-                int(cycle.unusual_bleeding),
-                cycle.bmi,
-            ]
+            features = cycle_features(cycle)
 
             historical_cycle_lengths = list(
                 previous_logs
@@ -4997,10 +5465,7 @@ def add_cycle_log(request):
             if cycle.length_of_cycle:
                 historical_cycle_lengths.append(cycle.length_of_cycle)
 
-            if historical_cycle_lengths:
-                predicted_days = int(round(sum(historical_cycle_lengths) / len(historical_cycle_lengths)))
-            else:
-                predicted_days = round(predict_cycle(features))
+            predicted_days = predicted_cycle_days(historical_cycle_lengths, features)
 
             # Compute period and ovulation date windows.
             if cycle.last_period_start:
@@ -5080,6 +5545,7 @@ def add_cycle_log(request):
                     )
             cycle.save()
             update_cycle_prediction(request.user)
+            _refresh_dashboard_snapshot(request.user, 'cycles')
 
             _create_notification(
                 request.user,
@@ -5298,44 +5764,10 @@ def upload_chat_file(request):
             is_note=False
         )
         
-        # Update conversation with last message
-        from .models import Conversation
+        # Update conversation with last message and push it to both participants
         try:
-            # Extract doctor and patient IDs from room_name format: chat_patientID_doctorID
-            parts = room_name.split('_')
-            if len(parts) >= 3:
-                patient_id = int(parts[1])
-                doctor_id = int(parts[2])
-                
-                conversation = Conversation.objects.filter(
-                    doctor_id=doctor_id,
-                    patient_id=patient_id
-                ).first()
-                
-                if conversation:
-                    conversation.last_message = f"📎 {file.name}"
-                    conversation.last_message_time = timezone.now()
-                    
-                    # Increment unread count for the receiver
-                    if request.user.role == 'doctor':
-                        conversation.unread_count_patient += 1
-                    else:
-                        conversation.unread_count_doctor += 1
-                    
-                    conversation.save()
-                    
-                    # Broadcast to channel layer for real-time updates
-                    from asgiref.sync import async_to_sync
-                    from channels.layers import get_channel_layer
-                    channel_layer = get_channel_layer()
-                    async_to_sync(channel_layer.group_send)(
-                        'broadcast',
-                        {
-                            'type': 'broadcast_message',
-                            'message_type': 'file_message',
-                            'room_name': room_name
-                        }
-                    )
+            Conversation.record_message(room_name, request.user, f"📎 {file.name}", chat_message.timestamp, participants=(appointment.doctor_id, appointment.user_id))
+            push_conversation_update(room_name, 'file_message')
         except Exception as e:
             print(f"Error updating conversation: {e}")
         
@@ -5362,50 +5794,70 @@ def get_conversations(request):
         return JsonResponse({'error': 'Forbidden'}, status=403)
 
     """API endpoint to fetch all conversations for the logged-in user"""
-    user = request.user
-    
-    if user.role == 'doctor':
-        conversations = Conversation.objects.filter(doctor=user).select_related('patient')
-    else:
-        conversations = Conversation.objects.filter(patient=user).select_related('doctor')
-    
-    conversations_data = []
-    for conv in conversations:
-        other_user = conv.get_other_user(user)
-        
-        # Get the latest consultation between participants.
-        if user.role == 'doctor':
-            appointment = Appointment.objects.filter(
-                doctor=user,
-                user=conv.patient,
-            ).select_related('availability').order_by('-availability__date', '-availability__start_time').first()
-        else:
-            appointment = Appointment.objects.filter(
-                user=user,
-                doctor=conv.doctor,
-            ).select_related('availability').order_by('-availability__date', '-availability__start_time').first()
-        
-        if user.role == 'user':
-            doctor_name = other_user.doctor_profile.full_name or other_user.username
-            display_name = f"Dr. {doctor_name}"
+    # One query (latest consultation via subquery), cached per user until a conversation changes
+    return JsonResponse({'conversations': get_conversation_list(request.user)})
+
+
+@login_required
+def chat_write_behind_stats(request):
+    """Flush latency and batch-size stats of this worker's chat write-behind buffer (staff only)."""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    return JsonResponse({
+        'enabled': write_behind_enabled(),
+        'stats': get_message_buffer().snapshot(),
+    })
+
+
+@login_required
+def chat_db_pool_stats(request):
+    """Queue depth and wait times of this worker's consumer DB thread pool (staff only)."""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    executor = get_consumer_db_executor()
+    return JsonResponse({
+        'enabled': executor is not None,
+        'stats': executor.snapshot() if executor is not None else None,
+    })
+
+
+def _parse_cursor_param(value):
+    if value in (None, ''):
+        return None
+    parsed = int(value)
+    if parsed < 1:
+        raise ValueError('Cursor values must be positive.')
+    return parsed
+
+
+def _serialize_chat_message(msg):
+    message_type = 'text'
+    file_url = None
+    file_name = None
+
+    if msg.file:
+        # Determine if it's an image or document
+        file_ext = msg.file.name.split('.')[-1].lower()
+        if file_ext in ['jpg', 'jpeg', 'png']:
+            message_type = 'image'
         else:
-            display_name = other_user.username
-        
-        conversations_data.append({
-            'id': conv.id,
-            'other_user': {
-                'id': other_user.id,
-                'name': display_name,
-                'role': other_user.role
-            },
-            'last_message': conv.last_message or 'No messages yet',
-            'last_message_time': conv.last_message_time.isoformat(),
-            'unread_count': conv.get_unread_count(user),
-            'appointment_id': appointment.id if appointment else None,
-            'room_name': conv.room_name
-        })
-    
-    return JsonResponse({'conversations': conversations_data})
+            message_type = 'document'
+
+        file_url = msg.file.url
+        file_name = msg.file.name.split('/')[-1]
+
+    return {
+        'id': msg.id,
+        'sender_id': msg.sender_id,
+        'content': msg.message,
+        'message_type': message_type,
+        'file_url': file_url,
+        'file_name': file_name,
+        'timestamp': msg.timestamp.isoformat(),
+        'is_read': msg.is_read
+    }
 
 
 @login_required
@@ -5429,43 +5881,95 @@ def get_message_history(request, appointment_id):
         room_name = f"chat_{appointment.user_id}_{appointment.doctor_id}"
         other_user = appointment.doctor
     
-    chat_state = _get_consultation_chat_state(appointment)
+    try:
+        before_id = _parse_cursor_param(request.GET.get('before_id'))
+        after_id = _parse_cursor_param(request.GET.get('after_id'))
+        since_id = _parse_cursor_param(request.GET.get('since_id'))
+        limit = _parse_cursor_param(request.GET.get('limit'))
+    except ValueError:
+        return JsonResponse({'error': 'before_id, after_id, since_id and limit must be positive integers'}, status=400)
+    if len([cursor for cursor in (before_id, after_id, since_id) if cursor]) > 1:
+        return JsonResponse({'error': 'Use only one of before_id, after_id or since_id'}, status=400)
+
+    max_page_size = max(int(getattr(settings, 'CHAT_HISTORY_MAX_PAGE_SIZE', 200)), 1)
+    if since_id:
+        # Delta sync for the poller: everything newer than since_id, up to the max page size.
+        limit = limit or max_page_size
+    page_size = max(int(getattr(settings, 'CHAT_HISTORY_PAGE_SIZE', 50)), 1)
+    limit = min(limit or page_size, max_page_size)
 
-    # Get all messages for this room
+    chat_state = _get_consultation_chat_state(appointment)
     messages_qs = ChatMessage.objects.filter(room_name=room_name, is_note=False).select_related('sender')
-    
-    messages_data = []
-    for msg in messages_qs:
-        # Determine message type
-        message_type = 'text'
-        file_url = None
-        file_name = None
-        
-        if msg.file:
-            # Determine if it's an image or document
-            file_ext = msg.file.name.split('.')[-1].lower()
-            if file_ext in ['jpg', 'jpeg', 'png']:
-                message_type = 'image'
-            else:
-                message_type = 'document'
-            
-            file_url = msg.file.url
-            file_name = msg.file.name.split('/')[-1]
-        
-        messages_data.append({
-            'id': msg.id,
-            'sender_id': msg.sender_id,
-            'content': msg.message,
-            'message_type': message_type,
-            'file_url': file_url,
-            'file_name': file_name,
-            'timestamp': msg.timestamp.isoformat(),
-            'is_read': msg.is_read
-        })
-    
-    return JsonResponse(
+
+    # The response only changes when a message is added or the consultation
+    # moves, so an idle poll is answered with 304 before serialising. Read
+    # receipts are left out: every mark-read would otherwise invalidate every
+    # poller's tag. The count catches a row that commits below the latest id.
+    # The page cursor is part of the tag, so one page's tag never validates
+    # another.
+    message_state = messages_qs.aggregate(latest_id=Max('id'), total=Count('id'))
+    etag_source = '|'.join(
+        str(part)
+        for part in (
+            message_state['latest_id'] or 0,
+            message_state['total'],
+            before_id,
+            after_id,
+            since_id,
+            limit,
+            appointment.status,
+            int(chat_state['is_active']),
+            int(chat_state['is_future']),
+            int(chat_state['is_locked']),
+            chat_state['start_dt'].isoformat(),
+            chat_state['end_dt'].isoformat(),
+        )
+    )
+    etag = '"chat-{}"'.format(hashlib.md5(etag_source.encode()).hexdigest())
+    if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        not_modified = HttpResponseNotModified()
+        not_modified['ETag'] = etag
+        not_modified['Cache-Control'] = 'private, no-cache'
+        return not_modified
+
+    # Keyset pagination on (room_name, id): the latest page by default, older
+    # pages with before_id and anything newer than the client has with after_id.
+    if since_id:
+        # Ids are handed out before commit, so a write-behind batch or a slow
+        # transaction can land below a since_id the poller already holds. The
+        # delta re-sends the recent overlap window as well; the client skips
+        # the ids it has already rendered.
+        overlap = max(int(getattr(settings, 'CHAT_HISTORY_SYNC_OVERLAP_SECONDS', 30)), 0)
+        late = list(
+            messages_qs.filter(id__lte=since_id, timestamp__gte=timezone.now() - timedelta(seconds=overlap))
+            .order_by('-id')[:max_page_size][::-1]
+        )
+        page = list(messages_qs.filter(id__gt=since_id).order_by('id')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        next_cursor = page[-1].id if page else since_id
+        page = late + page
+    elif after_id:
+        page = list(messages_qs.filter(id__gt=after_id).order_by('id')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        next_cursor = page[-1].id if page else after_id
+    else:
+        if before_id:
+            messages_qs = messages_qs.filter(id__lt=before_id)
+        page = list(messages_qs.order_by('-id')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit][::-1]
+        next_cursor = page[0].id if has_more else None
+
+    messages_data = [_serialize_chat_message(msg) for msg in page]
+
+    response = JsonResponse(
         {
             'messages': messages_data,
+            'next_cursor': next_cursor,
+            'has_more': has_more,
             'consultation': {
                 'is_active': chat_state['is_active'],
                 'is_locked': chat_state['is_locked'],
@@ -5481,6 +5985,9 @@ def get_message_history(request, appointment_id):
             },
         }
     )
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 @login_required
@@ -5528,16 +6035,7 @@ def send_message(request):
     )
     
     # Update Conversation
-    if user.role == 'doctor':
-        conversation = Conversation.objects.get(doctor=user, patient=appointment.user)
-        conversation.unread_count_patient += 1
-    else:
-        conversation = Conversation.objects.get(doctor=appointment.doctor, patient=user)
-        conversation.unread_count_doctor += 1
-    
-    conversation.last_message = content
-    conversation.last_message_time = msg.timestamp
-    conversation.save()
+    Conversation.record_message(room_name, user, content, msg.timestamp, participants=(appointment.doctor_id, appointment.user_id))
 
     recipient = appointment.user if user.role == 'doctor' else appointment.doctor
     _create_notification(
@@ -5567,17 +6065,8 @@ def send_message(request):
         }
     )
     
-    # Also broadcast to conversation list updates
-    async_to_sync(channel_layer.group_send)(
-        "broadcast",
-        {
-            "type": "message",
-            "message": content,
-            "sender_id": user.id,
-            "timestamp": msg.timestamp.isoformat(),
-            "message_type": "text"
-        }
-    )
+    # Also push the updated conversation to both participants' lists
+    push_conversation_update(room_name, 'message')
     
     return JsonResponse({
         'success': True,
@@ -5642,16 +6131,7 @@ def upload_message_file(request):
     )
     
     # Update Conversation
-    if user.role == 'doctor':
-        conversation = Conversation.objects.get(doctor=user, patient=appointment.user)
-        conversation.unread_count_patient += 1
-    else:
-        conversation = Conversation.objects.get(doctor=appointment.doctor, patient=user)
-        conversation.unread_count_doctor += 1
-    
-    conversation.last_message = f"📎 {file.name}"
-    conversation.last_message_time = msg.timestamp
-    conversation.save()
+    Conversation.record_message(room_name, user, f"📎 {file.name}", msg.timestamp, participants=(appointment.doctor_id, appointment.user_id))
     
     # Determine message type
     message_type = 'image' if file_ext in ['.jpg', '.jpeg', '.png'] else 'document'
@@ -5675,16 +6155,8 @@ def upload_message_file(request):
         }
     )
     
-    # Also broadcast to conversation list updates
-    async_to_sync(channel_layer.group_send)(
-        "broadcast",
-        {
-            "type": "file_message",
-            "message_type": message_type,
-            "timestamp": msg.timestamp.isoformat(),
-            "sender_id": user.id
-        }
-    )
+    # Also push the updated conversation to both participants' lists
+    push_conversation_update(room_name, 'file_message')
     
     return JsonResponse({
         'success': True,
@@ -5719,11 +6191,9 @@ def mark_conversation_as_read(request, appointment_id):
     # Get conversation
     if user.role == 'doctor':
         conversation = Conversation.objects.get(doctor=user, patient=appointment.user)
-        conversation.unread_count_doctor = 0
     else:
         conversation = Conversation.objects.get(doctor=appointment.doctor, patient=user)
-        conversation.unread_count_patient = 0
     
-    conversation.save()
+    conversation.mark_as_read(user)
     
     return JsonResponse({'success': True})
\ No newline at end of file